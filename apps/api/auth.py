@@ -2,24 +2,28 @@ import os
 from datetime import datetime, timedelta
 from typing import Optional
 
-import boto3
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 
+from aws_clients import get_client
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+# A browser's EventSource can't send an Authorization header, so status
+# streams take a token in their URL instead, which is short-lived and only
+# good for one document's events
+EVENTS_TOKEN_SCOPE = "document-events"
+EVENTS_TOKEN_EXPIRE_SECONDS = int(os.getenv("EVENTS_TOKEN_EXPIRE_SECONDS", "60"))
+
 COGNITO_USER_POOL_ID = os.getenv("COGNITO_USER_POOL_ID")
 COGNITO_CLIENT_ID = os.getenv("COGNITO_CLIENT_ID")
 
-cognito_client = boto3.client("cognito-idp", region_name=AWS_REGION)
-
 
 class Token(BaseModel):
     access_token: str
@@ -53,7 +57,8 @@ def verify_token(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Scoped tokens, like those for status streams, only grant their scope
+        if email is None or payload.get("scope") is not None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
@@ -69,11 +74,39 @@ def verify_token(token: str) -> TokenData:
         )
 
 
+def create_events_token(email: str, document_id: str) -> str:
+    """Create a token for streaming one document's status events"""
+    return create_access_token(
+        {"sub": email, "scope": EVENTS_TOKEN_SCOPE, "document": document_id},
+        expires_delta=timedelta(seconds=EVENTS_TOKEN_EXPIRE_SECONDS),
+    )
+
+
+def verify_events_token(token: str, document_id: str) -> TokenData:
+    """Check that a token grants streaming the given document's events"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+
+    email = payload.get("sub")
+    if (
+        email is None
+        or payload.get("scope") != EVENTS_TOKEN_SCOPE
+        or payload.get("document") != document_id
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+    return TokenData(email=email)
+
+
 async def register_user_cognito(
     email: str, password: str, first_name: str, last_name: str
 ):
     try:
-        response = cognito_client.admin_create_user(
+        response = get_client("cognito-idp").admin_create_user(
             UserPoolId=COGNITO_USER_POOL_ID,
             Username=email,
             UserAttributes=[
@@ -86,7 +119,7 @@ async def register_user_cognito(
             MessageAction="SUPPRESS",
         )
 
-        cognito_client.admin_set_user_password(
+        get_client("cognito-idp").admin_set_user_password(
             UserPoolId=COGNITO_USER_POOL_ID,
             Username=email,
             Password=password,
@@ -103,7 +136,7 @@ async def register_user_cognito(
 
 async def authenticate_user_cognito(email: str, password: str):
     try:
-        response = cognito_client.admin_initiate_auth(
+        response = get_client("cognito-idp").admin_initiate_auth(
             UserPoolId=COGNITO_USER_POOL_ID,
             ClientId=COGNITO_CLIENT_ID,
             AuthFlow="ADMIN_NO_SRP_AUTH",
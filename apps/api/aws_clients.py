@@ -0,0 +1,158 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+
+# Set to false to skip AWS entirely and use the local fallbacks everywhere
+AWS_ENABLED = os.getenv("AWS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Clients are created on first use from one shared session and reused by
+# every thread of the process. The pool is sized for the OCR page threads
+# and pipeline threads that call AWS at the same time.
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT", "5"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT", "60"))
+
+# Capability probes make one attempt with short timeouts, so an unreachable
+# endpoint costs seconds rather than a full retry cycle
+AWS_PROBE_TIMEOUT = float(os.getenv("AWS_PROBE_TIMEOUT", "2"))
+
+# A failed probe is retried after this long, so a network blip at startup
+# doesn't leave AWS off until the process restarts
+AWS_PROBE_RETRY_SECONDS = float(os.getenv("AWS_PROBE_RETRY_SECONDS", "60"))
+
+CLIENT_CONFIG = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    retries={"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS},
+)
+
+PROBE_CONFIG = Config(
+    region_name=AWS_REGION,
+    connect_timeout=AWS_PROBE_TIMEOUT,
+    read_timeout=AWS_PROBE_TIMEOUT,
+    retries={"mode": "standard", "max_attempts": 1},
+)
+
+# Cheap read-only calls that show whether a service is reachable and allowed
+CAPABILITY_PROBES: Dict[str, Callable[[Any], Any]] = {
+    "s3": lambda client: client.list_buckets(),
+    "textract": lambda client: client.list_adapters(MaxResults=1),
+    "comprehend": lambda client: client.list_entities_detection_jobs(MaxResults=1),
+}
+
+_lock = threading.Lock()
+_session: Optional[boto3.session.Session] = None
+_clients: Dict[str, Any] = {}
+_capabilities: Dict[str, bool] = {}
+# When each failed probe ran, by time.monotonic()
+_probe_failed_at: Dict[str, float] = {}
+_probe_locks: Dict[str, threading.Lock] = {}
+
+
+def get_session() -> boto3.session.Session:
+    """Get the process's shared boto3 session, creating it on first use"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = boto3.session.Session(region_name=AWS_REGION)
+        return _session
+
+
+def get_client(service: str) -> Any:
+    """Get the shared client for an AWS service, creating it on first use"""
+    client = _clients.get(service)
+    if client is not None:
+        return client
+
+    session = get_session()
+    with _lock:
+        if service not in _clients:
+            _clients[service] = session.client(service, config=CLIENT_CONFIG)
+        return _clients[service]
+
+
+def is_available(service: str) -> bool:
+    """
+    Check whether an AWS service can be used, probing it on first use
+
+    A successful probe is cached for the life of the process and a failed
+    one for AWS_PROBE_RETRY_SECONDS. Services without a probe count as
+    available whenever credentials are configured.
+    """
+    if _is_cached(service):
+        return _capabilities[service]
+
+    # Resolved before the probe lock is taken, since it takes the module lock
+    session = get_session() if AWS_ENABLED else None
+    with _lock:
+        probe_lock = _probe_locks.setdefault(service, threading.Lock())
+
+    with probe_lock:
+        if not _is_cached(service):
+            available = _probe(service, session)
+            if available:
+                _probe_failed_at.pop(service, None)
+            else:
+                _probe_failed_at[service] = time.monotonic()
+            _capabilities[service] = available
+        return _capabilities[service]
+
+
+def _is_cached(service: str) -> bool:
+    available = _capabilities.get(service)
+    if available is None:
+        return False
+    if available:
+        return True
+    failed_at = _probe_failed_at.get(service, float("-inf"))
+    return time.monotonic() - failed_at < AWS_PROBE_RETRY_SECONDS
+
+
+def _probe(service: str, session: Optional[boto3.session.Session]) -> bool:
+    if session is None:
+        return False
+
+    try:
+        if session.get_credentials() is None:
+            logger.info(f"AWS credentials not found, not using {service}")
+            return False
+
+        probe = CAPABILITY_PROBES.get(service)
+        if probe is not None:
+            probe(session.client(service, config=PROBE_CONFIG))
+    except (BotoCoreError, ClientError) as e:
+        logger.info(f"AWS {service} is not available ({e}), using local fallback")
+        return False
+
+    logger.info(f"AWS {service} is available")
+    return True
+
+
+def probe_capabilities_in_background() -> threading.Thread:
+    """Probe every service on a background thread so first use doesn't wait"""
+
+    def probe_all():
+        for service in CAPABILITY_PROBES:
+            is_available(service)
+
+    thread = threading.Thread(target=probe_all, name="aws-probe", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_capabilities() -> Dict[str, Optional[bool]]:
+    """Get each service's probe result, or None where it hasn't been probed yet"""
+    return {service: _capabilities.get(service) for service in CAPABILITY_PROBES}
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compare the streaming DOCX extractor with python-docx on a large lease
+
+Builds a DOCX with the given number of clauses and rent schedule rows, then
+extracts it in a fresh process per extractor and reports the time taken and
+the increase in peak RSS.
+
+    python benchmark_docx_extraction.py --clauses 20000 --rows 5000
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from docx import Document
+
+from docx_stream import extract_docx_text
+
+
+def build_docx(path: Path, clauses: int, rows: int):
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = "COMMERCIAL LEASE AGREEMENT"
+    document.sections[0].footer.paragraphs[0].text = "Tenant initials: ____"
+
+    for number in range(clauses):
+        document.add_paragraph(
+            f"{number + 1}. Tenant shall pay Landlord monthly rent in advance on "
+            f"the first day of each month without demand, deduction or offset."
+        )
+        if number % max(1, clauses // 4) == 0:
+            table = document.add_table(rows=0, cols=3)
+            for row in range(rows // 4):
+                cells = table.add_row().cells
+                cells[0].text = f"Month {row + 1}"
+                cells[1].text = f"${4500 + row * 10:,}.00"
+                cells[2].text = "Base rent"
+
+    document.save(path)
+
+
+def python_docx_paragraphs(file_path: str) -> str:
+    """The previous extractor: body paragraphs only"""
+    document = Document(file_path)
+    return "\n".join(p.text for p in document.paragraphs if p.text.strip())
+
+
+def python_docx_full(file_path: str) -> str:
+    """python-docx reading paragraphs, tables, headers and footers"""
+    document = Document(file_path)
+    blocks = [p.text for s in document.sections for p in s.header.paragraphs]
+    blocks += [p.text for p in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            blocks.append(" | ".join(cell.text for cell in row.cells))
+    blocks += [p.text for s in document.sections for p in s.footer.paragraphs]
+    return "\n".join(block for block in blocks if block.strip())
+
+
+EXTRACTORS = {
+    "python-docx (paragraphs)": python_docx_paragraphs,
+    "python-docx (full)": python_docx_full,
+    "streaming": extract_docx_text,
+}
+
+
+def peak_rss_mb() -> float:
+    # On Linux ru_maxrss survives exec, so a spawned child would report its
+    # parent's peak; VmHWM is reset for the new process image
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_extractor(name: str, file_path: str, results):
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    text = EXTRACTORS[name](file_path)
+    results.put((time.perf_counter() - started, peak_rss_mb() - baseline, len(text)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clauses", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "lease.docx"
+        build_docx(path, args.clauses, args.rows)
+        print(
+            f"DOCX with {args.clauses} clauses and {args.rows} table rows: "
+            f"{path.stat().st_size / 1024 / 1024:.1f} MB"
+        )
+
+        for name in EXTRACTORS:
+            results = context.Queue()
+            process = context.Process(
+                target=run_extractor, args=(name, str(path), results)
+            )
+            process.start()
+            seconds, peak_mb, characters = results.get()
+            process.join()
+            print(
+                f"{name:>26}: {seconds:6.2f}s, peak RSS +{peak_mb:6.1f} MB, "
+                f"{characters:,} characters"
+            )
+
+
+if __name__ == "__main__":
+    main()
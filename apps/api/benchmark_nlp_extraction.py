@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Time local lease-term extraction on adversarial text as it grows
+
+Each corpus repeats what garbage OCR output can contain: anchor terms with no
+periods, percent signs or commas after them, long runs of letters and digits,
+and repeated words that overlap their own anchors. The text is doubled in
+size each round; linear matching roughly doubles the time with it, where a
+pattern backtracking over the whole text would take four times as long.
+
+    python benchmark_nlp_extraction.py --chars 20000 --rounds 5
+
+With --index the text is segmented into a clause index first, as the
+pipeline does, and the timing includes building it. Exits with status 1 if
+any corpus took more than --max-growth times as long as at half its size.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import PyPDF2
+
+from clause_index import build_clause_index
+from lease_patterns import LEASE_PATTERNS, LeaseTermScanner
+from nlp_service import _extract_with_local_nlp
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+
+# Each builds about `chars` characters of one kind of pathological text
+CORPORA: Dict[str, Callable[[int], str]] = {
+    "no periods": lambda chars: (
+        "early termination of this lease and the tenant may terminate "
+    )
+    * (chars // 61),
+    "no percent": lambda chars: "annual rent increase escalation " * (chars // 32),
+    "no commas": lambda chars: "Landlord Acme Holdings LLC lessor tenant lessee and "
+    * (chars // 52),
+    "parties in prose": lambda chars: "and the first party and the tenant, "
+    * (chars // 36),
+    "repeated anchors": lambda chars: "endexpirterminat" * (chars // 16),
+    "digit runs": lambda chars: ("9" * 1000 + " per month ") * (chars // 1011),
+    "letter runs": lambda chars: ("A" * 1000 + " DBA ") * (chars // 1005),
+    "assign and sublet": lambda chars: "assign sublet transfer lease convey "
+    * (chars // 36),
+    "OCR noise": lambda chars: ("rn1 l|l ,. 0O end %$ renew " * (chars // 27)),
+}
+
+
+def sample_text() -> str:
+    pages = []
+    for pdf_path in sorted(SAMPLES_PATH.glob("*.pdf")):
+        reader = PyPDF2.PdfReader(str(pdf_path))
+        pages.extend(page.extract_text() or "" for page in reader.pages)
+    return "\n\n".join(pages)
+
+
+def time_extraction(text: str, use_index: bool, repeat: int = 3) -> float:
+    """Get the fastest of several runs, which is the least disturbed by noise"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _extract_with_local_nlp(text, build_clause_index(text) if use_index else None)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def slowest_field(text: str) -> str:
+    """Get the field whose patterns take longest, within the extractor budget"""
+    scanner = LeaseTermScanner(text)
+    seconds = {}
+    for field, patterns in LEASE_PATTERNS.items():
+        started = time.perf_counter()
+        with scanner.budget(field):
+            for pattern in patterns:
+                for _ in scanner.finditer(pattern):
+                    pass
+        seconds[field] = time.perf_counter() - started
+    field = max(seconds, key=seconds.get)
+    return f"{field} {seconds[field]:.3f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chars", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--index", action="store_true")
+    parser.add_argument("--max-growth", type=float, default=3.0)
+    args = parser.parse_args()
+
+    corpora = dict(CORPORA)
+    text = sample_text()
+    if text.strip():
+        corpora["sample leases"] = lambda chars: (text * (chars // len(text) + 1))[
+            :chars
+        ]
+
+    print(
+        f"{'corpus':18} {'chars':>9} {'seconds':>8} {'us/char':>8} "
+        f"{'growth':>7}  slowest field"
+    )
+    super_linear = []
+    for name, build in corpora.items():
+        previous = None
+        for round_number in range(args.rounds):
+            corpus = build(args.chars * 2**round_number)
+            seconds = time_extraction(corpus, args.index)
+            growth = f"{seconds / previous:.1f}x" if previous else ""
+            if previous and seconds / previous > args.max_growth:
+                super_linear.append(f"{name} at {len(corpus)} chars")
+            print(
+                f"{name:18} {len(corpus):>9} {seconds:>8.3f} "
+                f"{seconds / len(corpus) * 1e6:>8.2f} {growth:>7}  "
+                f"{slowest_field(corpus)}"
+            )
+            previous = seconds
+        print()
+
+    if super_linear:
+        print(f"Grew more than {args.max_growth}x: {', '.join(super_linear)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Compare tesseract time and character accuracy with and without preprocessing
+
+The sample leases have text layers, which serve as the reference text. Each
+page is rendered and degraded to look like a scan (colour, skew, noise and a
+dark scanner border) before being OCR'd, once as-is and once preprocessed.
+
+    python benchmark_ocr_preprocessing.py --pages 3 --dpi 300
+"""
+
+import argparse
+import difflib
+import re
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import PyPDF2
+import pytesseract
+from pdf2image import convert_from_path
+from PIL import Image
+
+from ocr_preprocessing import PREPROCESS_STEPS, get_output_dpi, preprocess_image
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def character_accuracy(reference: str, text: str) -> float:
+    return difflib.SequenceMatcher(
+        None, normalize(reference), normalize(text), autojunk=False
+    ).ratio()
+
+
+def simulate_scan(image: Image.Image, rng: np.random.Generator) -> Image.Image:
+    """Make a clean rendered page look like a skewed, noisy colour scan"""
+    image = image.convert("RGB").rotate(
+        float(rng.uniform(-3, 3)), resample=Image.BILINEAR, fillcolor=(245, 240, 225)
+    )
+    pixels = np.asarray(image, dtype=np.int16)
+    pixels = pixels + rng.normal(0, 18, pixels.shape).astype(np.int16)
+
+    border = max(8, pixels.shape[1] // 60)
+    pixels[:, :border] = 20
+    pixels[:border, :] = 20
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def ocr(image: Image.Image, dpi: int) -> Tuple[str, float]:
+    started = time.perf_counter()
+    text = pytesseract.image_to_string(image, lang="eng", config=f"--dpi {dpi}")
+    return text, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=Path, default=SAMPLES_PATH)
+    parser.add_argument("--pages", type=int, default=3, help="pages per document")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--steps", default=",".join(PREPROCESS_STEPS))
+    args = parser.parse_args()
+
+    steps = [step for step in args.steps.split(",") if step]
+    rng = np.random.default_rng(0)
+    totals = {"raw": [0.0, 0.0], "preprocessed": [0.0, 0.0]}
+    preprocess_seconds = 0.0
+    page_count = 0
+
+    print(
+        f"{'document':40} {'page':>4} {'raw s':>7} {'raw acc':>8} "
+        f"{'pre s':>7} {'pre acc':>8}"
+    )
+    for pdf_path in sorted(args.samples.glob("*.pdf")):
+        with open(pdf_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            references = [
+                page.extract_text() or "" for page in reader.pages[: args.pages]
+            ]
+
+        images = convert_from_path(
+            str(pdf_path), dpi=args.dpi, first_page=1, last_page=len(references)
+        )
+        for page_num, (image, reference) in enumerate(zip(images, references), 1):
+            if len(normalize(reference)) < 50:
+                continue
+
+            scan = simulate_scan(image, rng)
+            raw_text, raw_seconds = ocr(scan, args.dpi)
+
+            started = time.perf_counter()
+            prepared = preprocess_image(scan, args.dpi, steps)
+            preprocess_seconds += time.perf_counter() - started
+            pre_text, pre_seconds = ocr(prepared, get_output_dpi(args.dpi, steps))
+
+            raw_accuracy = character_accuracy(reference, raw_text)
+            pre_accuracy = character_accuracy(reference, pre_text)
+            totals["raw"][0] += raw_seconds
+            totals["raw"][1] += raw_accuracy
+            totals["preprocessed"][0] += pre_seconds
+            totals["preprocessed"][1] += pre_accuracy
+            page_count += 1
+
+            print(
+                f"{pdf_path.name[:40]:40} {page_num:>4} {raw_seconds:>7.2f} "
+                f"{raw_accuracy:>8.1%} {pre_seconds:>7.2f} {pre_accuracy:>8.1%}"
+            )
+
+    if not page_count:
+        print("No pages with a text layer to compare against")
+        return
+
+    print()
+    for label, (seconds, accuracy) in totals.items():
+        print(
+            f"{label:>12}: {seconds / page_count:.2f}s OCR per page, "
+            f"{accuracy / page_count:.1%} character accuracy"
+        )
+    print(f"preprocessing: {preprocess_seconds / page_count:.2f}s per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare OCR time per page with a tesseract process per page and pooled engines
+
+Pages of the sample leases are rendered and preprocessed as the pipeline
+does, then OCR'd with pytesseract (a tesseract process and temp file per
+page) and with the warm tesserocr engines of tesseract_pool, one page at a
+time and with a thread per worker. Both need tesseract installed.
+
+    python benchmark_tesseract_pool.py --pages 20 --workers 4
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List
+
+import pytesseract
+from pdf2image import convert_from_path
+
+from ocr_preprocessing import get_output_dpi, preprocess_image
+from tesseract_pool import TESSERACT_LANG, TesseractPool
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+
+
+def load_pages(samples: Path, pages: int, dpi: int) -> List:
+    """Render and preprocess up to `pages` pages across the sample PDFs"""
+    images = []
+    for pdf_path in sorted(samples.glob("*.pdf")):
+        remaining = pages - len(images)
+        if remaining <= 0:
+            break
+        for image in convert_from_path(
+            str(pdf_path), dpi=dpi, grayscale=True, last_page=remaining
+        ):
+            images.append(preprocess_image(image, dpi))
+    return images
+
+
+def run(ocr: Callable, images: List, workers: int) -> float:
+    started = time.perf_counter()
+    if workers <= 1:
+        for image in images:
+            ocr(image)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(ocr, images))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=Path, default=SAMPLES_PATH)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    images = load_pages(args.samples, args.pages, args.dpi)
+    if not images:
+        print("No sample pages found")
+        return
+
+    ocr_dpi = get_output_dpi(args.dpi)
+    config = f"--dpi {ocr_dpi}"
+    pool = TesseractPool(size=args.workers)
+
+    started = time.perf_counter()
+    pool.warm()
+    warm_seconds = time.perf_counter() - started
+
+    def subprocess_ocr(image):
+        return pytesseract.image_to_string(image, lang=TESSERACT_LANG, config=config)
+
+    def pool_ocr(image):
+        with pool.engine() as api:
+            api.SetImage(image)
+            api.SetSourceResolution(ocr_dpi)
+            return api.GetUTF8Text()
+
+    print(f"{len(images)} pages at {ocr_dpi} DPI")
+    print(f"starting {pool.size} pooled engines took {warm_seconds:.2f}s (once)")
+    print()
+    print(f"{'backend':12} {'workers':>7} {'total s':>8} {'s/page':>7} {'saving':>7}")
+    for workers in sorted({1, args.workers}):
+        subprocess_seconds = run(subprocess_ocr, images, workers)
+        pool_seconds = run(pool_ocr, images, workers)
+        saving = 1 - pool_seconds / subprocess_seconds
+        for label, seconds in (
+            ("subprocess", subprocess_seconds),
+            ("pool", pool_seconds),
+        ):
+            print(
+                f"{label:12} {workers:>7} {seconds:>8.2f} "
+                f"{seconds / len(images):>7.3f} "
+                f"{saving if label == 'pool' else 0:>7.1%}"
+            )
+
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
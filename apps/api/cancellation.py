@@ -0,0 +1,157 @@
+import logging
+import os
+import signal
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional
+
+from processing_errors import ProcessingCancelledError
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages run in executor threads or pool processes that can't see the
+# worker's asyncio tasks, so cancellation is signalled through marker files
+PIPELINE_CANCEL_DIR = os.getenv(
+    "PIPELINE_CANCEL_DIR", os.path.join(tempfile.gettempdir(), "legal-ease-cancel")
+)
+
+# External programs started by the stages that are killed on cancellation
+CANCELLABLE_COMMANDS = ("tesseract", "pdftoppm")
+
+_current = threading.local()
+
+
+def _marker_path(cancel_key: str, suffix: str) -> str:
+    return os.path.join(PIPELINE_CANCEL_DIR, f"{cancel_key}.{suffix}")
+
+
+def get_cancel_key() -> Optional[str]:
+    """Get the cancel key of the run in this thread, to hand on to page workers"""
+    return getattr(_current, "cancel_key", None)
+
+
+@contextmanager
+def cancel_scope(cancel_key: Optional[str]):
+    """Make raise_if_cancelled() in this thread check the given run's marker"""
+    previous = get_cancel_key()
+    _current.cancel_key = cancel_key
+    try:
+        yield
+    finally:
+        _current.cancel_key = previous
+
+
+@contextmanager
+def cancellable(cancel_key: str):
+    """Register a run so that request_cancellation() can reach it"""
+    os.makedirs(PIPELINE_CANCEL_DIR, exist_ok=True)
+    pid_path = _marker_path(cancel_key, "pid")
+    with open(pid_path, "w") as pid_file:
+        pid_file.write(str(os.getpid()))
+
+    try:
+        with cancel_scope(cancel_key):
+            raise_if_cancelled()
+            yield
+    finally:
+        for path in (pid_path, _marker_path(cancel_key, "cancel")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def run_cancellable(cancel_key: str, func: Callable[..., Any], *args: Any) -> Any:
+    """Run a pipeline stage so that it can be cancelled between pages"""
+    with cancellable(cancel_key):
+        return func(*args)
+
+
+def raise_if_cancelled():
+    """Raise ProcessingCancelledError if this thread's stage was cancelled"""
+    cancel_key = get_cancel_key()
+    if cancel_key and os.path.exists(_marker_path(cancel_key, "cancel")):
+        raise ProcessingCancelledError(f"Processing run {cancel_key} was cancelled")
+
+
+def request_cancellation(cancel_key: str) -> int:
+    """
+    Ask a running stage to stop and kill the OCR processes it started
+
+    The stage stops at its next raise_if_cancelled() check. Child processes are
+    only killed when the stage runs in a pool process, which runs one stage at
+    a time; in thread mode they belong to this process and may be another
+    job's, so the current page is left to finish. Returns the number killed.
+    """
+    os.makedirs(PIPELINE_CANCEL_DIR, exist_ok=True)
+    with open(_marker_path(cancel_key, "cancel"), "w"):
+        pass
+
+    pid = _read_pid(cancel_key)
+    if pid is None or pid == os.getpid():
+        return 0
+
+    killed = 0
+    for child_pid in _find_child_processes(pid, CANCELLABLE_COMMANDS):
+        try:
+            os.kill(child_pid, signal.SIGKILL)
+            killed += 1
+        except ProcessLookupError:
+            pass
+
+    if killed:
+        logger.info(f"Killed {killed} OCR processes for cancelled run {cancel_key}")
+    return killed
+
+
+def prune_cancellation_markers(max_age_seconds: float = 3600) -> int:
+    """Remove markers left by runs that were cancelled before their stage started"""
+    if not os.path.isdir(PIPELINE_CANCEL_DIR):
+        return 0
+
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    for entry in os.scandir(PIPELINE_CANCEL_DIR):
+        if not entry.name.endswith(".cancel"):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def _read_pid(cancel_key: str) -> Optional[int]:
+    try:
+        with open(_marker_path(cancel_key, "pid")) as pid_file:
+            return int(pid_file.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _find_child_processes(parent_pid: int, commands: tuple) -> List[int]:
+    """Find the direct children of a process running one of the given commands"""
+    if not os.path.isdir("/proc"):
+        return []
+
+    children = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(os.path.join(entry.path, "stat")) as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue
+
+        # Format is "pid (comm) state ppid ...", and comm may contain spaces
+        comm = stat[stat.find("(") + 1 : stat.rfind(")")]
+        ppid = int(stat[stat.rfind(")") + 2 :].split()[1])
+        if ppid == parent_pid and comm in commands:
+            children.append(int(entry.name))
+
+    return children
@@ -0,0 +1,336 @@
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+INDEX_MAGIC = b"CLIX"
+INDEX_FORMAT_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBI")
+
+# Segment kinds, stored as their position in this tuple. Sections contain
+# sentences, which contain clauses.
+SEGMENT_KINDS = ("section", "sentence", "clause")
+SECTION, SENTENCE, CLAUSE = range(len(SEGMENT_KINDS))
+
+# Page 0 marks a segment whose page isn't known, as for DOCX files
+NO_PAGE = 0
+NO_PARENT = -1
+
+# Text with no sentence ends, such as a garbled OCR page or a rent table, is
+# split at whitespace into sentences no longer than this
+SENTENCE_MAX_CHARS = 2000
+
+# Numbered or lettered headings ("9. ASSIGNMENT AND SUBLETTING",
+# "ARTICLE IV", "Section 12.3 Insurance") and short all-caps lines
+HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:ARTICLE|Article|SECTION|Section)\s+[\dIVXLC]+(?:\.\d+)*\b[^\n]{0,100}"
+    r"|\d{1,2}(?:\.\d{1,2})*\.?[ \t]+[A-Z][A-Z0-9 ,;&'/()-]{2,80}"
+    r"|[A-Z][A-Z0-9 ,;&'/()-]{3,60}"
+    r")[ \t]*$",
+    re.MULTILINE,
+)
+
+# A sentence ends at terminal punctuation (and any closing quotes or
+# brackets) before whitespace, or at a blank line
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"'”’)\]]*(?=\s)|\n[ \t]*\n")
+
+# Clauses are split at semicolons, colons and enumerations like "(a)"
+CLAUSE_BREAK_PATTERN = re.compile(
+    r"[;:](?=\s)|\s(?=\((?:[a-z]|[ivx]{1,4}|\d{1,2})\)\s)"
+)
+
+# Words whose period doesn't end a sentence
+ABBREVIATIONS = {
+    "inc",
+    "co",
+    "corp",
+    "ltd",
+    "llc",
+    "no",
+    "nos",
+    "st",
+    "ste",
+    "ave",
+    "blvd",
+    "mr",
+    "mrs",
+    "ms",
+    "dr",
+    "jr",
+    "sr",
+    "vs",
+    "etc",
+    "sec",
+    "art",
+    "para",
+    "approx",
+    "e.g",
+    "i.e",
+    "u.s",
+    "sq",
+    "ft",
+}
+
+
+class ClauseIndex:
+    """
+    Sections, sentences and clauses of a document's text
+
+    Each segment is a (start, end) range of character offsets into the
+    extracted text, with the page it starts on and the segment containing it.
+    Stored column-wise in typed arrays like TextLayout, and encoded as the
+    packed arrays, compressed; the text itself isn't stored, so segments are
+    read with the document's extracted text.
+    """
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.starts = array("I")
+        self.ends = array("I")
+        self.pages = array("H")
+        self.parents = array("i")
+        # Segment indexes and starts of each kind, for lookups by offset
+        self._by_kind: Optional[Dict[int, Tuple[List[int], List[int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def add_segment(
+        self, kind: int, start: int, end: int, page: int, parent: int = NO_PARENT
+    ) -> int:
+        self.kinds.append(kind)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.pages.append(page)
+        self.parents.append(parent)
+        self._by_kind = None
+        return len(self.kinds) - 1
+
+    def spans(self, kind: int) -> List[Tuple[int, int]]:
+        """Get the (start, end) ranges of every segment of a kind, in order"""
+        return [
+            (self.starts[index], self.ends[index])
+            for index in range(len(self))
+            if self.kinds[index] == kind
+        ]
+
+    def find_segment(self, offset: int, kind: int = SENTENCE) -> Optional[int]:
+        """Get the index of the segment of a kind containing an offset"""
+        if self._by_kind is None:
+            self._by_kind = {}
+            for index in range(len(self)):
+                indexes, starts = self._by_kind.setdefault(self.kinds[index], ([], []))
+                indexes.append(index)
+                starts.append(self.starts[index])
+
+        indexes, starts = self._by_kind.get(kind, ([], []))
+        position = bisect_right(starts, offset) - 1
+        if position < 0:
+            return None
+        index = indexes[position]
+        return index if offset < self.ends[index] else None
+
+    def get_page(self, offset: int) -> Optional[int]:
+        """Get the page of the sentence, or failing that the section, at an offset"""
+        for kind in (SENTENCE, SECTION):
+            index = self.find_segment(offset, kind)
+            if index is not None and self.pages[index] != NO_PAGE:
+                return self.pages[index]
+        return None
+
+    def segments(
+        self,
+        text: str,
+        kind: Optional[str] = None,
+        page: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Iterate over the segments, or those of a kind or on a page, as dicts"""
+        kind_code = SEGMENT_KINDS.index(kind) if kind is not None else None
+        for index in range(len(self)):
+            if kind_code is not None and self.kinds[index] != kind_code:
+                continue
+            segment_page = self.pages[index] if self.pages[index] != NO_PAGE else None
+            if page is not None and segment_page != page:
+                continue
+
+            start, end = self.starts[index], self.ends[index]
+            yield {
+                "index": index,
+                "kind": SEGMENT_KINDS[self.kinds[index]],
+                "start": start,
+                "end": end,
+                "page": segment_page,
+                "parent": (
+                    self.parents[index] if self.parents[index] != NO_PARENT else None
+                ),
+                "text": text[start:end],
+            }
+
+    def encode(self) -> bytes:
+        arrays = [self.kinds, self.starts, self.ends, self.pages, self.parents]
+        if sys.byteorder != "little":
+            arrays = [array(values.typecode, values) for values in arrays]
+            for values in arrays:
+                values.byteswap()
+
+        payload = b"".join(
+            [
+                INDEX_HEADER.pack(INDEX_MAGIC, INDEX_FORMAT_VERSION, len(self)),
+                *(values.tobytes() for values in arrays),
+            ]
+        )
+        return zlib.compress(payload, 6)
+
+    @classmethod
+    def decode(cls, data: bytes) -> "ClauseIndex":
+        payload = zlib.decompress(data)
+        magic, version, count = INDEX_HEADER.unpack_from(payload)
+        if magic != INDEX_MAGIC or version != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported clause index format {magic!r} v{version}")
+
+        index = cls()
+        offset = INDEX_HEADER.size
+        for values in (
+            index.kinds,
+            index.starts,
+            index.ends,
+            index.pages,
+            index.parents,
+        ):
+            end = offset + count * values.itemsize
+            values.frombytes(payload[offset:end])
+            if sys.byteorder != "little":
+                values.byteswap()
+            offset = end
+        return index
+
+
+def build_clause_index(
+    text: str, page_offsets: Optional[Sequence[Sequence[int]]] = None
+) -> ClauseIndex:
+    """
+    Segment text into sections, sentences and clauses
+
+    page_offsets are (page number, offset) pairs giving where each page's text
+    starts in the text, in order, as recorded by the extractors; without them
+    segments have no page.
+    """
+    index = ClauseIndex()
+    page_starts = [offset for _, offset in page_offsets or []]
+    page_numbers = [page for page, _ in page_offsets or []]
+
+    def page_at(offset: int) -> int:
+        position = bisect_right(page_starts, offset) - 1
+        return page_numbers[position] if position >= 0 else NO_PAGE
+
+    for section_start, section_end in _section_spans(text):
+        section = index.add_segment(
+            SECTION, section_start, section_end, page_at(section_start)
+        )
+        for sentence_start, sentence_end in _sentence_spans(
+            text, section_start, section_end
+        ):
+            sentence = index.add_segment(
+                SENTENCE,
+                sentence_start,
+                sentence_end,
+                page_at(sentence_start),
+                section,
+            )
+            clauses = _clause_spans(text, sentence_start, sentence_end)
+            if len(clauses) < 2:
+                continue
+            for clause_start, clause_end in clauses:
+                index.add_segment(
+                    CLAUSE, clause_start, clause_end, page_at(clause_start), sentence
+                )
+    return index
+
+
+def _trim(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Narrow a range to exclude surrounding whitespace, or None if it's blank"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def _section_spans(text: str) -> List[Tuple[int, int]]:
+    """Split text at heading lines; text before the first is a section too"""
+    boundaries = [0]
+    boundaries.extend(match.start() for match in HEADING_PATTERN.finditer(text))
+    boundaries.append(len(text))
+
+    spans = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        span = _trim(text, start, end)
+        if span:
+            spans.append(span)
+    return spans
+
+
+def _sentence_spans(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    spans = []
+    sentence_start = start
+    for match in SENTENCE_END_PATTERN.finditer(text, start, end):
+        if match.group()[0] == "." and _is_abbreviation(text, match.start()):
+            continue
+        spans.extend(_split_long(text, sentence_start, match.end()))
+        sentence_start = match.end()
+    spans.extend(_split_long(text, sentence_start, end))
+    return spans
+
+
+def _is_abbreviation(text: str, period: int) -> bool:
+    """Check whether the period at an offset follows an abbreviation or list number"""
+    word_start = period
+    while word_start > 0 and (
+        text[word_start - 1].isalnum() or text[word_start - 1] == "."
+    ):
+        word_start -= 1
+    word = text[word_start:period].lower()
+    if not word:
+        return False
+    # "9." and "(a)." numbering, and single initials like "J."
+    if (word.isdigit() and len(word) <= 2) or (len(word) == 1 and word.isalpha()):
+        return True
+    return word in ABBREVIATIONS
+
+
+def _split_long(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Trim a sentence, splitting it at whitespace if it is too long"""
+    spans = []
+    while end - start > SENTENCE_MAX_CHARS:
+        limit = start + SENTENCE_MAX_CHARS
+        split = max(text.rfind(" ", start, limit), text.rfind("\n", start, limit))
+        if split <= start:
+            split = limit
+        span = _trim(text, start, split)
+        if span:
+            spans.append(span)
+        start = split
+
+    span = _trim(text, start, end)
+    if span:
+        spans.append(span)
+    return spans
+
+
+def _clause_spans(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    spans = []
+    clause_start = start
+    for match in CLAUSE_BREAK_PATTERN.finditer(text, start, end):
+        span = _trim(text, clause_start, match.end())
+        if span:
+            spans.append(span)
+        clause_start = match.end()
+
+    span = _trim(text, clause_start, end)
+    if span:
+        spans.append(span)
+    return spans
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+import pytest
+
+# Tests run against a throwaway database and without AWS, set before the
+# app's modules read their configuration
+_test_dir = tempfile.mkdtemp(prefix="legal-ease-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_test_dir, 'test.db')}")
+os.environ.setdefault("AWS_ENABLED", "false")
+os.environ.setdefault("EXTRACTION_CACHE_ENABLED", "false")
+os.environ.setdefault("PIPELINE_CANCEL_DIR", os.path.join(_test_dir, "cancel"))
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, emptied again after the test"""
+    from models import Base, SessionLocal, create_tables, engine
+
+    create_tables()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentEventBroker:
+    """
+    Wakes status streams when the pipeline in this process changes a document
+
+    Only a wake-up is delivered; subscribers re-read the document's status
+    themselves. That keeps streams correct when the pipeline runs in a
+    standalone worker, where they fall back to polling.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Event]] = defaultdict(set)
+
+    def subscribe(self, document_id: str) -> asyncio.Event:
+        event = asyncio.Event()
+        self._subscribers[document_id].add(event)
+        return event
+
+    def unsubscribe(self, document_id: str, event: asyncio.Event):
+        subscribers = self._subscribers.get(document_id)
+        if subscribers is None:
+            return
+
+        subscribers.discard(event)
+        if not subscribers:
+            del self._subscribers[document_id]
+
+    def publish(self, document_id: str):
+        for event in self._subscribers.get(document_id, ()):
+            event.set()
+
+    def get_subscriber_count(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+document_events = DocumentEventBroker()
@@ -0,0 +1,192 @@
+import posixpath
+import re
+import zipfile
+from typing import IO, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+# Text is read straight from the WordprocessingML parts with iterparse, so a
+# large DOCX never has to be held as a full object model. Elements are
+# dropped as soon as the paragraph or table row they belong to is emitted.
+W_NAMESPACE = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+RELATIONSHIPS_NAMESPACE = "http://schemas.openxmlformats.org/package/2006/relationships"
+OFFICE_DOCUMENT_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+    "officeDocument"
+)
+
+W = f"{{{W_NAMESPACE}}}"
+PARAGRAPH = f"{W}p"
+TABLE = f"{W}tbl"
+ROW = f"{W}tr"
+CELL = f"{W}tc"
+TEXT = f"{W}t"
+DELETED = f"{W}del"
+
+# Markup compatibility: AlternateContent holds the same content twice, as a
+# Choice for newer readers and a Fallback for older ones, so only the Choice
+# is read
+MC_NAMESPACE = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+FALLBACK = f"{{{MC_NAMESPACE}}}Fallback"
+
+# Run content that stands for characters other than w:t text
+SPECIAL_CHARACTERS = {
+    f"{W}tab": "\t",
+    f"{W}br": "\n",
+    f"{W}cr": "\n",
+    f"{W}noBreakHyphen": "-",
+    f"{W}softHyphen": "",
+}
+
+# Cells of a table row are joined with this so rows read as one line
+CELL_SEPARATOR = " | "
+
+HEADER_FOOTER_PATTERN = re.compile(r"(header|footer)(\d*)\.xml$")
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield the (kind, text) blocks of a DOCX in reading order
+
+    Kinds are "header", "paragraph", "table_row" and "footer". Headers come
+    before the body and footers after it, each distinct one once.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        document_part = _main_document_part(archive)
+        headers, footers = _header_footer_parts(archive, document_part)
+
+        yield from _iter_distinct("header", archive, headers)
+        with archive.open(document_part) as part:
+            yield from _iter_part_blocks(part)
+        yield from _iter_distinct("footer", archive, footers)
+
+
+def _iter_distinct(
+    kind: str, archive: zipfile.ZipFile, part_names: List[str]
+) -> Iterator[Tuple[str, str]]:
+    # Sections often repeat the same header, so emit each text once
+    seen = set()
+    for part_name in part_names:
+        with archive.open(part_name) as part:
+            text = "\n".join(text for _, text in _iter_part_blocks(part))
+        if text and text not in seen:
+            seen.add(text)
+            yield kind, text
+
+
+def _iter_part_blocks(part: IO[bytes]) -> Iterator[Tuple[str, str]]:
+    """Yield the paragraphs and table rows of one part as they are parsed"""
+    # Open elements from the root down, so each element's parent is known
+    stack = []
+    table_depth = 0
+    skipped_depth = 0
+    # Text boxes hold paragraphs of their own inside a paragraph's runs, so
+    # each open paragraph has its own buffer
+    paragraphs: List[List[str]] = []
+    cells: List[str] = []
+    cell: List[str] = []
+
+    for event, element in ElementTree.iterparse(part, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            stack.append(element)
+            if tag == TABLE:
+                table_depth += 1
+            elif tag == PARAGRAPH:
+                paragraphs.append([])
+            elif tag in (DELETED, FALLBACK):
+                skipped_depth += 1
+            continue
+
+        stack.pop()
+        if tag == TEXT:
+            if paragraphs and not skipped_depth:
+                paragraphs[-1].append(element.text or "")
+        elif tag in SPECIAL_CHARACTERS:
+            if paragraphs and not skipped_depth:
+                paragraphs[-1].append(SPECIAL_CHARACTERS[tag])
+        elif tag in (DELETED, FALLBACK):
+            skipped_depth -= 1
+        elif tag == PARAGRAPH:
+            text = "".join(paragraphs.pop()).strip()
+            if paragraphs:
+                # A text box's paragraph, read as a line of the one around it
+                outer = paragraphs[-1]
+                if text:
+                    if outer and not outer[-1].endswith("\n"):
+                        outer.append("\n")
+                    outer.append(f"{text}\n")
+            elif table_depth:
+                if text:
+                    cell.append(text)
+            elif text:
+                yield "paragraph", text
+        elif tag == CELL and table_depth == 1:
+            cells.append(" ".join(cell))
+            cell = []
+        elif tag == ROW and table_depth == 1:
+            if any(cells):
+                yield "table_row", CELL_SEPARATOR.join(cells)
+            cells = []
+        elif tag == TABLE:
+            table_depth -= 1
+
+        # Drop finished paragraphs and rows along with everything under them
+        if tag in (PARAGRAPH, ROW, TABLE) and stack:
+            element.clear()
+            stack[-1].remove(element)
+
+
+def _main_document_part(archive: zipfile.ZipFile) -> str:
+    """Find the main document part from the package relationships"""
+    try:
+        with archive.open("_rels/.rels") as rels:
+            for relationship in _iter_relationships(rels):
+                if relationship[0] == OFFICE_DOCUMENT_TYPE:
+                    return relationship[1].lstrip("/")
+    except KeyError:
+        pass
+    return "word/document.xml"
+
+
+def find_main_document_part(archive: zipfile.ZipFile) -> Optional[str]:
+    """Get the name of the main document part, or None when it is missing"""
+    part_name = _main_document_part(archive)
+    return part_name if part_name in archive.NameToInfo else None
+
+
+def _header_footer_parts(
+    archive: zipfile.ZipFile, document_part: str
+) -> Tuple[List[str], List[str]]:
+    """Find the header and footer parts the main document refers to"""
+    directory, name = posixpath.split(document_part)
+    rels_name = posixpath.join(directory, "_rels", f"{name}.rels")
+    headers, footers = [], []
+
+    try:
+        with archive.open(rels_name) as rels:
+            for _, target in _iter_relationships(rels):
+                match = HEADER_FOOTER_PATTERN.search(target)
+                if match is None:
+                    continue
+                if target.startswith("/"):
+                    part_name = target.lstrip("/")
+                else:
+                    part_name = posixpath.normpath(posixpath.join(directory, target))
+                kind = headers if match.group(1) == "header" else footers
+                kind.append((int(match.group(2) or 0), part_name))
+    except KeyError:
+        pass
+
+    return [part for _, part in sorted(headers)], [part for _, part in sorted(footers)]
+
+
+def _iter_relationships(rels: IO[bytes]) -> Iterator[Tuple[str, str]]:
+    for _, element in ElementTree.iterparse(rels):
+        if element.tag == f"{{{RELATIONSHIPS_NAMESPACE}}}Relationship":
+            if element.get("TargetMode") != "External":
+                yield element.get("Type"), element.get("Target")
+
+
+def extract_docx_text(file_path: str, separator: str = "\n") -> str:
+    """Get a DOCX's headers, paragraphs, table rows and footers as one text"""
+    return separator.join(text for _, text in iter_docx_blocks(file_path))
@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Document, ExtractionCacheEntry, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Extracted text is cached by the SHA-256 of the file bytes and the extractor
+# version, so re-uploads of the same file skip straight to term extraction
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Least recently used entries are evicted once the cached text exceeds this
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "1024"))
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def compute_content_hash(file_path: str) -> str:
+    """Get the hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cached_extraction(
+    content_hash: str, extractor_version: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Look up a cached extraction and count the hit
+
+    Returns a dict shaped like extract_text_from_document()'s result, or None
+    on a miss. Cache failures are logged and treated as misses.
+    """
+    db = SessionLocal()
+    try:
+        entry = (
+            db.query(ExtractionCacheEntry)
+            .filter(
+                ExtractionCacheEntry.content_hash == content_hash,
+                ExtractionCacheEntry.extractor_version == extractor_version,
+            )
+            .first()
+        )
+        if entry is None:
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.commit()
+
+        return {
+            "text": entry.text,
+            "pages": entry.pages or [],
+            "error": None,
+            "engine": entry.engine,
+            "ocr_pages": entry.ocr_pages or [],
+            "page_offsets": entry.page_offsets,
+            "layout": entry.layout,
+        }
+    except Exception as e:
+        logger.warning(f"Extraction cache lookup failed for {content_hash}: {e}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def store_extraction(
+    content_hash: str, extractor_version: str, extraction: Dict[str, Any]
+):
+    """Cache a successful extraction, evicting old entries if over the size limit"""
+    text = extraction["text"] or ""
+    pages = extraction.get("pages") or []
+    layout = extraction.get("layout")
+    now = datetime.utcnow()
+
+    db = SessionLocal()
+    try:
+        db.add(
+            ExtractionCacheEntry(
+                content_hash=content_hash,
+                extractor_version=extractor_version,
+                text=text,
+                pages=pages,
+                engine=extraction.get("engine"),
+                ocr_pages=extraction.get("ocr_pages") or [],
+                page_offsets=extraction.get("page_offsets"),
+                layout=layout,
+                size_bytes=len(text.encode("utf-8"))
+                + sum(len(page.encode("utf-8")) for page in pages)
+                + len(layout or b""),
+                hit_count=0,
+                created_at=now,
+                last_used_at=now,
+            )
+        )
+        db.commit()
+    except IntegrityError:
+        # Another worker extracted the same file at the same time
+        db.rollback()
+        return
+    except Exception as e:
+        logger.warning(f"Failed to cache extraction for {content_hash}: {e}")
+        db.rollback()
+        return
+    finally:
+        db.close()
+
+    evict_extractions(EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+
+
+def evict_extractions(max_bytes: int) -> int:
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    db = SessionLocal()
+    try:
+        total = db.query(
+            func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0)
+        ).scalar()
+        if total <= max_bytes:
+            return 0
+
+        evicted = 0
+        entries = db.query(ExtractionCacheEntry).order_by(
+            ExtractionCacheEntry.last_used_at.asc()
+        )
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            total -= entry.size_bytes or 0
+            db.delete(entry)
+            evicted += 1
+
+        db.commit()
+        logger.info(f"Evicted {evicted} entries from the extraction cache")
+        return evicted
+    except Exception as e:
+        logger.warning(f"Failed to evict from the extraction cache: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+def get_extraction_cache_stats(db: Session) -> Dict[str, Any]:
+    """Get the cache size and the hit rate over documents extracted so far"""
+    entries, size_bytes, entry_hits = db.query(
+        func.count(ExtractionCacheEntry.content_hash),
+        func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0),
+        func.coalesce(func.sum(ExtractionCacheEntry.hit_count), 0),
+    ).one()
+
+    documents = db.query(func.count(Document.id))
+    lookups = documents.filter(Document.extraction_cache_hit.isnot(None)).scalar()
+    hits = documents.filter(Document.extraction_cache_hit.is_(True)).scalar()
+
+    return {
+        "enabled": EXTRACTION_CACHE_ENABLED,
+        "entries": entries,
+        "size_bytes": int(size_bytes),
+        "max_bytes": EXTRACTION_CACHE_MAX_MB * 1024 * 1024,
+        "entry_hits": int(entry_hits),
+        "documents_extracted": lookups,
+        "document_hits": int(hits),
+        "hit_rate": hits / lookups if lookups else None,
+    }
@@ -0,0 +1,223 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Document
+
+logger = logging.getLogger(__name__)
+
+# Engines that turn a whole file into a result, read PDF text layers a range
+# of pages at a time, or OCR the pages without a usable text layer
+ENGINE_KINDS = ("document", "text_layer", "ocr")
+
+# Measured throughput replaces an engine's declared page cost once it has
+# extracted at least this many pages in this process
+ENGINE_MIN_MEASURED_PAGES = int(os.getenv("ENGINE_MIN_MEASURED_PAGES", "20"))
+
+
+class ExtractionEngine:
+    """
+    A way of extracting text, with what it can handle and what it costs
+
+    Cost is estimated wall-clock time: a fixed overhead per document plus
+    seconds per page, spread over the pages the engine works on at once.
+    Both can be overridden with ENGINE_<NAME>_OVERHEAD_SECONDS and
+    ENGINE_<NAME>_PAGE_SECONDS. Engines that process the whole document
+    whichever pages are asked for are costed on its full page count.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        mime_types: List[str],
+        extract: Callable[..., Any],
+        is_available: Callable[[], bool],
+        page_seconds: float,
+        overhead_seconds: float = 0.0,
+        parallelism: int = 1,
+        max_pages: Optional[int] = None,
+        max_file_bytes: Optional[int] = None,
+        whole_document: bool = False,
+    ):
+        if kind not in ENGINE_KINDS:
+            raise ValueError(
+                f"Invalid engine kind {kind!r}, expected one of {ENGINE_KINDS}"
+            )
+
+        env_name = name.upper()
+        self.name = name
+        self.kind = kind
+        self.mime_types = mime_types
+        self.extract = extract
+        self.is_available = is_available
+        self.page_seconds = float(
+            os.getenv(f"ENGINE_{env_name}_PAGE_SECONDS", page_seconds)
+        )
+        self.overhead_seconds = float(
+            os.getenv(f"ENGINE_{env_name}_OVERHEAD_SECONDS", overhead_seconds)
+        )
+        self.parallelism = max(1, parallelism)
+        self.max_pages = max_pages
+        self.max_file_bytes = max_file_bytes
+        self.whole_document = whole_document
+
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.pages = 0
+        self.seconds = 0.0
+
+    def can_handle(self, probe: Dict[str, Any]) -> bool:
+        """Check the engine is available and can take the probed document"""
+        if probe["mime_type"] not in self.mime_types:
+            return False
+        if self.max_pages is not None and (
+            probe.get("page_count") is None or probe["page_count"] > self.max_pages
+        ):
+            return False
+        if self.max_file_bytes is not None and (
+            probe.get("file_size") is None or probe["file_size"] > self.max_file_bytes
+        ):
+            return False
+        return self.is_available()
+
+    def get_page_seconds(self) -> float:
+        """Get the seconds per page, measured once there are enough samples"""
+        with self._lock:
+            if self.pages >= ENGINE_MIN_MEASURED_PAGES:
+                # The declared overhead is already counted separately
+                overhead = self.overhead_seconds * self.documents
+                return max(0.0, self.seconds - overhead) / self.pages
+        return self.page_seconds
+
+    def estimate_seconds(self, page_count: int) -> float:
+        page_count = max(1, page_count)
+        concurrent_pages = min(self.parallelism, page_count)
+        return (
+            self.overhead_seconds
+            + self.get_page_seconds() * page_count / concurrent_pages
+        )
+
+    def record(self, pages: int, seconds: float):
+        """Record the pages and page time of one run"""
+        with self._lock:
+            self.documents += 1
+            self.pages += pages
+            self.seconds += seconds
+
+        if seconds > 0:
+            logger.info(
+                f"Engine {self.name} extracted {pages} pages in {seconds:.2f}s of "
+                f"page time ({pages / seconds:.2f} pages/s)"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            documents, pages, seconds = self.documents, self.pages, self.seconds
+
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "available": self.is_available(),
+            "mime_types": self.mime_types,
+            "max_pages": self.max_pages,
+            "max_file_bytes": self.max_file_bytes,
+            "declared_page_seconds": self.page_seconds,
+            "overhead_seconds": self.overhead_seconds,
+            "parallelism": self.parallelism,
+            "estimated_page_seconds": self.get_page_seconds(),
+            "documents": documents,
+            "pages": pages,
+            "seconds": round(seconds, 4),
+            "pages_per_second": pages / seconds if seconds else None,
+        }
+
+
+_engines: Dict[str, ExtractionEngine] = {}
+
+
+def register_engine(engine: ExtractionEngine) -> ExtractionEngine:
+    _engines[engine.name] = engine
+    return engine
+
+
+def get_engines(kind: Optional[str] = None) -> List[ExtractionEngine]:
+    return [
+        engine for engine in _engines.values() if kind is None or engine.kind == kind
+    ]
+
+
+def select_engine(
+    kind: str, probe: Dict[str, Any], page_count: Optional[int] = None
+) -> Optional[ExtractionEngine]:
+    """
+    Pick the cheapest engine of a kind for a document, or some of its pages
+
+    The probe is a dict with the document's 'mime_type', 'file_size' and,
+    for PDFs, 'page_count'. page_count is the number of pages to extract when
+    that is fewer than the whole document.
+    """
+    candidates = [engine for engine in get_engines(kind) if engine.can_handle(probe)]
+    if not candidates:
+        return None
+
+    document_pages = probe.get("page_count") or 1
+    pages = page_count or document_pages
+    estimates = {
+        engine.name: engine.estimate_seconds(
+            document_pages if engine.whole_document else pages
+        )
+        for engine in candidates
+    }
+    selected = min(candidates, key=lambda engine: estimates[engine.name])
+
+    if len(candidates) > 1:
+        costs = ", ".join(f"{name} ~{cost:.1f}s" for name, cost in estimates.items())
+        logger.info(
+            f"Selected {kind} engine {selected.name} for {pages} pages ({costs})"
+        )
+    return selected
+
+
+def get_engine_stats() -> List[Dict[str, Any]]:
+    """Get every engine's capabilities, cost and the throughput measured so far"""
+    return [engine.get_stats() for engine in _engines.values()]
+
+
+def get_engine_throughput(db: Session, window_seconds: int = 86400) -> Dict[str, Any]:
+    """
+    Get each engine's throughput over the documents extracted recently
+
+    Summed from the timings recorded on every document, so it covers all the
+    workers, unlike the counts each process keeps for its own estimates.
+    """
+    since = datetime.utcnow() - timedelta(seconds=window_seconds)
+    timings = (
+        db.query(Document.extraction_timings)
+        .filter(Document.extraction_timings.isnot(None), Document.updated_at >= since)
+        .all()
+    )
+
+    engines: Dict[str, Dict[str, Any]] = {}
+    for (document_timings,) in timings:
+        for name, timing in document_timings.items():
+            stats = engines.setdefault(
+                name, {"documents": 0, "pages": 0, "seconds": 0.0}
+            )
+            stats["documents"] += 1
+            stats["pages"] += timing["pages"]
+            stats["seconds"] += timing["seconds"]
+
+    for stats in engines.values():
+        stats["seconds"] = round(stats["seconds"], 4)
+        stats["page_seconds"] = (
+            stats["seconds"] / stats["pages"] if stats["pages"] else None
+        )
+        stats["pages_per_second"] = (
+            stats["pages"] / stats["seconds"] if stats["seconds"] else None
+        )
+    return engines
@@ -0,0 +1,587 @@
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, or_, update
+from sqlalchemy.orm import Session
+
+from models import Document, DocumentStatus, JobPriority, JobStatus, ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+# A claimed job is invisible to other workers until its lease expires. Workers
+# extend the lease while they run, so an expired lease means the worker died.
+JOB_VISIBILITY_TIMEOUT_SECONDS = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "300"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "3"))
+
+# Retry delays grow exponentially from the base delay up to the cap
+JOB_RETRY_BASE_DELAY_SECONDS = float(os.getenv("JOB_RETRY_BASE_DELAY_SECONDS", "5"))
+JOB_RETRY_MAX_DELAY_SECONDS = float(os.getenv("JOB_RETRY_MAX_DELAY_SECONDS", "300"))
+
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED, JobStatus.RUNNING)
+
+# Jobs created before priorities existed count as interactive
+_job_priority = func.coalesce(ProcessingJob.priority, JobPriority.INTERACTIVE.value)
+
+
+def _job_values(
+    document_id: str,
+    user_id: str,
+    s3_key: str,
+    s3_bucket: str,
+    priority: JobPriority,
+    now: datetime,
+    estimated_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()),
+        "document_id": document_id,
+        "user_id": user_id,
+        "s3_key": s3_key,
+        "s3_bucket": s3_bucket,
+        "status": JobStatus.QUEUED,
+        "priority": int(priority),
+        "attempts": 0,
+        "max_attempts": JOB_MAX_RETRIES + 1,
+        "estimated_seconds": estimated_seconds,
+        "available_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def enqueue_job(
+    db: Session,
+    document_id: str,
+    user_id: str,
+    s3_key: str,
+    s3_bucket: str,
+    priority: JobPriority = JobPriority.INTERACTIVE,
+    estimated_seconds: Optional[float] = None,
+) -> ProcessingJob:
+    """
+    Add a processing job for a document and mark the document as processing
+
+    The caller commits, so the job can be written in the same transaction as
+    the document it belongs to. estimated_seconds is the extraction cost
+    estimated by the preflight check, when there was one.
+    """
+    now = datetime.utcnow()
+    job = ProcessingJob(
+        **_job_values(
+            document_id, user_id, s3_key, s3_bucket, priority, now, estimated_seconds
+        )
+    )
+    db.add(job)
+
+    db.query(Document).filter(Document.id == document_id).update(
+        {Document.status: DocumentStatus.PROCESSING, Document.updated_at: now},
+        synchronize_session=False,
+    )
+
+    return job
+
+
+def enqueue_jobs(
+    db: Session,
+    documents: List[Dict[str, Any]],
+    priority: JobPriority = JobPriority.BULK,
+) -> List[str]:
+    """
+    Add processing jobs for many documents with one INSERT and one UPDATE
+
+    Each document is a dict with id, user_id, s3_key and s3_bucket, and
+    optionally estimated_extraction_seconds. Returns the job ids in the same
+    order; the caller commits.
+    """
+    if not documents:
+        return []
+
+    now = datetime.utcnow()
+    rows = [
+        _job_values(
+            document["id"],
+            document["user_id"],
+            document["s3_key"],
+            document["s3_bucket"],
+            priority,
+            now,
+            document.get("estimated_extraction_seconds"),
+        )
+        for document in documents
+    ]
+    db.execute(insert(ProcessingJob), rows)
+
+    db.query(Document).filter(
+        Document.id.in_([document["id"] for document in documents])
+    ).update(
+        {Document.status: DocumentStatus.PROCESSING, Document.updated_at: now},
+        synchronize_session=False,
+    )
+
+    return [row["id"] for row in rows]
+
+
+def has_active_job(db: Session, document_id: str) -> bool:
+    """Check whether a document already has a queued or running job"""
+    return (
+        db.query(ProcessingJob.id)
+        .filter(
+            ProcessingJob.document_id == document_id,
+            ProcessingJob.status.in_(ACTIVE_JOB_STATUSES),
+        )
+        .first()
+        is not None
+    )
+
+
+def count_queued_jobs(db: Session) -> int:
+    """Count jobs waiting to be claimed, including those waiting for a retry"""
+    return (
+        db.query(ProcessingJob).filter(ProcessingJob.status == JobStatus.QUEUED).count()
+    )
+
+
+def count_running_jobs(db: Session) -> int:
+    """Count jobs currently leased by a worker"""
+    return (
+        db.query(ProcessingJob)
+        .filter(ProcessingJob.status == JobStatus.RUNNING)
+        .count()
+    )
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(
+            ProcessingJob.status == JobStatus.QUEUED,
+            ProcessingJob.available_at <= now,
+        ),
+        and_(
+            ProcessingJob.status == JobStatus.RUNNING,
+            ProcessingJob.locked_until < now,
+            ProcessingJob.attempts < ProcessingJob.max_attempts,
+        ),
+    )
+
+
+def _fair_share_order(db: Session, now: datetime) -> List[Tuple[str, int]]:
+    """
+    Order the users with claimable jobs for fair-share scheduling
+
+    Higher job priority goes first, so interactive uploads overtake bulk
+    backfills. Within a priority, the user with the fewest running jobs goes
+    first, then the user whose oldest job has waited longest. One user's bulk
+    upload can then take at most an equal share of the workers.
+    """
+    waiting = (
+        db.query(
+            ProcessingJob.user_id,
+            func.max(_job_priority),
+            func.min(ProcessingJob.available_at),
+        )
+        .filter(_claimable(now))
+        .group_by(ProcessingJob.user_id)
+        .all()
+    )
+    running = dict(
+        db.query(ProcessingJob.user_id, func.count(ProcessingJob.id))
+        .filter(
+            ProcessingJob.status == JobStatus.RUNNING,
+            ProcessingJob.locked_until >= now,
+        )
+        .group_by(ProcessingJob.user_id)
+        .all()
+    )
+
+    waiting.sort(key=lambda row: (-row[1], running.get(row[0], 0), row[2]))
+    return [(user_id, priority) for user_id, priority, _ in waiting]
+
+
+def _lease_values(
+    worker_id: str, now: datetime, available_at: datetime, visibility_timeout: int
+) -> Dict[Any, Any]:
+    return {
+        ProcessingJob.status: JobStatus.RUNNING,
+        ProcessingJob.locked_by: worker_id,
+        ProcessingJob.locked_until: now + timedelta(seconds=visibility_timeout),
+        ProcessingJob.attempts: ProcessingJob.attempts + 1,
+        ProcessingJob.started_at: now,
+        ProcessingJob.last_wait_seconds: max(0.0, (now - available_at).total_seconds()),
+        ProcessingJob.updated_at: now,
+    }
+
+
+def claim_next_job(
+    db: Session,
+    worker_id: str,
+    visibility_timeout: int = JOB_VISIBILITY_TIMEOUT_SECONDS,
+) -> Optional[ProcessingJob]:
+    """
+    Atomically claim the next job for a worker
+
+    Users are picked in fair-share order, then that user's oldest job of the
+    highest waiting priority is claimed. Postgres uses SELECT ... FOR UPDATE
+    SKIP LOCKED so concurrent workers never block on or double-claim a row.
+    Other databases (SQLite) use a conditional UPDATE that only succeeds if the
+    row is still claimable, moving on to the next user if another worker won
+    the race.
+    """
+    now = datetime.utcnow()
+    is_postgres = db.get_bind().dialect.name == "postgresql"
+
+    for user_id, priority in _fair_share_order(db, now):
+        query = (
+            db.query(ProcessingJob)
+            .filter(
+                _claimable(now),
+                ProcessingJob.user_id == user_id,
+                _job_priority == priority,
+            )
+            .order_by(ProcessingJob.available_at, ProcessingJob.created_at)
+        )
+
+        if is_postgres:
+            job = query.with_for_update(skip_locked=True).first()
+            if job is None:
+                continue
+
+            db.execute(
+                update(ProcessingJob)
+                .where(ProcessingJob.id == job.id)
+                .values(
+                    _lease_values(worker_id, now, job.available_at, visibility_timeout)
+                )
+            )
+            db.commit()
+            db.refresh(job)
+            return job
+
+        candidate = query.with_entities(
+            ProcessingJob.id, ProcessingJob.available_at
+        ).first()
+        if candidate is None:
+            continue
+
+        result = db.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == candidate.id, _claimable(now))
+            .values(
+                _lease_values(
+                    worker_id, now, candidate.available_at, visibility_timeout
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+        if result.rowcount == 1:
+            return db.get(ProcessingJob, candidate.id)
+
+    db.rollback()
+    return None
+
+
+def get_queue_wait_stats(
+    db: Session, window_seconds: int = 3600, user_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Get per-user queue depth and queue-wait times, or only one user's
+
+    Wait time is how long a job was claimable before a worker started it,
+    recorded on every claim, so fairness between users can be checked.
+    Queued work is also given as estimated extraction seconds.
+    """
+    now = datetime.utcnow()
+    users: Dict[str, Dict[str, Any]] = {}
+    jobs = db.query(ProcessingJob)
+    if user_id is not None:
+        jobs = jobs.filter(ProcessingJob.user_id == user_id)
+
+    def user_stats(user_id: str) -> Dict[str, Any]:
+        return users.setdefault(
+            user_id,
+            {
+                "queued": 0,
+                "queued_estimated_seconds": None,
+                "running": 0,
+                "started": 0,
+                "avg_wait_seconds": None,
+                "max_wait_seconds": None,
+                "oldest_queued_seconds": None,
+            },
+        )
+
+    queued = (
+        jobs.with_entities(
+            ProcessingJob.user_id,
+            func.count(ProcessingJob.id),
+            func.min(ProcessingJob.created_at),
+            func.sum(ProcessingJob.estimated_seconds),
+        )
+        .filter(ProcessingJob.status == JobStatus.QUEUED)
+        .group_by(ProcessingJob.user_id)
+        .all()
+    )
+    for job_user_id, count, oldest, estimated_seconds in queued:
+        stats = user_stats(job_user_id)
+        stats["queued"] = count
+        stats["oldest_queued_seconds"] = (now - oldest).total_seconds()
+        # Extraction time of the queued jobs that had a preflight estimate
+        if estimated_seconds is not None:
+            stats["queued_estimated_seconds"] = float(estimated_seconds)
+
+    running = (
+        jobs.with_entities(ProcessingJob.user_id, func.count(ProcessingJob.id))
+        .filter(ProcessingJob.status == JobStatus.RUNNING)
+        .group_by(ProcessingJob.user_id)
+        .all()
+    )
+    for job_user_id, count in running:
+        user_stats(job_user_id)["running"] = count
+
+    started = (
+        jobs.with_entities(
+            ProcessingJob.user_id,
+            func.count(ProcessingJob.id),
+            func.avg(ProcessingJob.last_wait_seconds),
+            func.max(ProcessingJob.last_wait_seconds),
+        )
+        .filter(
+            ProcessingJob.started_at >= now - timedelta(seconds=window_seconds),
+            ProcessingJob.last_wait_seconds.isnot(None),
+        )
+        .group_by(ProcessingJob.user_id)
+        .all()
+    )
+    for job_user_id, count, avg_wait, max_wait in started:
+        stats = user_stats(job_user_id)
+        stats["started"] = count
+        stats["avg_wait_seconds"] = float(avg_wait)
+        stats["max_wait_seconds"] = float(max_wait)
+
+    return {"window_seconds": window_seconds, "users": users}
+
+
+def extend_job_lease(
+    db: Session,
+    job_id: str,
+    worker_id: str,
+    visibility_timeout: int = JOB_VISIBILITY_TIMEOUT_SECONDS,
+) -> bool:
+    """Extend a running job's lease; returns False if the worker lost the job"""
+    now = datetime.utcnow()
+    result = db.execute(
+        update(ProcessingJob)
+        .where(
+            ProcessingJob.id == job_id,
+            ProcessingJob.locked_by == worker_id,
+            ProcessingJob.status == JobStatus.RUNNING,
+        )
+        .values(
+            {
+                ProcessingJob.locked_until: now + timedelta(seconds=visibility_timeout),
+                ProcessingJob.updated_at: now,
+            }
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def is_job_leased_by(db: Session, job_id: str, worker_id: str) -> bool:
+    """Check whether a worker still holds a job, without extending the lease"""
+    return (
+        db.query(ProcessingJob.id)
+        .filter(
+            ProcessingJob.id == job_id,
+            ProcessingJob.locked_by == worker_id,
+            ProcessingJob.status == JobStatus.RUNNING,
+        )
+        .first()
+        is not None
+    )
+
+
+def cancel_document_jobs(db: Session, document_id: str) -> int:
+    """
+    Remove a document's jobs so that it can be deleted; the caller commits
+
+    Queued jobs are never claimed, and the worker running an active job sees
+    that it no longer holds the job and cancels the run.
+    """
+    return (
+        db.query(ProcessingJob)
+        .filter(ProcessingJob.document_id == document_id)
+        .delete(synchronize_session=False)
+    )
+
+
+def _finish_job(
+    db: Session, job_id: str, status: JobStatus, error: Optional[str] = None
+):
+    now = datetime.utcnow()
+    db.query(ProcessingJob).filter(ProcessingJob.id == job_id).update(
+        {
+            ProcessingJob.status: status,
+            ProcessingJob.locked_by: None,
+            ProcessingJob.locked_until: None,
+            ProcessingJob.last_error: error,
+            ProcessingJob.finished_at: now,
+            ProcessingJob.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+
+
+def complete_job(db: Session, job_id: str):
+    """Mark a job as completed; the caller commits"""
+    _finish_job(db, job_id, JobStatus.COMPLETED)
+
+
+def fail_job(db: Session, job_id: str, error: str):
+    """Mark a job as permanently failed; the caller commits"""
+    _finish_job(db, job_id, JobStatus.FAILED, error)
+
+
+def compute_retry_delay(attempts: int) -> float:
+    """
+    Get the delay before the next attempt of a job that has failed `attempts` times
+
+    Uses exponential backoff with equal jitter: half of the delay is fixed and
+    half is random, so retries of jobs that failed together (for example on
+    the same throttling burst) spread out instead of failing together again.
+    """
+    delay = min(
+        JOB_RETRY_MAX_DELAY_SECONDS,
+        JOB_RETRY_BASE_DELAY_SECONDS * 2 ** max(0, attempts - 1),
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_job(db: Session, job_id: str, error: str, delay_seconds: float):
+    """Release a job back to the queue, invisible until the delay has passed"""
+    now = datetime.utcnow()
+    db.query(ProcessingJob).filter(ProcessingJob.id == job_id).update(
+        {
+            ProcessingJob.status: JobStatus.QUEUED,
+            ProcessingJob.locked_by: None,
+            ProcessingJob.locked_until: None,
+            ProcessingJob.last_error: error,
+            ProcessingJob.available_at: now + timedelta(seconds=delay_seconds),
+            ProcessingJob.updated_at: now,
+        },
+        synchronize_session=False,
+    )
+
+
+def recover_orphaned_jobs(db: Session) -> Dict[str, int]:
+    """
+    Recover work left behind by crashed or restarted workers
+
+    Jobs whose lease expired after their last attempt are failed, along with
+    their documents. Documents left in PROCESSING without an active job (for
+    example from before the queue was durable) get a new job. Every process
+    recovers at startup, so each document is claimed before it is re-queued
+    and only one of them re-queues it.
+    """
+    now = datetime.utcnow()
+    recovered = {"failed_jobs": 0, "requeued_documents": 0}
+
+    exhausted_jobs = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.status == JobStatus.RUNNING,
+            ProcessingJob.locked_until < now,
+            ProcessingJob.attempts >= ProcessingJob.max_attempts,
+        )
+        .all()
+    )
+    for job in exhausted_jobs:
+        error = "Processing failed after max retries: worker lease expired"
+        fail_job(db, job.id, error)
+        db.query(Document).filter(Document.id == job.document_id).update(
+            {
+                Document.status: DocumentStatus.FAILED,
+                Document.extraction_error: error,
+                Document.updated_at: now,
+            },
+            synchronize_session=False,
+        )
+        recovered["failed_jobs"] += 1
+
+    active_document_ids = db.query(ProcessingJob.document_id).filter(
+        ProcessingJob.status.in_(ACTIVE_JOB_STATUSES)
+    )
+    stranded_documents = (
+        db.query(Document)
+        .filter(
+            Document.status == DocumentStatus.PROCESSING,
+            Document.id.notin_(active_document_ids),
+        )
+        .all()
+    )
+    for document in stranded_documents:
+        if _claim_stranded_document(db, document, active_document_ids, now):
+            enqueue_job(
+                db, document.id, document.user_id, document.s3_key, document.s3_bucket
+            )
+            recovered["requeued_documents"] += 1
+
+    db.commit()
+
+    if any(recovered.values()):
+        logger.info(
+            f"Recovered orphaned processing work: {recovered['failed_jobs']} jobs "
+            f"failed, {recovered['requeued_documents']} documents re-queued"
+        )
+
+    return recovered
+
+
+def _claim_stranded_document(
+    db: Session, document: Document, active_document_ids: Any, now: datetime
+) -> bool:
+    """
+    Claim a stranded document for re-queueing by moving its updated_at on
+
+    The update only applies if the document is unchanged since it was read
+    and still has no active job, so of two processes recovering it at once,
+    the second finds nothing to update: it waits on the first one's row lock,
+    or on SQLite its write lock, and then sees the new updated_at.
+    """
+    unchanged = (
+        Document.updated_at == document.updated_at
+        if document.updated_at is not None
+        else Document.updated_at.is_(None)
+    )
+    claimed = (
+        db.query(Document)
+        .filter(
+            Document.id == document.id,
+            Document.status == DocumentStatus.PROCESSING,
+            unchanged,
+            Document.id.notin_(active_document_ids),
+        )
+        .update({Document.updated_at: now}, synchronize_session=False)
+    )
+    return claimed == 1
+
+
+def job_to_dict(job: ProcessingJob) -> Dict[str, Any]:
+    """Convert a claimed job into the dict passed through the worker"""
+    return {
+        "id": job.id,
+        "document_id": job.document_id,
+        "user_id": job.user_id,
+        "s3_key": job.s3_key,
+        "s3_bucket": job.s3_bucket,
+        "created_at": job.created_at.isoformat(),
+        "retry_count": max(0, job.attempts - 1),
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+    }
@@ -0,0 +1,442 @@
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from heapq import merge
+from typing import Any, Dict, Iterator, List, Match, Optional, Sequence, Tuple
+
+from clause_index import SENTENCE, ClauseIndex
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+logger = logging.getLogger(__name__)
+
+# Seconds each extractor may spend matching before it stops and keeps what it
+# has found, in case text still finds a slow path through its patterns
+LEASE_EXTRACTOR_BUDGET_SECONDS = float(
+    os.getenv("LEASE_EXTRACTOR_BUDGET_SECONDS", "2.0")
+)
+
+# Whitespace between words aside, every repeat in the patterns is bounded,
+# at or just over the longest value
+# its extractor keeps, so each attempt to match reads a fixed number of
+# characters however it backtracks, and matching stays linear in the text.
+# Unbounded, a run of text with no period after "terminat" is rescanned from
+# every later start, or every split of a word like "endend...".
+# For sizing the windows patterns run in, a run of whitespace counts as at
+# most LEASE_PATTERN_MAX_GAP characters.
+LEASE_PATTERN_MAX_GAP = 50
+NAME = r"[^,\n]{1,100}"
+NAME_REST = r"[^,\n]{0,100}"
+TO_PARTY = r"[^,]{0,300}"
+WORD_REST = r"\w{0,30}"
+# Words run on into the clause, so "terminat" is followed by TO_PERIOD alone
+# rather than a word and then the rest, which would backtrack between them
+TO_PERIOD = r"[^.]{0,300}"
+# The rest of a clause and its closing period. A clause running on past
+# TO_PERIOD still matches, without the period, so the scanner can skip the
+# rest of it as an unbounded pattern would have matched all of it
+TO_CLAUSE_END = rf"{TO_PERIOD}\.?"
+TO_PERCENT = r".{0,200}?(\d{1,10}(?:\.\d{1,10})?%)"
+AMOUNT = r"([\d,]{1,20}\.?\d{0,10})"
+NUMBER = r"(\d{1,10})"
+DATE = r"([A-Za-z]{1,20}\s+\d{1,2},?\s+\d{4})"
+
+ORGANIZATION = r"(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership)"
+PARTY_ORGANIZATION = r"(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership|DBA)"
+
+
+def _max_length(parsed: Any) -> int:
+    """Get the longest match of a parsed pattern, counting gaps as bounded"""
+    length = 0
+    for op, value in parsed:
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            low, high, item = value
+            if high == sre_constants.MAXREPEAT:
+                high = max(low, LEASE_PATTERN_MAX_GAP)
+            length += high * _max_length(item)
+        elif op == sre_constants.SUBPATTERN:
+            length += _max_length(value[-1])
+        elif op == sre_constants.BRANCH:
+            length += max(_max_length(branch) for branch in value[1])
+        elif op in (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            continue
+        else:
+            # A literal, character class or other single character
+            length += 1
+    return length
+
+
+class LeasePattern:
+    """
+    A compiled lease-term regex and the terms every match of it contains
+
+    Anchors are lowercase and matched case-insensitively; a pattern is only
+    run near places where one of them appears in the text. A match is at
+    most max_length characters long, so it lies within that distance of the
+    anchor it contains. Patterns ending in TO_CLAUSE_END match clauses, and
+    may match one that runs on without reaching its period.
+    """
+
+    def __init__(self, pattern: str, anchors: Sequence[str]):
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.anchors = tuple(anchor.lower() for anchor in anchors)
+        self.max_length = _max_length(sre_parse.parse(pattern, re.IGNORECASE))
+        self.runs_on = pattern.endswith(TO_CLAUSE_END)
+
+
+# Patterns for each lease term, in the order they are tried
+LEASE_PATTERNS: Dict[str, List[LeasePattern]] = {
+    "landlord": [
+        LeasePattern(rf'landlord["\s]*:?\s*({NAME}{ORGANIZATION})', ["landlord"]),
+        LeasePattern(rf'lessor["\s]*:?\s*({NAME}{ORGANIZATION})', ["lessor"]),
+        LeasePattern(
+            rf"between\s+({NAME}{ORGANIZATION}){TO_PARTY}(?:landlord|lessor)",
+            ["landlord", "lessor"],
+        ),
+        LeasePattern(
+            rf"({NAME}{ORGANIZATION}){TO_PARTY}(?:landlord|lessor)",
+            ["landlord", "lessor"],
+        ),
+    ],
+    "tenant": [
+        LeasePattern(
+            rf'tenant["\s]*:?\s*({NAME}{PARTY_ORGANIZATION}?{NAME_REST})', ["tenant"]
+        ),
+        LeasePattern(
+            rf'lessee["\s]*:?\s*({NAME}{PARTY_ORGANIZATION}?{NAME_REST})', ["lessee"]
+        ),
+        LeasePattern(
+            rf"and\s+({NAME}{PARTY_ORGANIZATION}?{NAME_REST}){TO_PARTY}"
+            r"(?:tenant|lessee)",
+            ["tenant", "lessee"],
+        ),
+        LeasePattern(
+            r"([A-Z][a-z]{1,30}\s+[A-Z][a-z]{1,30}(?:\s+[A-Z][a-z]{1,30})?)\s*"
+            r"(?:DBA|d/b/a)",
+            ["dba", "d/b/a"],
+        ),
+        LeasePattern(r"([A-Z][A-Z\s]{1,100}[A-Z])\s*(?:DBA|d/b/a)", ["dba", "d/b/a"]),
+    ],
+    "effectiveDate": [
+        LeasePattern(
+            rf"(?:effective|commencement|start|beginning)\s+date[:\s]*{DATE}",
+            ["effective", "commence", "start", "begin"],
+        ),
+        LeasePattern(
+            rf"(?:effective|commence|begin){WORD_REST}\s+on\s+{DATE}",
+            ["effective", "commence", "begin"],
+        ),
+        LeasePattern(
+            rf"lease\s+(?:term\s+)?(?:shall\s+)?(?:commence|begin){WORD_REST}\s+{DATE}",
+            ["commence", "begin"],
+        ),
+    ],
+    "expirationDate": [
+        LeasePattern(
+            rf"(?:expir|terminat|end){WORD_REST}\s+(?:date[:\s]*)?{DATE}",
+            ["expir", "terminat", "end"],
+        ),
+        LeasePattern(
+            rf"(?:expir|terminat|end){WORD_REST}\s+on\s+{DATE}",
+            ["expir", "terminat", "end"],
+        ),
+        LeasePattern(
+            r"lease\s+(?:term\s+)?(?:shall\s+)?"
+            rf"(?:expir|terminat|end){WORD_REST}\s+{DATE}",
+            ["expir", "terminat", "end"],
+        ),
+    ],
+    "duration": [
+        LeasePattern(
+            rf"(?:term|period)\s+of\s+{NUMBER}\s+(?:year|month)", ["year", "month"]
+        ),
+        LeasePattern(
+            rf"{NUMBER}[-\s](?:year|month)\s+(?:term|lease)", ["year", "month"]
+        ),
+        LeasePattern(
+            rf"for\s+a\s+(?:term|period)\s+of\s+{NUMBER}\s+(?:year|month)",
+            ["year", "month"],
+        ),
+    ],
+    "baseRent": [
+        LeasePattern(
+            rf"base\s+rent[:\s]*\$?{AMOUNT}\s*(?:per\s+month|monthly|/month)",
+            ["month"],
+        ),
+        LeasePattern(rf"monthly\s+rent[:\s]*\$?{AMOUNT}", ["month"]),
+        LeasePattern(
+            rf"rent[:\s]*\$?{AMOUNT}\s*(?:per\s+month|monthly|/month)",
+            ["month"],
+        ),
+        LeasePattern(
+            rf"\$?{AMOUNT}\s*(?:per\s+month|monthly|/month)(?:\s+rent)?",
+            ["month"],
+        ),
+    ],
+    "escalation": [
+        LeasePattern(rf"(?:escalat|increas){TO_PERCENT}", ["escalat", "increas"]),
+        LeasePattern(
+            rf"(?:annual|yearly)\s+(?:escalat|increas){TO_PERCENT}",
+            ["escalat", "increas"],
+        ),
+        LeasePattern(
+            rf"rent\s+(?:shall\s+)?(?:escalat|increas){TO_PERCENT}",
+            ["escalat", "increas"],
+        ),
+    ],
+    "renewal": [
+        LeasePattern(
+            rf"(?:renewal|extend|extension)\s+option[s]?{TO_CLAUSE_END}",
+            ["renew", "exten"],
+        ),
+        LeasePattern(
+            r"tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+"
+            rf"(?:renew|extend){TO_CLAUSE_END}",
+            ["renew", "exten"],
+        ),
+        LeasePattern(
+            rf"(?:renew|extend)\s+(?:this\s+)?lease{TO_CLAUSE_END}", ["renew", "exten"]
+        ),
+    ],
+    "termination": [
+        LeasePattern(rf"(?:early\s+)?terminat{TO_CLAUSE_END}", ["terminat"]),
+        LeasePattern(
+            r"tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+"
+            rf"terminat{TO_CLAUSE_END}",
+            ["terminat"],
+        ),
+        LeasePattern(
+            rf"(?:break|cancel){TO_PERIOD}lease{TO_CLAUSE_END}", ["break", "cancel"]
+        ),
+    ],
+    "use": [
+        LeasePattern(
+            rf"(?:permitted|allowed)\s+use[s]?{TO_CLAUSE_END}", ["permitted", "allowed"]
+        ),
+        LeasePattern(
+            rf"(?:prohibited|forbidden|not\s+permitted)\s+use[s]?{TO_CLAUSE_END}",
+            ["prohibited", "forbidden", "permitted"],
+        ),
+        LeasePattern(
+            rf"premises\s+(?:shall|may)\s+(?:only\s+)?be\s+used{TO_CLAUSE_END}",
+            ["premises"],
+        ),
+        LeasePattern(
+            rf"tenant\s+(?:shall|may)\s+use\s+(?:the\s+)?premises{TO_CLAUSE_END}",
+            ["premises"],
+        ),
+    ],
+    "assignment": [
+        LeasePattern(rf"(?:assignment|assign){TO_CLAUSE_END}", ["assign"]),
+        LeasePattern(
+            rf"(?:sublet|subletting|sublease){TO_CLAUSE_END}", ["sublet", "sublease"]
+        ),
+        LeasePattern(
+            rf"tenant\s+(?:may|shall)\s+not\s+(?:assign|sublet){TO_CLAUSE_END}",
+            ["assign", "sublet"],
+        ),
+        LeasePattern(
+            rf"(?:transfer|convey){TO_PERIOD}lease{TO_CLAUSE_END}",
+            ["transfer", "convey"],
+        ),
+    ],
+}
+
+ANCHORS = sorted(
+    {
+        anchor
+        for patterns in LEASE_PATTERNS.values()
+        for pattern in patterns
+        for anchor in pattern.anchors
+    }
+)
+
+
+class LeaseTermScanner:
+    """
+    Runs the lease-term patterns over a document near their anchor terms
+
+    Where each anchor occurs is found when the scanner is made, with a quick
+    substring search of the lowercased text per anchor. Each pattern then
+    only runs over windows either side of its own anchors as wide as its
+    longest match, merged where they overlap, so it finds the same matches
+    as over the whole text while the regex work grows with how often the
+    terms appear rather than with the length of the document.
+
+    Given the document's clause index, patterns run over each sentence that
+    contains one of their anchors instead, so matches don't run across
+    sentences, and source() can give the page of a match.
+
+    Matching inside budget() stops once the budget is spent, as if there
+    were no more matches; the extractors that ran out are listed in
+    `exceeded`.
+    """
+
+    def __init__(self, text: str, clause_index: Optional[ClauseIndex] = None):
+        self.text = text
+        self.clause_index = clause_index
+        self._anchor_positions = _find_anchors(text)
+        self._spans: Dict[Tuple[Tuple[str, ...], int], List[Tuple[int, int]]] = {}
+        self._extractor: Optional[str] = None
+        self._deadline: Optional[float] = None
+        self._budget_seconds = 0.0
+        self.exceeded: List[str] = []
+
+    @contextmanager
+    def budget(
+        self, extractor: str, seconds: float = LEASE_EXTRACTOR_BUDGET_SECONDS
+    ) -> Iterator[None]:
+        """Limit the time spent matching by one extractor"""
+        self._extractor = extractor
+        self._budget_seconds = seconds
+        self._deadline = time.monotonic() + seconds
+        try:
+            yield
+        finally:
+            self._extractor = None
+            self._deadline = None
+
+    def _out_of_time(self) -> bool:
+        if self._deadline is None or time.monotonic() < self._deadline:
+            return False
+
+        if self._extractor not in self.exceeded:
+            self.exceeded.append(self._extractor)
+            logger.warning(
+                f"Lease term extractor {self._extractor} ran out of its "
+                f"{self._budget_seconds}s budget on {len(self.text)} "
+                f"characters, keeping the matches found so far"
+            )
+        return True
+
+    def get_spans(self, pattern: LeasePattern) -> List[Tuple[int, int]]:
+        """
+        Get the (start, end) ranges to match a pattern in around its anchors:
+        the sentences containing them, or merged windows without an index
+        """
+        anchors = pattern.anchors
+        window = pattern.max_length if self.clause_index is None else 0
+        spans = self._spans.get((anchors, window))
+        if spans is not None:
+            return spans
+
+        spans = []
+        positions = merge(*(self._anchor_positions[anchor] for anchor in anchors))
+        if self.clause_index is not None:
+            for position in positions:
+                sentence = self.clause_index.find_segment(position, SENTENCE)
+                if sentence is None:
+                    continue
+                span = (
+                    self.clause_index.starts[sentence],
+                    self.clause_index.ends[sentence],
+                )
+                if not spans or spans[-1] != span:
+                    spans.append(span)
+
+            self._spans[(anchors, window)] = spans
+            return spans
+
+        for position in positions:
+            start = max(0, position - window)
+            end = min(len(self.text), position + window)
+            if spans and start <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+            else:
+                spans.append((start, end))
+
+        self._spans[(anchors, window)] = spans
+        return spans
+
+    def finditer(self, pattern: LeasePattern) -> Iterator[Match]:
+        """Iterate over the pattern's matches in text order"""
+        for start, end in self.get_spans(pattern):
+            for match in pattern.regex.finditer(self.text, start, end):
+                if self._out_of_time():
+                    return
+                yield match
+            if self._out_of_time():
+                return
+
+    def find_clauses(self, pattern: LeasePattern) -> Iterator[Match]:
+        """
+        Iterate over the pattern's matches in text order, skipping clauses
+        that run on past its bounded repeat along with any later match up to
+        their closing period, where an unbounded pattern's match would end
+        """
+        resume_at = 0
+        for match in self.finditer(pattern):
+            if match.start() < resume_at:
+                continue
+            if not pattern.runs_on or match.group(0).endswith("."):
+                yield match
+                continue
+
+            # A sentence from the index ends the clause even without a period
+            limit = len(self.text)
+            if self.clause_index is not None:
+                sentence = self.clause_index.find_segment(match.start(), SENTENCE)
+                if sentence is not None:
+                    limit = self.clause_index.ends[sentence]
+            period = self.text.find(".", match.end(), limit)
+            resume_at = limit if period == -1 else period + 1
+
+    def source(self, match: Match, group: int = 0) -> Dict[str, Any]:
+        """Get a match group's offsets, less surrounding whitespace, and its page"""
+        start, end = match.span(group)
+        value = self.text[start:end]
+        if value.strip():
+            start += len(value) - len(value.lstrip())
+            end -= len(value) - len(value.rstrip())
+        page = (
+            self.clause_index.get_page(start) if self.clause_index is not None else None
+        )
+        return {"start": start, "end": end, "page": page}
+
+    def search(self, pattern: LeasePattern) -> Optional[Match]:
+        """Get the pattern's first match, or None"""
+        for start, end in self.get_spans(pattern):
+            if self._out_of_time():
+                return None
+            match = pattern.regex.search(self.text, start, end)
+            if match:
+                return match
+        return None
+
+
+def _find_anchors(text: str) -> Dict[str, List[int]]:
+    """
+    Find the start of every occurrence of every anchor, overlaps included
+
+    One str.find() loop per anchor over the lowercased text; each is a fast
+    substring search, so this costs little next to running the patterns.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # A few characters lowercase to two, which would shift the positions
+        return _find_anchors_by_regex(text)
+
+    positions: Dict[str, List[int]] = {}
+    for anchor in ANCHORS:
+        found = []
+        index = lowered.find(anchor)
+        while index != -1:
+            found.append(index)
+            index = lowered.find(anchor, index + 1)
+        positions[anchor] = found
+    return positions
+
+
+def _find_anchors_by_regex(text: str) -> Dict[str, List[int]]:
+    positions: Dict[str, List[int]] = {anchor: [] for anchor in ANCHORS}
+    for anchor in ANCHORS:
+        for match in re.finditer(f"(?={re.escape(anchor)})", text, re.IGNORECASE):
+            positions[anchor].append(match.start())
+    return positions
@@ -1,12 +1,14 @@
 import asyncio
 import io
+import json
 import logging
 import os
 import shutil
+import time
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import uvicorn
 from fastapi import (
@@ -16,44 +18,72 @@ from fastapi import (
     Form,
     HTTPException,
     Request,
+    Response,
     UploadFile,
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    EVENTS_TOKEN_EXPIRE_SECONDS,
     authenticate_user_cognito,
     create_access_token,
+    create_events_token,
     get_password_hash,
     register_user_cognito,
+    verify_events_token,
     verify_token,
 )
+from aws_clients import get_capabilities, probe_capabilities_in_background
+from clause_index import SEGMENT_KINDS, ClauseIndex, build_clause_index
+from document_events import document_events
 from document_generator import document_generator
+from extraction_cache import get_extraction_cache_stats
+from extraction_engines import get_engine_stats, get_engine_throughput
+from job_queue import (
+    cancel_document_jobs,
+    enqueue_job,
+    enqueue_jobs,
+    get_queue_wait_stats,
+    has_active_job,
+)
 from models import (
     Document,
     DocumentFeedback,
     DocumentStatus,
     FeedbackType,
+    JobPriority,
+    SessionLocal,
     User,
     create_tables,
     get_db,
 )
+from ocr_service import estimate_extraction_seconds
+from pipeline import PIPELINE_STAGES, get_checkpoint_before, get_remaining_stages
+from preflight import PreflightError, preflight_document
 from processing_queue import (
-    add_document_to_queue,
+    PROCESSING_PIPELINE_ENABLED,
+    PROCESSING_RETRY_AFTER_SECONDS,
+    QueueFullError,
     initialize_processing_queue,
     processing_queue,
     shutdown_processing_queue,
 )
 from s3_service import (
+    LOCAL_STORAGE_PATH,
     generate_presigned_download_url,
     generate_presigned_upload_url,
     get_file_size_mb,
     validate_file_type,
 )
+from tesseract_pool import log_ocr_backend
+from text_layout import TextLayout, get_layout_footprint
 
 logger = logging.getLogger(__name__)
 
@@ -72,12 +102,51 @@ app.add_middleware(
 )
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Status streams re-check the document on every in-process pipeline event, or
+# at this interval when the pipeline runs in a standalone worker
+DOCUMENT_EVENTS_POLL_INTERVAL = float(os.getenv("DOCUMENT_EVENTS_POLL_INTERVAL", "2"))
+DOCUMENT_EVENTS_KEEPALIVE_SECONDS = 15
+
+# Largest number of documents accepted by one POST /documents/batch
+DOCUMENT_BATCH_MAX_SIZE = int(os.getenv("DOCUMENT_BATCH_MAX_SIZE", "500"))
+
+# Document columns filled in by the preflight check of local uploads
+PREFLIGHT_COLUMNS = (
+    "file_size_bytes",
+    "page_count",
+    "is_encrypted",
+    "has_text_layer",
+    "estimated_extraction_seconds",
+)
+
+
+class DocumentRegistration(BaseModel):
+    filename: str
+    original_filename: str
+    file_size: Optional[str] = None
+    mime_type: str
+    s3_key: str
+    s3_bucket: str
+
+
+class DocumentBatchRequest(BaseModel):
+    documents: List[DocumentRegistration]
+    priority: str = "bulk"
 
 
 @app.on_event("startup")
 async def startup_event():
     create_tables()
-    asyncio.create_task(initialize_processing_queue())
+    # AWS services are probed off the startup path; until a probe finishes,
+    # first use of the service waits for it
+    probe_capabilities_in_background()
+    if PROCESSING_PIPELINE_ENABLED:
+        log_ocr_backend()
+        asyncio.create_task(initialize_processing_queue())
+    else:
+        logger.info("Processing pipeline disabled, jobs are left to standalone workers")
 
 
 @app.on_event("shutdown")
@@ -95,11 +164,32 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "legal-ease-ai-api",
-        "queue_size": processing_queue.get_queue_size(),
+        "queue_size": await asyncio.to_thread(processing_queue.get_queue_size),
         "processing_count": processing_queue.get_processing_count(),
+        "pipeline_enabled": PROCESSING_PIPELINE_ENABLED,
+        "executor": processing_queue.executor_mode,
+        "aws_services": get_capabilities(),
     }
 
 
+def _parse_priority(priority: str) -> JobPriority:
+    try:
+        return JobPriority[priority.upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid priority, expected 'interactive' or 'bulk'",
+        )
+
+
+def _queue_full_exception(error: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Document processing queue is full, please retry later",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
 @app.post("/auth/register")
 async def register(
     email: str = Form(...),
@@ -220,6 +310,43 @@ async def get_me(current_user: User = Depends(get_current_user)):
     }
 
 
+@app.get("/queue/stats")
+async def get_queue_stats(
+    window_seconds: int = 3600,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """The caller's queue depth and queue-wait times, and the queue's saturation"""
+    return {
+        "saturation": await asyncio.to_thread(processing_queue.get_saturation),
+        "queue_wait": await asyncio.to_thread(
+            get_queue_wait_stats, db, window_seconds, current_user.id
+        ),
+    }
+
+
+@app.get("/extraction-cache/stats")
+async def get_extraction_cache_statistics(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Size of the extracted-text cache and how often documents hit it"""
+    return get_extraction_cache_stats(db)
+
+
+@app.get("/extraction-engines/stats")
+async def get_extraction_engine_statistics(
+    window_seconds: int = 86400,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Registered extraction engines, their declared costs and measured throughput"""
+    return {
+        "engines": get_engine_stats(),
+        "throughput": get_engine_throughput(db, window_seconds),
+    }
+
+
 @app.post("/documents/upload-url")
 async def get_upload_url(
     filename: str = Form(...),
@@ -260,16 +387,23 @@ async def create_document(
     mime_type: str = Form(...),
     s3_key: str = Form(...),
     s3_bucket: str = Form(...),
+    priority: str = Form("interactive"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     document_id = str(uuid.uuid4())
+    job_priority = _parse_priority(priority)
+
+    try:
+        processing_queue.ensure_capacity(db)
+    except QueueFullError as e:
+        raise _queue_full_exception(e)
 
+    preflight_columns = {}
     if s3_bucket == "local-storage":
+        local_file_path = Path(LOCAL_STORAGE_PATH) / s3_key
         if file is not None:
             try:
-                from s3_service import LOCAL_STORAGE_PATH
-
                 uploads_dir = Path(LOCAL_STORAGE_PATH)
                 uploads_dir.mkdir(parents=True, exist_ok=True)
 
@@ -288,6 +422,10 @@ async def create_document(
         else:
             print(f"File already uploaded to local storage at: {s3_key}")
 
+        preflight_columns = await asyncio.to_thread(
+            _preflight_local_file, local_file_path, mime_type
+        )
+
     db_document = Document(
         id=document_id,
         user_id=current_user.id,
@@ -299,23 +437,35 @@ async def create_document(
         s3_bucket=s3_bucket,
         status=DocumentStatus.UPLOADED,
     )
+    for column, value in preflight_columns.items():
+        setattr(db_document, column, value)
 
     db.add(db_document)
-    db.commit()
-    db.refresh(db_document)
+    db.flush()
 
-    try:
-        job_id = add_document_to_queue(
+    if db_document.status == DocumentStatus.FAILED:
+        # Files that could never be processed fail now, not after retries
+        db.commit()
+        db.refresh(db_document)
+    else:
+        # The document and its processing job are committed together, so a
+        # crash can never leave a registered document without a job
+        job = enqueue_job(
+            db,
             document_id=db_document.id,
             user_id=current_user.id,
             s3_key=s3_key,
             s3_bucket=s3_bucket,
+            priority=job_priority,
+            estimated_seconds=db_document.estimated_extraction_seconds,
         )
+        db.commit()
+        db.refresh(db_document)
+
+        processing_queue.notify_new_job()
         print(
-            f"Added document {db_document.id} to processing queue with job ID: {job_id}"
+            f"Added document {db_document.id} to processing queue with job ID: {job.id}"
         )
-    except Exception as e:
-        print(f"Failed to add document to processing queue: {e}")
 
     return {
         "id": db_document.id,
@@ -324,11 +474,181 @@ async def create_document(
         "fileSize": db_document.file_size,
         "mimeType": db_document.mime_type,
         "status": db_document.status.value,
+        "error": db_document.extraction_error,
+        "pageCount": db_document.page_count,
         "createdAt": db_document.created_at.isoformat(),
         "updatedAt": db_document.updated_at.isoformat(),
     }
 
 
+def _preflight_local_file(file_path: Path, mime_type: Optional[str]) -> dict:
+    """
+    Check a locally stored upload before it is queued
+
+    Returns Document column values: what the preflight check found and the
+    estimated extraction time, or a FAILED status and the reason for files
+    that could never be processed.
+    """
+    try:
+        preflight = preflight_document(str(file_path), mime_type)
+    except PreflightError as e:
+        print(f"Preflight rejected {file_path}: {e}")
+        return {"status": DocumentStatus.FAILED, "extraction_error": str(e)}
+    except FileNotFoundError:
+        return {
+            "status": DocumentStatus.FAILED,
+            "extraction_error": "File was not found in local storage",
+        }
+
+    return {
+        "mime_type": preflight["mime_type"],
+        "file_size_bytes": preflight["file_size"],
+        "page_count": preflight["page_count"],
+        "is_encrypted": preflight["is_encrypted"],
+        "has_text_layer": preflight["has_text_layer"],
+        "estimated_extraction_seconds": estimate_extraction_seconds(preflight),
+    }
+
+
+@app.post("/documents/batch")
+async def create_documents_batch(
+    batch: DocumentBatchRequest,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Register and enqueue already uploaded documents in one transaction
+
+    Invalid items are rejected individually. Files that fail the preflight
+    check are registered as failed documents, as POST /documents does. When
+    the queue can't take the whole batch the documents beyond its capacity
+    are rejected with "queue_full" and can be resubmitted after Retry-After.
+    """
+    job_priority = _parse_priority(batch.priority)
+
+    if not batch.documents:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="No documents to register"
+        )
+    if len(batch.documents) > DOCUMENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many documents in batch (maximum {DOCUMENT_BATCH_MAX_SIZE})",
+        )
+
+    results = []
+    valid = []
+    failed = []
+    seen_keys = set()
+    preflight_columns = {}
+    for index, item in enumerate(batch.documents):
+        if not validate_file_type(item.mime_type, item.filename):
+            error = "Unsupported file type, only PDF and DOCX files are allowed"
+        elif item.s3_key in seen_keys:
+            error = "Duplicate s3_key in batch"
+        else:
+            error = None
+            seen_keys.add(item.s3_key)
+            if item.s3_bucket == "local-storage":
+                columns = await asyncio.to_thread(
+                    _preflight_local_file,
+                    Path(LOCAL_STORAGE_PATH) / item.s3_key,
+                    item.mime_type,
+                )
+                preflight_columns[index] = columns
+            if preflight_columns.get(index, {}).get("status") == DocumentStatus.FAILED:
+                failed.append(index)
+            else:
+                valid.append(index)
+
+        results.append(
+            {
+                "index": index,
+                "id": None,
+                "jobId": None,
+                "filename": item.filename,
+                "status": "rejected" if error else None,
+                "error": error,
+            }
+        )
+
+    capacity = 0
+    if valid:
+        try:
+            capacity = processing_queue.ensure_capacity(db, jobs=len(valid))
+        except QueueFullError as e:
+            raise _queue_full_exception(e)
+
+    accepted, over_capacity = valid[:capacity], valid[capacity:]
+    for index in over_capacity:
+        results[index]["status"] = "rejected"
+        results[index]["error"] = "queue_full"
+    if over_capacity:
+        response.headers["Retry-After"] = str(PROCESSING_RETRY_AFTER_SECONDS)
+
+    now = datetime.utcnow()
+    rows = []
+    for index in accepted + failed:
+        item = batch.documents[index]
+        # Every row needs the same keys for the bulk insert
+        columns = preflight_columns.get(index, {})
+        rows.append(
+            {
+                "id": str(uuid.uuid4()),
+                "user_id": current_user.id,
+                "filename": item.filename,
+                "original_filename": item.original_filename,
+                "file_size": item.file_size,
+                "mime_type": columns.get("mime_type", item.mime_type),
+                "s3_key": item.s3_key,
+                "s3_bucket": item.s3_bucket,
+                "status": columns.get("status", DocumentStatus.UPLOADED),
+                "extraction_error": columns.get("extraction_error"),
+                "created_at": now,
+                "updated_at": now,
+                **{column: columns.get(column) for column in PREFLIGHT_COLUMNS},
+            }
+        )
+
+    if rows:
+        # Documents and jobs are written with one statement each and committed
+        # together, so a batch is either fully registered or not at all
+        db.execute(insert(Document), rows)
+        job_ids = enqueue_jobs(db, rows[: len(accepted)], job_priority)
+        db.commit()
+
+        for index, row, job_id in zip(accepted, rows, job_ids):
+            results[index].update(
+                {
+                    "id": row["id"],
+                    "jobId": job_id,
+                    "status": DocumentStatus.PROCESSING.value,
+                }
+            )
+        for index, row in zip(failed, rows[len(accepted) :]):
+            results[index].update(
+                {
+                    "id": row["id"],
+                    "status": DocumentStatus.FAILED.value,
+                    "error": row["extraction_error"],
+                }
+            )
+
+        if accepted:
+            processing_queue.notify_new_job()
+        logger.info(
+            f"Registered {len(rows)} documents for user {current_user.id} in one batch"
+        )
+
+    return {
+        "accepted": len(accepted),
+        "failed": len(failed),
+        "rejected": len(results) - len(accepted) - len(failed),
+        "documents": results,
+    }
+
+
 @app.get("/documents")
 async def get_user_documents(
     current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
@@ -396,6 +716,225 @@ async def get_document(
     }
 
 
+@app.get("/documents/{document_id}/layout")
+async def get_document_layout(
+    document_id: str,
+    page: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Lines of the document with their page, bounding box and OCR confidence"""
+    row = (
+        db.query(Document.text_layout)
+        .filter(Document.id == document_id, Document.user_id == current_user.id)
+        .first()
+    )
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    if row.text_layout is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No layout was extracted for this document",
+        )
+
+    layout = TextLayout.decode(row.text_layout)
+    return {
+        "documentId": document_id,
+        "lines": list(layout.lines(page)),
+        "footprint": get_layout_footprint(layout, row.text_layout),
+    }
+
+
+@app.get("/documents/{document_id}/clauses")
+async def get_document_clauses(
+    document_id: str,
+    kind: Optional[str] = None,
+    page: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Sections, sentences and clauses of the document with their character
+    offsets into the extracted text and their page, for highlighting the
+    sources of extracted terms
+    """
+    if kind is not None and kind not in SEGMENT_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid kind, expected one of: {', '.join(SEGMENT_KINDS)}",
+        )
+
+    row = (
+        db.query(Document.extracted_text, Document.clause_index)
+        .filter(Document.id == document_id, Document.user_id == current_user.id)
+        .first()
+    )
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+    if row.extracted_text is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No text was extracted for this document",
+        )
+
+    # Documents extracted before the index existed get one without pages
+    index = (
+        ClauseIndex.decode(row.clause_index)
+        if row.clause_index is not None
+        else build_clause_index(row.extracted_text)
+    )
+    return {
+        "documentId": document_id,
+        "segments": list(index.segments(row.extracted_text, kind, page)),
+    }
+
+
+def _get_document_progress(document_id: str):
+    """Read only the status columns, never the extracted text or lease data"""
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(
+                Document.status,
+                Document.pipeline_stage,
+                Document.extraction_error,
+                Document.updated_at,
+            )
+            .filter(Document.id == document_id)
+            .first()
+        )
+    finally:
+        db.close()
+
+    if row is None:
+        return None
+
+    return {
+        "documentId": document_id,
+        "status": row.status.value,
+        "stage": row.pipeline_stage,
+        "error": row.extraction_error,
+        "updatedAt": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+@app.post("/documents/{document_id}/events-token")
+async def create_document_events_token(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Issue a short-lived token for streaming a document's events with EventSource"""
+    document = (
+        db.query(Document.id)
+        .filter(Document.id == document_id, Document.user_id == current_user.id)
+        .first()
+    )
+
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+
+    return {
+        "token": create_events_token(current_user.email, document_id),
+        "expiresIn": EVENTS_TOKEN_EXPIRE_SECONDS,
+    }
+
+
+@app.get("/documents/{document_id}/events")
+async def stream_document_events(
+    document_id: str,
+    request: Request,
+    token: Optional[str] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream stage transitions and the final status as server-sent events
+
+    Browsers connect with ?token= from POST /documents/{id}/events-token, as
+    EventSource can't send an Authorization header; other clients may send
+    their bearer token as usual. The token is checked when the stream opens.
+    """
+    if token is not None:
+        token_data = verify_events_token(token, document_id)
+    elif credentials is not None:
+        token_data = verify_token(credentials.credentials)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    document = (
+        db.query(Document.id)
+        .join(User, Document.user_id == User.id)
+        .filter(Document.id == document_id, User.email == token_data.email)
+        .first()
+    )
+
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+
+    # Streams stay open for minutes, so give the connection back now rather
+    # than when the response ends; each poll opens its own session
+    db.close()
+
+    async def event_stream():
+        wakeup = document_events.subscribe(document_id)
+        last_progress = None
+        last_sent = time.monotonic()
+        try:
+            while not await request.is_disconnected():
+                wakeup.clear()
+                # A blocking query, so run it off the event loop
+                progress = await asyncio.to_thread(_get_document_progress, document_id)
+
+                if progress is None:
+                    deleted = json.dumps({"documentId": document_id})
+                    yield f"event: deleted\ndata: {deleted}\n\n"
+                    return
+
+                if progress != last_progress:
+                    yield f"event: status\ndata: {json.dumps(progress)}\n\n"
+                    last_progress = progress
+                    last_sent = time.monotonic()
+
+                    if progress["status"] in (
+                        DocumentStatus.COMPLETED.value,
+                        DocumentStatus.FAILED.value,
+                    ):
+                        return
+                elif time.monotonic() - last_sent > DOCUMENT_EVENTS_KEEPALIVE_SECONDS:
+                    yield ": keepalive\n\n"
+                    last_sent = time.monotonic()
+
+                try:
+                    await asyncio.wait_for(
+                        wakeup.wait(), timeout=DOCUMENT_EVENTS_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            document_events.unsubscribe(document_id, wakeup)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/documents/{document_id}/download")
 async def get_document_download_url(
     document_id: str,
@@ -444,11 +983,23 @@ async def delete_document(
     try:
         from s3_service import delete_file_from_s3
 
+        # Drop queued and running jobs with the document; workers notice the
+        # running job is gone and stop processing it
+        cancelled_jobs = cancel_document_jobs(db, document_id)
+
         delete_file_from_s3(document.s3_key)
 
         db.delete(document)
         db.commit()
 
+        if cancelled_jobs:
+            logger.info(
+                f"Cancelled {cancelled_jobs} processing jobs for deleted "
+                f"document {document_id}"
+            )
+            processing_queue.cancel_document(document_id)
+        document_events.publish(document_id)
+
         return {"message": "Document deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -458,6 +1009,73 @@ async def delete_document(
         )
 
 
+@app.post("/documents/{document_id}/reprocess")
+async def reprocess_document(
+    document_id: str,
+    from_stage: str = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Re-run processing from the first incomplete stage, or from from_stage"""
+    document = (
+        db.query(Document)
+        .filter(Document.id == document_id, Document.user_id == current_user.id)
+        .first()
+    )
+
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    if from_stage is not None:
+        if from_stage not in PIPELINE_STAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid stage, expected one of: {', '.join(PIPELINE_STAGES)}",
+            )
+        document.pipeline_stage = get_checkpoint_before(from_stage)
+
+    remaining_stages = get_remaining_stages(document.pipeline_stage)
+    if not remaining_stages:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "Document processing already completed, " "specify from_stage to re-run"
+            ),
+        )
+
+    if has_active_job(db, document.id):
+        raise HTTPException(status_code=409, detail="Document is already processing")
+
+    try:
+        processing_queue.ensure_capacity(db)
+    except QueueFullError as e:
+        raise _queue_full_exception(e)
+
+    # Otherwise the document shows the previous run's failure until a stage
+    # overwrites it
+    document.extraction_error = None
+    document.nlp_extraction_error = None
+    job = enqueue_job(
+        db,
+        document_id=document.id,
+        user_id=current_user.id,
+        s3_key=document.s3_key,
+        s3_bucket=document.s3_bucket,
+    )
+    db.commit()
+    db.refresh(document)
+
+    processing_queue.notify_new_job()
+    document_events.publish(document.id)
+
+    return {
+        "id": document.id,
+        "jobId": job.id,
+        "status": document.status.value,
+        "fromStage": remaining_stages[0],
+    }
+
+
 @app.get("/documents/{document_id}/download/pdf")
 async def download_document_pdf(
     document_id: str,
@@ -545,7 +1163,6 @@ async def local_upload(s3_key: str, request: Request):
             buffer.write(file_data)
 
         print(f"Successfully uploaded file to: {local_file_path}")
-        return {"message": "File uploaded successfully"}
 
     except Exception as e:
         print(f"Failed to upload file: {e}")
@@ -554,6 +1171,25 @@ async def local_upload(s3_key: str, request: Request):
             detail=f"Failed to upload file: {str(e)}",
         )
 
+    # Reject files that could never be processed before they are registered
+    try:
+        preflight = preflight_document(
+            str(local_file_path), request.headers.get("content-type", "").split(";")[0]
+        )
+    except PreflightError as e:
+        print(f"Preflight rejected {local_file_path}: {e}")
+        local_file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)
+        )
+
+    return {
+        "message": "File uploaded successfully",
+        "pageCount": preflight["page_count"],
+        "isEncrypted": preflight["is_encrypted"],
+        "hasTextLayer": preflight["has_text_layer"],
+    }
+
 
 @app.get("/documents/local-download/{s3_key:path}")
 async def local_download(s3_key: str):
@@ -2,9 +2,24 @@ import os
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import JSON, Boolean, Column, DateTime
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+)
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, String, Text, create_engine
+from sqlalchemy import (
+    Float,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    create_engine,
+    inspect,
+    text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -33,6 +48,18 @@ class DocumentStatus(str, Enum):
     FAILED = "failed"
 
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobPriority(int, Enum):
+    BULK = 0
+    INTERACTIVE = 10
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -63,8 +90,62 @@ class Document(Base):
     extracted_lease_data = Column(JSON, nullable=True)
     nlp_extraction_error = Column(Text, nullable=True)
     ai_summary = Column(Text, nullable=True)
+    pipeline_stage = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True, index=True)
+    extraction_cache_hit = Column(Boolean, nullable=True)
+    text_layout = Column(LargeBinary, nullable=True)
+    clause_index = Column(LargeBinary, nullable=True)
+    extraction_engine = Column(String, nullable=True)
+    # Found by the preflight check when the document is registered
+    file_size_bytes = Column(Integer, nullable=True)
+    page_count = Column(Integer, nullable=True)
+    is_encrypted = Column(Boolean, nullable=True)
+    has_text_layer = Column(Boolean, nullable=True)
+    estimated_extraction_seconds = Column(Float, nullable=True)
+    extraction_timings = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    document_id = Column(String, nullable=False, index=True)
+    user_id = Column(String, nullable=False, index=True)
+    s3_key = Column(String, nullable=False)
+    s3_bucket = Column(String, nullable=False)
+    status = Column(SQLEnum(JobStatus), default=JobStatus.QUEUED, index=True)
+    priority = Column(Integer, nullable=True, default=JobPriority.INTERACTIVE.value)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=4)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    last_wait_seconds = Column(Float, nullable=True)
+    estimated_seconds = Column(Float, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class ExtractionCacheEntry(Base):
+    __tablename__ = "extraction_cache"
+
+    content_hash = Column(String, primary_key=True)
+    extractor_version = Column(String, primary_key=True)
+    text = Column(Text, nullable=False)
+    pages = Column(JSON, nullable=True)
+    engine = Column(String, nullable=True)
+    ocr_pages = Column(JSON, nullable=True)
+    page_offsets = Column(JSON, nullable=True)
+    layout = Column(LargeBinary, nullable=True)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hit_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class DocumentFeedback(Base):
@@ -87,5 +168,28 @@ def get_db():
         db.close()
 
 
+def add_missing_columns():
+    """Add nullable columns introduced after a table was first created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {table.name} "
+                        f"ADD COLUMN {column.name} {column_type}"
+                    )
+                )
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
@@ -1,40 +1,34 @@
 import json
 import logging
 import os
-import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from aws_clients import get_client, is_available
+from clause_index import ClauseIndex
+from lease_patterns import LEASE_PATTERNS, LeaseTermScanner
 
 logger = logging.getLogger(__name__)
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 
-try:
-    comprehend_client = boto3.client("comprehend", region_name=AWS_REGION)
-    comprehend_client.list_entities_detection_jobs(MaxResults=1)
-    USE_COMPREHEND = True
-    logger.info("AWS Comprehend credentials found, using Comprehend for NLP")
-except (NoCredentialsError, ClientError) as e:
-    comprehend_client = None
-    USE_COMPREHEND = False
-    logger.info(f"AWS credentials not found ({e}), using local NLP processing")
-
-
-def extract_lease_terms(text: str) -> Dict[str, Any]:
+def extract_lease_terms(
+    text: str, clause_index: Optional[ClauseIndex] = None
+) -> Dict[str, Any]:
     """
     Extract key lease terms from document text using AWS Comprehend or local processing
 
+    The clause index built from the same text, when given, is what the
+    patterns are matched within. Besides the terms, the result's "sources"
+    has the same shape with each value's {"start", "end", "page"} in the text.
+
     Returns:
         Dict with structured lease data matching ExtractedLeaseData interface
     """
     try:
-        if USE_COMPREHEND:
-            return _extract_with_comprehend(text)
+        if is_available("comprehend"):
+            return _extract_with_comprehend(text, clause_index)
         else:
-            return _extract_with_local_nlp(text)
+            return _extract_with_local_nlp(text, clause_index)
     except Exception as e:
         logger.error(f"Failed to extract lease terms: {e}")
         return {
@@ -44,23 +38,26 @@ def extract_lease_terms(text: str) -> Dict[str, Any]:
             "options": None,
             "use_clauses": None,
             "assignment": None,
+            "sources": {},
             "error": str(e),
         }
 
 
-def _extract_with_comprehend(text: str) -> Dict[str, Any]:
+def _extract_with_comprehend(
+    text: str, clause_index: Optional[ClauseIndex] = None
+) -> Dict[str, Any]:
     """Extract lease terms using AWS Comprehend"""
     try:
-        entities_response = comprehend_client.detect_entities(
+        entities_response = get_client("comprehend").detect_entities(
             Text=text[:5000], LanguageCode="en"  # Comprehend has text length limits
         )
 
-        key_phrases_response = comprehend_client.detect_key_phrases(
+        key_phrases_response = get_client("comprehend").detect_key_phrases(
             Text=text[:5000], LanguageCode="en"
         )
 
         return _process_comprehend_results(
-            text, entities_response, key_phrases_response
+            text, entities_response, key_phrases_response, clause_index
         )
 
     except Exception as e:
@@ -68,22 +65,34 @@ def _extract_with_comprehend(text: str) -> Dict[str, Any]:
         raise
 
 
-def _extract_with_local_nlp(text: str) -> Dict[str, Any]:
+def _extract_with_local_nlp(
+    text: str, clause_index: Optional[ClauseIndex] = None
+) -> Dict[str, Any]:
     """Extract lease terms using local regex and pattern matching"""
     try:
-        result = {
-            "parties": _extract_parties(text),
-            "dates": _extract_dates(text),
-            "rent": _extract_rent_info(text),
-            "options": _extract_options(text),
-            "use_clauses": _extract_use_clauses(text),
-            "assignment": _extract_assignment_clauses(text),
-            "error": None,
+        scanner = LeaseTermScanner(text, clause_index)
+        extractors = {
+            "parties": _extract_parties,
+            "dates": _extract_dates,
+            "rent": _extract_rent_info,
+            "options": _extract_options,
+            "use_clauses": _extract_use_clauses,
+            "assignment": _extract_assignment_clauses,
         }
-
+        result = {}
+        sources: Dict[str, Any] = {}
+        for field, extractor in extractors.items():
+            # Each extractor gets its own time budget, so text that is slow to
+            # match for one still leaves time for the rest
+            with scanner.budget(field):
+                result[field] = extractor(scanner, sources)
+        result["error"] = None
+
+        categories = sum(1 for v in result.values() if v and v != "error")
         logger.info(
-            f"Local NLP extraction completed: found {sum(1 for v in result.values() if v and v != 'error')} data categories"
+            f"Local NLP extraction completed: found {categories} data categories"
         )
+        result["sources"] = sources
         return result
 
     except Exception as e:
@@ -91,42 +100,34 @@ def _extract_with_local_nlp(text: str) -> Dict[str, Any]:
         raise
 
 
-def _extract_parties(text: str) -> Optional[Dict[str, str]]:
+def _extract_parties(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[Dict[str, str]]:
     """Extract landlord and tenant information"""
     try:
         parties = {}
+        party_sources = {}
 
-        landlord_patterns = [
-            r'(?i)landlord["\s]*:?\s*([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership))',
-            r'(?i)lessor["\s]*:?\s*([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership))',
-            r"(?i)between\s+([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership))[^,]*(?:landlord|lessor)",
-            r"(?i)([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership))[^,]*(?:landlord|lessor)",
-        ]
-
-        tenant_patterns = [
-            r'(?i)tenant["\s]*:?\s*([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership|DBA)?[^,\n]*)',
-            r'(?i)lessee["\s]*:?\s*([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership|DBA)?[^,\n]*)',
-            r"(?i)and\s+([^,\n]+(?:LLC|Inc|Corporation|Corp|Company|LP|LLP|Partnership|DBA)?[^,\n]*)[^,]*(?:tenant|lessee)",
-            r"(?i)([A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)\s*(?:DBA|d/b/a)",
-            r"(?i)([A-Z][A-Z\s]+[A-Z])\s*(?:DBA|d/b/a)",
-        ]
-
-        for pattern in landlord_patterns:
-            match = re.search(pattern, text)
+        for pattern in LEASE_PATTERNS["landlord"]:
+            match = scanner.search(pattern)
             if match:
                 landlord = match.group(1).strip()
                 if len(landlord) > 5 and len(landlord) < 100:  # Reasonable length
                     parties["landlord"] = landlord
+                    party_sources["landlord"] = scanner.source(match, 1)
                     break
 
-        for pattern in tenant_patterns:
-            match = re.search(pattern, text)
+        for pattern in LEASE_PATTERNS["tenant"]:
+            match = scanner.search(pattern)
             if match:
                 tenant = match.group(1).strip()
                 if len(tenant) > 2 and len(tenant) < 100:  # Reasonable length
                     parties["tenant"] = tenant
+                    party_sources["tenant"] = scanner.source(match, 1)
                     break
 
+        if party_sources:
+            sources["parties"] = party_sources
         return parties if parties else None
 
     except Exception as e:
@@ -134,47 +135,24 @@ def _extract_parties(text: str) -> Optional[Dict[str, str]]:
         return None
 
 
-def _extract_dates(text: str) -> Optional[Dict[str, str]]:
+def _extract_dates(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[Dict[str, str]]:
     """Extract lease term dates"""
     try:
         dates = {}
+        date_sources = {}
+
+        for field in ("effectiveDate", "expirationDate", "duration"):
+            for pattern in LEASE_PATTERNS[field]:
+                match = scanner.search(pattern)
+                if match:
+                    dates[field] = match.group(1).strip()
+                    date_sources[field] = scanner.source(match, 1)
+                    break
 
-        effective_patterns = [
-            r"(?i)(?:effective|commencement|start|beginning)\s+date[:\s]*([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-            r"(?i)(?:effective|commence|begin)[s\w]*\s+on\s+([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-            r"(?i)lease\s+(?:term\s+)?(?:shall\s+)?(?:commence|begin)[s\w]*\s+([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-        ]
-
-        expiration_patterns = [
-            r"(?i)(?:expir|terminat|end)[es\w]*\s+(?:date[:\s]*)?([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-            r"(?i)(?:expir|terminat|end)[es\w]*\s+on\s+([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-            r"(?i)lease\s+(?:term\s+)?(?:shall\s+)?(?:expir|terminat|end)[es\w]*\s+([A-Za-z]+\s+\d{1,2},?\s+\d{4})",
-        ]
-
-        for pattern in effective_patterns:
-            match = re.search(pattern, text)
-            if match:
-                dates["effectiveDate"] = match.group(1).strip()
-                break
-
-        for pattern in expiration_patterns:
-            match = re.search(pattern, text)
-            if match:
-                dates["expirationDate"] = match.group(1).strip()
-                break
-
-        duration_patterns = [
-            r"(?i)(?:term|period)\s+of\s+(\d+)\s+(?:year|month)",
-            r"(?i)(\d+)[-\s](?:year|month)\s+(?:term|lease)",
-            r"(?i)for\s+a\s+(?:term|period)\s+of\s+(\d+)\s+(?:year|month)",
-        ]
-
-        for pattern in duration_patterns:
-            match = re.search(pattern, text)
-            if match:
-                dates["duration"] = match.group(1).strip()
-                break
-
+        if date_sources:
+            sources["dates"] = date_sources
         return dates if dates else None
 
     except Exception as e:
@@ -182,47 +160,38 @@ def _extract_dates(text: str) -> Optional[Dict[str, str]]:
         return None
 
 
-def _extract_rent_info(text: str) -> Optional[Dict[str, Any]]:
+def _extract_rent_info(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
     """Extract rent schedule and payment information"""
     try:
         rent_info = {}
+        rent_sources = {}
 
-        base_rent_patterns = [
-            r"(?i)base\s+rent[:\s]*\$?([\d,]+\.?\d*)\s*(?:per\s+month|monthly|/month)",
-            r"(?i)monthly\s+rent[:\s]*\$?([\d,]+\.?\d*)",
-            r"(?i)rent[:\s]*\$?([\d,]+\.?\d*)\s*(?:per\s+month|monthly|/month)",
-            r"(?i)\$?([\d,]+\.?\d*)\s*(?:per\s+month|monthly|/month)(?:\s+rent)?",
-        ]
-
-        for pattern in base_rent_patterns:
-            match = re.search(pattern, text)
+        for pattern in LEASE_PATTERNS["baseRent"]:
+            match = scanner.search(pattern)
             if match:
                 rent_amount = match.group(1).replace(",", "")
                 try:
                     amount = float(rent_amount)
                     if 100 <= amount <= 100000:  # Reasonable range
                         rent_info["baseRent"] = f"${rent_amount}"
+                        rent_sources["baseRent"] = scanner.source(match, 1)
                         break
                 except ValueError:
                     continue
 
-        escalation_patterns = [
-            r"(?i)(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
-            r"(?i)(?:annual|yearly)\s+(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
-            r"(?i)rent\s+(?:shall\s+)?(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
-        ]
-
-        escalation_clauses = []
-        for pattern in escalation_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                clause = match.group(0).strip()
-                if len(clause) < 200:  # Reasonable length
-                    escalation_clauses.append(clause)
-
+        escalation_clauses = _find_clauses(scanner, "escalation", 200)[:3]
         if escalation_clauses:
-            rent_info["escalationClauses"] = escalation_clauses[:3]  # Limit to 3
-
+            rent_info["escalationClauses"] = [
+                clause for clause, _ in escalation_clauses
+            ]
+            rent_sources["escalationClauses"] = [
+                source for _, source in escalation_clauses
+            ]
+
+        if rent_sources:
+            sources["rent"] = rent_sources
         return rent_info if rent_info else None
 
     except Exception as e:
@@ -230,45 +199,24 @@ def _extract_rent_info(text: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def _extract_options(text: str) -> Optional[Dict[str, List[str]]]:
+def _extract_options(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[Dict[str, List[str]]]:
     """Extract renewal and termination options"""
     try:
         options = {}
-
-        renewal_patterns = [
-            r"(?i)(?:renewal|extend|extension)\s+option[s]?[^.]*\.",
-            r"(?i)tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+(?:renew|extend)[^.]*\.",
-            r"(?i)(?:renew|extend)\s+(?:this\s+)?lease[^.]*\.",
-        ]
-
-        renewal_options = []
-        for pattern in renewal_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                option = match.group(0).strip()
-                if len(option) < 300:  # Reasonable length
-                    renewal_options.append(option)
-
-        if renewal_options:
-            options["renewalOptions"] = renewal_options[:3]  # Limit to 3
-
-        termination_patterns = [
-            r"(?i)(?:early\s+)?terminat[ion\w]*[^.]*\.",
-            r"(?i)tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+terminat[e\w]*[^.]*\.",
-            r"(?i)(?:break|cancel)[^.]*lease[^.]*\.",
-        ]
-
-        termination_clauses = []
-        for pattern in termination_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                clause = match.group(0).strip()
-                if len(clause) < 300:  # Reasonable length
-                    termination_clauses.append(clause)
-
-        if termination_clauses:
-            options["terminationClauses"] = termination_clauses[:3]  # Limit to 3
-
+        option_sources = {}
+
+        for field, clauses in (
+            ("renewalOptions", _find_clauses(scanner, "renewal", 300)[:3]),
+            ("terminationClauses", _find_clauses(scanner, "termination", 300)[:3]),
+        ):
+            if clauses:
+                options[field] = [clause for clause, _ in clauses]
+                option_sources[field] = [source for _, source in clauses]
+
+        if option_sources:
+            sources["options"] = option_sources
         return options if options else None
 
     except Exception as e:
@@ -276,79 +224,74 @@ def _extract_options(text: str) -> Optional[Dict[str, List[str]]]:
         return None
 
 
-def _extract_use_clauses(text: str) -> Optional[List[str]]:
+def _extract_use_clauses(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[List[str]]:
     """Extract permitted and prohibited uses"""
     try:
-        use_clauses = []
-
-        use_patterns = [
-            r"(?i)(?:permitted|allowed)\s+use[s]?[^.]*\.",
-            r"(?i)(?:prohibited|forbidden|not\s+permitted)\s+use[s]?[^.]*\.",
-            r"(?i)premises\s+(?:shall|may)\s+(?:only\s+)?be\s+used[^.]*\.",
-            r"(?i)tenant\s+(?:shall|may)\s+use\s+(?:the\s+)?premises[^.]*\.",
-        ]
+        use_clauses = _find_clauses(scanner, "use", 300)[:5]  # Limit to 5
+        if not use_clauses:
+            return None
 
-        for pattern in use_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                clause = match.group(0).strip()
-                if len(clause) < 300:  # Reasonable length
-                    use_clauses.append(clause)
-
-        return use_clauses[:5] if use_clauses else None  # Limit to 5
+        sources["use_clauses"] = [source for _, source in use_clauses]
+        return [clause for clause, _ in use_clauses]
 
     except Exception as e:
         logger.error(f"Failed to extract use clauses: {e}")
         return None
 
 
-def _extract_assignment_clauses(text: str) -> Optional[List[str]]:
+def _extract_assignment_clauses(
+    scanner: LeaseTermScanner, sources: Dict[str, Any]
+) -> Optional[List[str]]:
     """Extract assignment and subletting clauses"""
     try:
-        assignment_clauses = []
-
-        assignment_patterns = [
-            r"(?i)(?:assignment|assign)[^.]*\.",
-            r"(?i)(?:sublet|subletting|sublease)[^.]*\.",
-            r"(?i)tenant\s+(?:may|shall)\s+not\s+(?:assign|sublet)[^.]*\.",
-            r"(?i)(?:transfer|convey)[^.]*lease[^.]*\.",
-        ]
-
-        for pattern in assignment_patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                clause = match.group(0).strip()
-                if len(clause) < 300:  # Reasonable length
-                    assignment_clauses.append(clause)
+        assignment_clauses = _find_clauses(scanner, "assignment", 300)[:3]
+        if not assignment_clauses:
+            return None
 
-        return assignment_clauses[:3] if assignment_clauses else None  # Limit to 3
+        sources["assignment"] = [source for _, source in assignment_clauses]
+        return [clause for clause, _ in assignment_clauses]
 
     except Exception as e:
         logger.error(f"Failed to extract assignment clauses: {e}")
         return None
 
 
+def _find_clauses(
+    scanner: LeaseTermScanner, field: str, max_length: int
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Collect every match of a field's patterns shorter than max_length, pattern
+    by pattern, with where each one is in the text
+    """
+    clauses = []
+    for pattern in LEASE_PATTERNS[field]:
+        for match in scanner.find_clauses(pattern):
+            clause = match.group(0).strip()
+            if len(clause) < max_length:  # Reasonable length
+                clauses.append((clause, scanner.source(match)))
+    return clauses
+
+
 def _process_comprehend_results(
-    text: str, entities_response: Dict, key_phrases_response: Dict
+    text: str,
+    entities_response: Dict,
+    key_phrases_response: Dict,
+    clause_index: Optional[ClauseIndex] = None,
 ) -> Dict[str, Any]:
     """Process AWS Comprehend results to extract lease-specific terms"""
     try:
         entities = entities_response.get("Entities", [])
         key_phrases = key_phrases_response.get("KeyPhrases", [])
 
-        result = _extract_with_local_nlp(text)
+        result = _extract_with_local_nlp(text, clause_index)
 
-        persons = [
-            e["Text"] for e in entities if e["Type"] == "PERSON" and e["Score"] > 0.8
-        ]
+        persons = [e for e in entities if e["Type"] == "PERSON" and e["Score"] > 0.8]
         organizations = [
-            e["Text"]
-            for e in entities
-            if e["Type"] == "ORGANIZATION" and e["Score"] > 0.8
-        ]
-        dates = [
-            e["Text"] for e in entities if e["Type"] == "DATE" and e["Score"] > 0.8
+            e for e in entities if e["Type"] == "ORGANIZATION" and e["Score"] > 0.8
         ]
+        dates = [e for e in entities if e["Type"] == "DATE" and e["Score"] > 0.8]
 
         if not result.get("parties") and (persons or organizations):
             parties = {}
@@ -364,7 +307,10 @@ def _process_comprehend_results(
                     parties["tenant"] = persons[1]
 
             if parties:
-                result["parties"] = parties
+                result["parties"] = {key: e["Text"] for key, e in parties.items()}
+                result["sources"]["parties"] = {
+                    key: _entity_source(e, clause_index) for key, e in parties.items()
+                }
 
         if not result.get("dates") and dates:
             date_info = {}
@@ -375,13 +321,25 @@ def _process_comprehend_results(
                 date_info["effectiveDate"] = dates[0]
 
             if date_info:
-                result["dates"] = date_info
+                result["dates"] = {key: e["Text"] for key, e in date_info.items()}
+                result["sources"]["dates"] = {
+                    key: _entity_source(e, clause_index) for key, e in date_info.items()
+                }
 
         return result
 
     except Exception as e:
         logger.error(f"Failed to process Comprehend results: {e}")
-        return _extract_with_local_nlp(text)
+        return _extract_with_local_nlp(text, clause_index)
+
+
+def _entity_source(
+    entity: Dict[str, Any], clause_index: Optional[ClauseIndex]
+) -> Dict[str, Any]:
+    """Get where a Comprehend entity is, from its offsets into the text sent"""
+    start, end = entity["BeginOffset"], entity["EndOffset"]
+    page = clause_index.get_page(start) if clause_index is not None else None
+    return {"start": start, "end": end, "page": page}
 
 
 def validate_extracted_data(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,216 @@
+import logging
+import os
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    from PIL import Image
+
+    USE_PREPROCESSING = True
+except ImportError as e:
+    USE_PREPROCESSING = False
+    logger.info(f"NumPy or Pillow not found ({e}), OCR image preprocessing disabled")
+
+# Steps applied to rendered pages before tesseract, always in this order.
+# OCR_PREPROCESS takes a comma-separated subset, or "none".
+PREPROCESS_STEPS = ("grayscale", "downscale", "deskew", "binarize", "crop")
+OCR_PREPROCESS = [
+    step.strip()
+    for step in os.getenv("OCR_PREPROCESS", ",".join(PREPROCESS_STEPS)).split(",")
+    if step.strip() in PREPROCESS_STEPS
+]
+
+# Pages rendered above this resolution are scaled down to it; tesseract is
+# no more accurate on body text beyond ~300 DPI and much slower
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+
+# Skew is searched within +/- OCR_DESKEW_MAX_ANGLE degrees in steps of
+# OCR_DESKEW_STEP, and corrected when larger than OCR_DESKEW_MIN_ANGLE
+OCR_DESKEW_MAX_ANGLE = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "5"))
+OCR_DESKEW_STEP = float(os.getenv("OCR_DESKEW_STEP", "0.25"))
+OCR_DESKEW_MIN_ANGLE = 0.1
+
+# The skew search looks at a sample of ink pixels, which is plenty to find
+# the angle of the text lines
+DESKEW_SAMPLE_PIXELS = 100_000
+
+# Rows and columns at the page edge that are mostly dark are scanner borders;
+# what's left is cropped to the ink plus a margin
+BORDER_DARK_FRACTION = 0.5
+CROP_MARGIN_FRACTION = 0.02
+
+
+def preprocess_image(image: Any, dpi: int, steps: Optional[List[str]] = None) -> Any:
+    """
+    Prepare a rendered page for tesseract
+
+    Returns a new image and leaves the one passed in untouched, with the crop
+    in its info["page_box"]. Returns the image unchanged when NumPy is not
+    available or no steps are configured.
+    """
+    steps = OCR_PREPROCESS if steps is None else steps
+    if not USE_PREPROCESSING or not steps:
+        return image
+
+    # Every other step works on gray levels, so this one is always applied
+    if image.mode != "L":
+        image = image.convert("L")
+
+    output_dpi = get_output_dpi(dpi, steps)
+    if output_dpi < dpi:
+        scale = output_dpi / dpi
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS,
+        )
+
+    pixels = np.asarray(image, dtype=np.uint8)
+    threshold = otsu_threshold(pixels)
+
+    if "deskew" in steps:
+        angle = estimate_skew(pixels < threshold)
+        if abs(angle) >= OCR_DESKEW_MIN_ANGLE:
+            image = image.rotate(
+                -angle, resample=Image.BILINEAR, expand=False, fillcolor=255
+            )
+            pixels = np.asarray(image, dtype=np.uint8)
+
+    if "binarize" in steps:
+        pixels = np.where(pixels < threshold, 0, 255).astype(np.uint8)
+
+    height, width = pixels.shape
+    top, bottom, left, right = 0, height, 0, width
+    if "crop" in steps:
+        top, bottom, left, right = content_bounds(pixels < threshold)
+        pixels = pixels[top:bottom, left:right]
+
+    prepared = Image.fromarray(pixels)
+    # Where the result sits on the page, as (left, top, right, bottom)
+    # fractions, so OCR boxes can be mapped back to the whole page
+    prepared.info["page_box"] = (
+        left / width,
+        top / height,
+        right / width,
+        bottom / height,
+    )
+    return prepared
+
+
+def get_output_dpi(dpi: int, steps: Optional[List[str]] = None) -> int:
+    """Get the resolution of a page rendered at dpi once it is preprocessed"""
+    steps = OCR_PREPROCESS if steps is None else steps
+    if USE_PREPROCESSING and "downscale" in steps:
+        return min(dpi, OCR_TARGET_DPI)
+    return dpi
+
+
+def otsu_threshold(pixels: "np.ndarray") -> int:
+    """
+    Get the gray level that best separates ink from paper (Otsu's method)
+
+    Returns 0, so that no pixel counts as ink, for a blank or uniform page
+    with only one gray level to separate.
+    """
+    histogram = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+
+    background_weight = np.cumsum(histogram)
+    foreground_weight = background_weight[-1] - background_weight
+    cumulative_mean = np.cumsum(histogram * levels)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        background_mean = cumulative_mean / background_weight
+        foreground_mean = (cumulative_mean[-1] - cumulative_mean) / foreground_weight
+        between_variance = (
+            background_weight
+            * foreground_weight
+            * (background_mean - foreground_mean) ** 2
+        )
+
+    if not np.isfinite(between_variance).any():
+        return 0
+
+    # Pixels at or below the best level are ink
+    return int(np.nanargmax(between_variance)) + 1
+
+
+def estimate_skew(ink: "np.ndarray") -> float:
+    """
+    Estimate the page's skew in degrees from its ink mask
+
+    Projects a sample of ink pixels onto the vertical axis at each candidate
+    angle; text lines are level where the row profile is sharpest. Positive
+    angles are counter-clockwise, as PIL's Image.rotate() takes them.
+    """
+    rows, columns = np.nonzero(ink)
+    if rows.size < 100:
+        return 0.0
+
+    if rows.size > DESKEW_SAMPLE_PIXELS:
+        sample = np.random.default_rng(0).choice(
+            rows.size, DESKEW_SAMPLE_PIXELS, replace=False
+        )
+        rows, columns = rows[sample], columns[sample]
+
+    angles = np.arange(
+        -OCR_DESKEW_MAX_ANGLE,
+        OCR_DESKEW_MAX_ANGLE + OCR_DESKEW_STEP / 2,
+        OCR_DESKEW_STEP,
+    )
+    radians = np.deg2rad(angles)
+
+    # Row of every sampled pixel at every angle, as one (angles x pixels) array
+    projected = (
+        rows[None, :] * np.cos(radians)[:, None]
+        - columns[None, :] * np.sin(radians)[:, None]
+    )
+    projected = np.round(projected - projected.min(axis=1, keepdims=True)).astype(
+        np.int64
+    )
+
+    height = int(projected.max()) + 1
+    offsets = np.arange(len(angles))[:, None] * height
+    profiles = np.bincount(
+        (projected + offsets).ravel(), minlength=len(angles) * height
+    ).reshape(len(angles), height)
+    scores = (np.diff(profiles, axis=1).astype(np.float64) ** 2).sum(axis=1)
+
+    # Rows are counted downwards, so the projection angle has the opposite sign
+    return float(-angles[int(np.argmax(scores))])
+
+
+def content_bounds(ink: "np.ndarray") -> Tuple[int, int, int, int]:
+    """Get (top, bottom, left, right) of the ink, excluding dark scanner borders"""
+    height, width = ink.shape
+    row_dark = ink.mean(axis=1)
+    column_dark = ink.mean(axis=0)
+
+    top, bottom = _trim_border(row_dark)
+    left, right = _trim_border(column_dark)
+    if top >= bottom or left >= right:
+        return 0, height, 0, width
+
+    inner = ink[top:bottom, left:right]
+    ink_rows = np.flatnonzero(inner.any(axis=1))
+    ink_columns = np.flatnonzero(inner.any(axis=0))
+    if ink_rows.size == 0 or ink_columns.size == 0:
+        return 0, height, 0, width
+
+    margin_rows = int(height * CROP_MARGIN_FRACTION)
+    margin_columns = int(width * CROP_MARGIN_FRACTION)
+    return (
+        max(top, top + int(ink_rows[0]) - margin_rows),
+        min(bottom, top + int(ink_rows[-1]) + 1 + margin_rows),
+        max(left, left + int(ink_columns[0]) - margin_columns),
+        min(right, left + int(ink_columns[-1]) + 1 + margin_columns),
+    )
+
+
+def _trim_border(dark_fraction: "np.ndarray") -> Tuple[int, int]:
+    """Skip the runs of mostly dark lines at both ends of a profile"""
+    light = np.flatnonzero(dark_fraction < BORDER_DARK_FRACTION)
+    if light.size == 0:
+        return 0, 0
+    return int(light[0]), int(light[-1]) + 1
@@ -1,19 +1,68 @@
+import functools
+import importlib.util
+import io
 import logging
+import math
+import multiprocessing
 import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from botocore.exceptions import ClientError
 from fastapi import HTTPException
 
+from aws_clients import get_client, is_available
+from cancellation import cancel_scope, get_cancel_key, raise_if_cancelled
+from docx_stream import extract_docx_text
+from extraction_engines import (
+    ExtractionEngine,
+    get_engines,
+    register_engine,
+    select_engine,
+)
+from ocr_preprocessing import (
+    OCR_PREPROCESS,
+    OCR_TARGET_DPI,
+    get_output_dpi,
+    preprocess_image,
+)
+from preflight import DOCX_MIME_TYPES, PDF_MIME_TYPE, open_pdf, page_may_have_text
+from processing_errors import ProcessingCancelledError, is_transient_error
+from tesseract_pool import (
+    TESSERACT_AVAILABLE,
+    USE_TESSERACT_POOL,
+    image_to_data,
+    image_to_string,
+)
+from text_layout import Line, TextLayout, build_layout, text_lines
+from textract_async import (
+    TEXTRACT_MODE,
+    TEXTRACT_SQS_QUEUE_URL,
+    TEXTRACT_STUB,
+    LocalObjectStore,
+    LocalTextractStub,
+    detect_document_text,
+    textract_line,
+)
+from worker_processes import get_core_share, in_pipeline_process
+
 logger = logging.getLogger(__name__)
 
+# OCR functions return a page's text, or its text and its lines
+PageText = Union[str, Tuple[str, List[Line]]]
+
 try:
-    import pytesseract
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_path, pdfinfo_from_path
     from PIL import Image
 
+    if not TESSERACT_AVAILABLE:
+        raise ImportError("neither pytesseract nor tesserocr is installed")
+
     USE_TESSERACT = True
     logger.info("Tesseract OCR libraries found, enabling image-based PDF processing")
 except ImportError as e:
@@ -22,183 +71,311 @@ except ImportError as e:
         f"Tesseract OCR libraries not found ({e}), image-based PDF processing disabled"
     )
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+USE_PYPDF2 = importlib.util.find_spec("PyPDF2") is not None
+USE_PDFPLUMBER = importlib.util.find_spec("pdfplumber") is not None
 
-try:
-    textract_client = boto3.client("textract", region_name=AWS_REGION)
-    textract_client.list_adapters()
-    USE_TEXTRACT = True
-    logger.info("AWS Textract credentials found, using Textract for OCR")
-except (NoCredentialsError, ClientError) as e:
-    textract_client = None
-    USE_TEXTRACT = False
-    logger.info(f"AWS credentials not found ({e}), using local OCR libraries")
+# Pages of large PDFs are extracted in parallel and reassembled in page order.
+# OCR pages run on threads since tesseract does the work in its own process;
+# text layers are parsed in Python, so page ranges go to worker processes.
+# Inside the pipeline's own worker processes, which already run one per core
+# (PIPELINE_MAX_WORKERS), text layers are extracted inline and OCR threads are
+# capped at the process's share of the cores rather than multiplying them.
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", os.cpu_count() or 1))
+PDF_TEXT_WORKERS = int(os.getenv("PDF_TEXT_WORKERS", os.cpu_count() or 1))
+
+# Below this many pages, shipping page ranges to other processes costs more
+# than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+
+# Scanned PDFs are rasterized a window of pages at a time and each window's
+# images are freed once OCR'd, so memory stays flat however long the document
+# is. Windows hold at most OCR_RASTER_WINDOW_PAGES pages and keep the rendered
+# images under OCR_RASTER_MEMORY_MB; a page too large for that on its own is
+# rendered at a lower DPI.
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() in ("1", "true", "yes")
+OCR_RASTER_WINDOW_PAGES = int(os.getenv("OCR_RASTER_WINDOW_PAGES", "8"))
+OCR_RASTER_MEMORY_MB = int(os.getenv("OCR_RASTER_MEMORY_MB", "256"))
+
+# pdf2image holds the raw PPM output and the decoded image at the same time
+RASTER_COPIES = 2
+
+# Only pages whose text layer is missing or unusable are OCR'd: fewer than
+# PAGE_MIN_TEXT_CHARS characters, or mostly symbols and unmapped glyphs
+PAGE_MIN_TEXT_CHARS = int(os.getenv("PAGE_MIN_TEXT_CHARS", "20"))
+PAGE_MIN_ALNUM_RATIO = 0.3
+UNMAPPED_GLYPH_PATTERN = re.compile(r"\(cid:\d+\)")
+
+# With OCR_LAYOUT on, extraction also returns every line's page, bounding box
+# and confidence, compactly encoded (see text_layout.TextLayout), so clauses
+# can be highlighted and analysis re-run without OCR'ing again
+OCR_LAYOUT = os.getenv("OCR_LAYOUT", "false").lower() in ("1", "true", "yes")
+
+# Bump when a change to extraction would change its output, so that cached
+# extractions made by the old code are no longer used
+EXTRACTOR_VERSION = "3"
+
+if OCR_PAGE_WORKERS > 1:
+    # Parallelism comes from running pages side by side, so keep each
+    # tesseract process or engine to one thread instead of oversubscribing
+    # the cores
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+# Textract clients come from the shared registry and whether Textract is
+# usable is probed on first use, so importing this module needs no network
+_textract_stub = LocalTextractStub() if TEXTRACT_STUB else None
+_textract_stub_store = LocalObjectStore() if TEXTRACT_STUB else None
+
+
+def _use_textract() -> bool:
+    return TEXTRACT_STUB or is_available("textract")
+
+
+def _textract_client() -> Any:
+    return _textract_stub or get_client("textract")
 
 
 def extract_text_from_document(file_path: str, mime_type: str) -> Dict[str, Any]:
     """
-    Extract text from a document using AWS Textract or local libraries
+    Extract text from a document with the engines registered for its type
+
+    Engines are chosen by what a cheap probe of the file finds (its size, its
+    page count and whether its pages have fonts) and by their cost; see
+    extraction_engines. PDF pages with a usable text layer are read directly
+    and only the other pages are OCR'd, by whichever OCR engine is cheapest
+    for that many pages.
 
     Returns:
-        Dict with 'text', 'pages', 'error' keys
+        Dict with 'text', 'pages', 'error' and 'engine' keys, plus 'transient'
+        when the error may go away on retry (throttling, network or I/O
+        failures), 'engine_timings' (pages and seconds per engine used),
+        'page_timings' (seconds and method per page) and 'ocr_pages' for PDFs,
+        and 'layout' (an encoded TextLayout) with OCR_LAYOUT on
     """
     try:
-        if USE_TEXTRACT:
-            return _extract_with_textract(file_path, mime_type)
-        else:
-            return _extract_with_local_libraries(file_path, mime_type)
+        probe = probe_document(file_path, mime_type)
+        if mime_type == PDF_MIME_TYPE:
+            return _extract_from_pdf(file_path, probe)
+
+        engine = select_engine("document", probe)
+        if engine is None:
+            raise ValueError(f"Unsupported file type: {mime_type}")
+
+        started = time.perf_counter()
+        result = engine.extract(file_path)
+        result["engine_timings"] = {}
+        _record_engine_run(
+            engine,
+            len(result["pages"]),
+            time.perf_counter() - started,
+            result["engine_timings"],
+        )
+        return result
+    except ProcessingCancelledError:
+        raise
     except Exception as e:
         logger.error(f"Failed to extract text from {file_path}: {e}")
-        return {"text": None, "pages": [], "error": str(e)}
+        return {
+            "text": None,
+            "pages": [],
+            "error": str(e),
+            "transient": is_transient_error(e),
+        }
 
 
-def _extract_with_textract(file_path: str, mime_type: str) -> Dict[str, Any]:
-    """Extract text using AWS Textract"""
-    try:
-        with open(file_path, "rb") as document:
-            response = textract_client.detect_document_text(
-                Document={"Bytes": document.read()}
-            )
-
-        text_blocks = []
-        pages = []
-        current_page = []
+def probe_document(file_path: str, mime_type: str) -> Dict[str, Any]:
+    """
+    Cheaply describe a document for choosing its extraction engines
 
-        for block in response["Blocks"]:
-            if block["BlockType"] == "LINE":
-                line_text = block["Text"]
-                text_blocks.append(line_text)
-                current_page.append(line_text)
-            elif block["BlockType"] == "PAGE":
-                if current_page:
-                    pages.append("\n".join(current_page))
-                    current_page = []
+    Returns its 'mime_type' and 'file_size', and for PDFs 'page_count' and
+    'text_layer_pages', the number of pages with fonts or form XObjects and
+    so possibly text. Only the page tree is read, not the page contents; a
+    value is None when it can't be found out that way.
+    """
+    probe = {
+        "mime_type": mime_type,
+        "file_size": os.path.getsize(file_path),
+        "page_count": None,
+        "text_layer_pages": None,
+    }
+    if mime_type != PDF_MIME_TYPE:
+        return probe
 
-        if current_page:
-            pages.append("\n".join(current_page))
+    if USE_PYPDF2:
+        with open(file_path, "rb") as file:
+            pages = open_pdf(file).pages
+            probe["page_count"] = len(pages)
+            probe["text_layer_pages"] = sum(
+                1 for page in pages if page_may_have_text(page)
+            )
+    elif USE_TESSERACT:
+        probe["page_count"] = pdfinfo_from_path(file_path)["Pages"]
+    elif USE_PDFPLUMBER:
+        import pdfplumber
 
-        full_text = "\n".join(text_blocks)
+        with pdfplumber.open(file_path) as pdf:
+            probe["page_count"] = len(pdf.pages)
 
-        return {"text": full_text, "pages": pages, "error": None}
+    return probe
 
-    except Exception as e:
-        logger.error(f"Textract extraction failed: {e}")
-        raise
 
+def estimate_extraction_seconds(probe: Dict[str, Any]) -> Optional[float]:
+    """
+    Estimate how long extracting a document will take, for scheduling
 
-def _extract_with_local_libraries(file_path: str, mime_type: str) -> Dict[str, Any]:
-    """Extract text using local Python libraries"""
-    try:
-        if mime_type == "application/pdf":
-            return _extract_from_pdf(file_path)
-        elif mime_type in [
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "application/msword",
-        ]:
-            return _extract_from_docx(file_path)
+    Takes a probe_document() or preflight_document() result with the
+    document's 'mime_type' added, and costs it with the engines that would be
+    selected for it. Pages without fonts are costed as OCR'd.
+    """
+    page_count = probe.get("page_count")
+    if probe["mime_type"] != PDF_MIME_TYPE:
+        engine = select_engine("document", probe)
+        return engine.estimate_seconds(page_count or 1) if engine else None
+    if page_count is None:
+        return None
+
+    seconds = 0.0
+    ocr_pages = page_count
+    text_layer_engine = select_engine("text_layer", probe)
+    if text_layer_engine is not None and probe.get("text_layer_pages") != 0:
+        seconds += text_layer_engine.estimate_seconds(page_count)
+        if probe.get("text_layer_pages") is not None:
+            ocr_pages = page_count - probe["text_layer_pages"]
         else:
-            raise ValueError(f"Unsupported file type: {mime_type}")
+            ocr_pages = 0
 
-    except Exception as e:
-        logger.error(f"Local extraction failed: {e}")
-        raise
+    if ocr_pages:
+        ocr_engine = select_engine("ocr", probe, ocr_pages)
+        if ocr_engine is not None:
+            seconds += ocr_engine.estimate_seconds(
+                page_count if ocr_engine.whole_document else ocr_pages
+            )
+    return seconds
 
 
-def _extract_from_pdf(file_path: str) -> Dict[str, Any]:
-    """Extract text from PDF using PyPDF2, with fallback to OCR for image-based PDFs"""
-    try:
-        import PyPDF2
+def get_extractor_version() -> str:
+    """
+    Get the version that extraction results are cached under
 
-        with open(file_path, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            pages = []
-            text_blocks = []
-
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text.strip():
-                        pages.append(page_text)
-                        text_blocks.append(page_text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num}: {e}")
-                    pages.append(f"[Error extracting page {page_num + 1}]")
-
-            full_text = "\n\n".join(text_blocks)
-
-            if not full_text.strip() and USE_TESSERACT:
-                logger.info("No text extracted with PyPDF2, trying OCR with tesseract")
-                return _extract_from_pdf_with_ocr(file_path)
-
-            return {"text": full_text, "pages": pages, "error": None}
-
-    except ImportError:
-        return _extract_from_pdf_pdfplumber(file_path)
-    except Exception as e:
-        logger.error(f"PDF extraction failed: {e}")
-        raise
+    Includes the available OCR engines and the rendering settings, since the
+    same file extracted with different ones gives different text.
+    """
+    ocr_engines = "+".join(
+        engine.name for engine in get_engines("ocr") if engine.is_available()
+    )
+    grayscale = "gray" if OCR_GRAYSCALE else "color"
+    preprocess = "+".join(OCR_PREPROCESS) or "none"
+    return (
+        f"{EXTRACTOR_VERSION}:{ocr_engines or 'none'}:{OCR_DPI}:{grayscale}:"
+        f"{preprocess}@{OCR_TARGET_DPI}:{'layout' if OCR_LAYOUT else 'text'}"
+    )
 
 
-def _extract_from_pdf_pdfplumber(file_path: str) -> Dict[str, Any]:
-    """Extract text from PDF using pdfplumber as fallback"""
-    try:
-        import pdfplumber
+def _extract_from_pdf(file_path: str, probe: Dict[str, Any]) -> Dict[str, Any]:
+    """Read the PDF's text layer, then OCR only the pages where it is unusable"""
+    page_count = probe["page_count"]
+    engine_timings: Dict[str, Dict[str, Any]] = {}
+
+    text_layer_engine = select_engine("text_layer", probe)
+
+    # Scans have no fonts on any page, so there is no text layer to read
+    if text_layer_engine is None or probe["text_layer_pages"] == 0:
+        ocr_engine = select_engine("ocr", probe)
+        if ocr_engine is not None and page_count is not None:
+            logger.info(f"OCR'ing all {page_count} pages with {ocr_engine.name}")
+            page_results = _ocr_with_engine(
+                ocr_engine,
+                file_path,
+                list(range(1, page_count + 1)),
+                probe,
+                engine_timings,
+            )
+            return _assemble_pages(page_results, engine_timings)
+        if text_layer_engine is None:
+            raise ImportError("No text layer or OCR engine is available for PDFs")
 
-        pages = []
-        text_blocks = []
+    page_results = _extract_text_layer(
+        file_path, page_count, text_layer_engine, engine_timings
+    )
+    ocr_page_numbers = [
+        page["page"] for page in page_results if not _has_usable_text(page["text"])
+    ]
+    if not ocr_page_numbers:
+        return _assemble_pages(page_results, engine_timings)
+
+    ocr_engine = select_engine("ocr", probe, len(ocr_page_numbers))
+    if ocr_engine is None:
+        logger.warning(
+            f"{len(ocr_page_numbers)} of {page_count} pages have no usable text "
+            f"layer and no OCR engine is available"
+        )
+        return _assemble_pages(page_results, engine_timings)
 
-        with pdfplumber.open(file_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                try:
-                    page_text = page.extract_text()
-                    if page_text and page_text.strip():
-                        pages.append(page_text)
-                        text_blocks.append(page_text)
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num}: {e}")
-                    pages.append(f"[Error extracting page {page_num + 1}]")
-
-        full_text = "\n\n".join(text_blocks)
-
-        if not full_text.strip() and USE_TESSERACT:
-            logger.info("No text extracted with pdfplumber, trying OCR with tesseract")
-            return _extract_from_pdf_with_ocr(file_path)
-
-        return {"text": full_text, "pages": pages, "error": None}
-
-    except ImportError:
-        if USE_TESSERACT:
-            logger.info("pdfplumber not available, trying OCR with tesseract")
-            return _extract_from_pdf_with_ocr(file_path)
-        else:
-            raise ImportError(
-                "Neither PyPDF2 nor pdfplumber is available for PDF text extraction"
-            )
-    except Exception as e:
-        logger.error(f"PDF extraction with pdfplumber failed: {e}")
-        raise
+    logger.info(
+        f"OCR'ing {len(ocr_page_numbers)} of {page_count} pages without a "
+        f"usable text layer with {ocr_engine.name}"
+    )
+    ocr_results = {
+        page["page"]: page
+        for page in _ocr_with_engine(
+            ocr_engine, file_path, ocr_page_numbers, probe, engine_timings
+        )
+    }
+    page_results = [
+        _better_page_result(page, ocr_results.get(page["page"]))
+        for page in page_results
+    ]
+    return _assemble_pages(page_results, engine_timings)
+
+
+def _ocr_with_engine(
+    engine: ExtractionEngine,
+    file_path: str,
+    page_numbers: List[int],
+    probe: Dict[str, Any],
+    engine_timings: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    page_results = engine.extract(file_path, page_numbers)
+    _record_engine_run(
+        engine,
+        probe["page_count"] if engine.whole_document else len(page_results),
+        sum(page["seconds"] for page in page_results),
+        engine_timings,
+    )
+    return page_results
 
 
-def _extract_from_docx(file_path: str) -> Dict[str, Any]:
-    """Extract text from DOCX using python-docx"""
-    try:
-        from docx import Document
+def _record_engine_run(
+    engine: ExtractionEngine,
+    pages: int,
+    seconds: float,
+    engine_timings: Dict[str, Dict[str, Any]],
+):
+    """Record a run's throughput for the engine and in the extraction result"""
+    engine.record(pages, seconds)
+    engine_timings[engine.name] = {"pages": pages, "seconds": round(seconds, 4)}
 
-        doc = Document(file_path)
-        paragraphs = []
 
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                paragraphs.append(paragraph.text)
+def _extract_from_docx(file_path: str) -> Dict[str, Any]:
+    """
+    Extract text from DOCX by streaming its XML parts
 
-        full_text = "\n".join(paragraphs)
+    Headers, body paragraphs, table rows (cells joined with " | ") and
+    footers are read in document order without building python-docx's
+    object model.
+    """
+    try:
+        full_text = extract_docx_text(file_path)
 
         pages = [full_text] if full_text.strip() else []
+        result = {"text": full_text, "pages": pages, "error": None, "engine": "docx"}
+        if OCR_LAYOUT:
+            result["layout"] = _encode_layout(
+                build_layout([(1, text_lines(full_text))])
+            )
 
-        return {"text": full_text, "pages": pages, "error": None}
+        return result
 
-    except ImportError:
-        raise ImportError("python-docx is not available for DOCX text extraction")
     except Exception as e:
         logger.error(f"DOCX extraction failed: {e}")
         raise
@@ -235,48 +412,509 @@ def validate_extracted_text(text: str) -> bool:
     return True
 
 
-def _extract_from_pdf_with_ocr(file_path: str) -> Dict[str, Any]:
-    """Extract text from PDF using OCR (tesseract) for image-based PDFs"""
-    if not USE_TESSERACT:
-        raise ImportError("Tesseract OCR libraries not available")
+def _ocr_pdf_pages(
+    file_path: str, page_numbers: List[int], engine: str
+) -> List[Dict[str, Any]]:
+    """OCR the given 1-based pages, rasterizing them a window at a time"""
+    page_sizes = _get_page_sizes(file_path)
+    windows = _plan_raster_windows(
+        [(page_num, page_sizes[page_num - 1]) for page_num in page_numbers]
+    )
+    logger.info(
+        f"Converting {len(page_numbers)} PDF pages to images for OCR in "
+        f"{len(windows)} windows: {file_path}"
+    )
+
+    started = time.perf_counter()
+    cancel_key = get_cancel_key()
+    page_results = []
+    workers = max(1, min(OCR_PAGE_WORKERS, OCR_RASTER_WINDOW_PAGES, get_core_share()))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as pool:
+        for first_page, last_page, dpi in windows:
+            raise_if_cancelled()
+            images = convert_from_path(
+                file_path,
+                dpi=dpi,
+                grayscale=OCR_GRAYSCALE,
+                first_page=first_page,
+                last_page=last_page,
+            )
+            try:
+                page_results.extend(
+                    pool.map(
+                        lambda page: _ocr_page(
+                            page[0], page[1], dpi, engine, cancel_key
+                        ),
+                        enumerate(images, start=first_page - 1),
+                    )
+                )
+            finally:
+                for image in images:
+                    image.close()
+                del images
+
+    _log_page_timings("OCR", page_results, time.perf_counter() - started)
+    return page_results
+
+
+def _ocr_pdf_pages_textract_async(
+    file_path: str, page_numbers: List[int]
+) -> List[Dict[str, Any]]:
+    """OCR the whole PDF in one Textract job and keep the requested pages"""
+    started = time.perf_counter()
+    page_lines = detect_document_text(
+        file_path,
+        _textract_client(),
+        _textract_stub_store or get_client("s3"),
+        get_client("sqs") if TEXTRACT_SQS_QUEUE_URL else None,
+    )
+    elapsed = time.perf_counter() - started
+
+    # The job's time can't be split by page, so spread it evenly
+    page_results = [
+        {
+            "page": page_num,
+            "text": "\n".join(line[0] for line in page_lines.get(page_num, [])),
+            "lines": page_lines.get(page_num, []),
+            "error": None,
+            "method": "textract_async",
+            "seconds": elapsed / len(page_numbers),
+        }
+        for page_num in page_numbers
+    ]
+    _log_page_timings("Textract", page_results, elapsed)
+    return page_results
+
+
+def _ocr_pdf_textract_document(
+    file_path: str, page_numbers: List[int]
+) -> List[Dict[str, Any]]:
+    """OCR a single-page PDF by sending the file itself to Textract"""
 
+    def detect() -> PageText:
+        with open(file_path, "rb") as document:
+            response = _textract_client().detect_document_text(
+                Document={"Bytes": document.read()}
+            )
+        lines = [
+            textract_line(block)
+            for block in response["Blocks"]
+            if block["BlockType"] == "LINE"
+        ]
+        return "\n".join(line[0] for line in lines), lines
+
+    return [
+        _extract_page(page_num - 1, detect, "textract_document")
+        for page_num in page_numbers
+    ]
+
+
+def _get_page_sizes(file_path: str) -> List[Tuple[float, float]]:
+    """Get the width and height in points of every page"""
     try:
-        logger.info(f"Converting PDF to images for OCR: {file_path}")
-        images = convert_from_path(file_path)
+        with open(file_path, "rb") as file:
+            return [
+                (float(page.mediabox.width), float(page.mediabox.height))
+                for page in open_pdf(file).pages
+            ]
+    except Exception as e:
+        # Assume US letter pages when the PDF can't be parsed for its sizes
+        logger.warning(f"Could not read page sizes, assuming letter size: {e}")
+        return [(612.0, 792.0)] * pdfinfo_from_path(file_path)["Pages"]
 
-        pages = []
-        text_blocks = []
 
-        for page_num, image in enumerate(images):
-            try:
-                logger.info(f"Running OCR on page {page_num + 1}")
-                page_text = pytesseract.image_to_string(image, lang="eng")
-
-                if page_text.strip():
-                    pages.append(page_text)
-                    text_blocks.append(page_text)
-                    logger.info(
-                        f"Extracted {len(page_text)} characters from page {page_num + 1}"
-                    )
-                else:
-                    logger.warning(f"No text extracted from page {page_num + 1}")
-                    pages.append(f"[No text found on page {page_num + 1}]")
+def _raster_bytes(size: Tuple[float, float], dpi: int, grayscale: bool) -> float:
+    width, height = size
+    channels = 1 if grayscale else 3
+    return (width / 72 * dpi) * (height / 72 * dpi) * channels * RASTER_COPIES
+
 
-            except Exception as e:
-                logger.error(f"OCR failed for page {page_num + 1}: {e}")
-                pages.append(f"[OCR error on page {page_num + 1}: {str(e)}]")
+def _plan_raster_windows(
+    pages: List[Tuple[int, Tuple[float, float]]],
+    dpi: int = OCR_DPI,
+    grayscale: bool = OCR_GRAYSCALE,
+    window_pages: int = OCR_RASTER_WINDOW_PAGES,
+    memory_mb: int = OCR_RASTER_MEMORY_MB,
+) -> List[Tuple[int, int, int]]:
+    """
+    Group (page number, size) pairs into (first_page, last_page, dpi) windows
 
-        full_text = "\n\n".join(text_blocks)
+    Consecutive pages share a window while it stays within the page and
+    memory limits. Page numbers are 1-based and inclusive, as pdf2image takes
+    them.
+    """
+    memory_limit = memory_mb * 1024 * 1024
+    windows = []
+    window_bytes = 0
+
+    for page_num, size in pages:
+        page_dpi = dpi
+        page_bytes = _raster_bytes(size, page_dpi, grayscale)
+        if page_bytes > memory_limit:
+            page_dpi = max(1, int(dpi * math.sqrt(memory_limit / page_bytes)))
+            page_bytes = _raster_bytes(size, page_dpi, grayscale)
+            logger.warning(
+                f"Page {page_num} is too large to rasterize at {dpi} DPI, "
+                f"using {page_dpi} DPI"
+            )
 
-        logger.info(
-            f"OCR completed: extracted {len(full_text)} total characters from {len(images)} pages"
+        if windows:
+            first_page, last_page, window_dpi = windows[-1]
+            if (
+                page_num == last_page + 1
+                and window_dpi == page_dpi
+                and last_page - first_page + 1 < window_pages
+                and window_bytes + page_bytes <= memory_limit
+            ):
+                windows[-1] = (first_page, page_num, window_dpi)
+                window_bytes += page_bytes
+                continue
+
+        windows.append((page_num, page_num, page_dpi))
+        window_bytes = page_bytes
+
+    return windows
+
+
+def _ocr_page(
+    page_num: int, image: Any, dpi: int, engine: str, cancel_key: Optional[str]
+) -> Dict[str, Any]:
+    ocr = _textract_image_text if engine == "textract" else _tesseract_image_text
+    with cancel_scope(cancel_key):
+        return _extract_page(page_num, lambda: ocr(image, dpi), engine)
+
+
+def _tesseract_image_text(image: Any, dpi: int) -> PageText:
+    prepared = preprocess_image(image, dpi)
+    # Tell tesseract the resolution instead of letting it guess
+    output_dpi = get_output_dpi(dpi)
+    try:
+        if not OCR_LAYOUT:
+            return image_to_string(prepared, output_dpi)
+
+        data = image_to_data(prepared, output_dpi)
+        return _tesseract_lines(
+            data, prepared.size, prepared.info.get("page_box", (0, 0, 1, 1))
         )
+    finally:
+        if prepared is not image:
+            prepared.close()
+
+
+def _tesseract_lines(
+    data: Dict[str, List[Any]],
+    size: Tuple[int, int],
+    page_box: Tuple[float, float, float, float],
+) -> Tuple[str, List[Line]]:
+    """Group image_to_data's words into lines with page-relative boxes"""
+    width, height = size
+    box_left, box_top, box_right, box_bottom = page_box
+    x_scale = (box_right - box_left) / width
+    y_scale = (box_bottom - box_top) / height
+
+    words: Dict[Tuple[int, int, int], List[int]] = {}
+    for index, word in enumerate(data["text"]):
+        if word.strip() and float(data["conf"][index]) >= 0:
+            key = (
+                data["block_num"][index],
+                data["par_num"][index],
+                data["line_num"][index],
+            )
+            words.setdefault(key, []).append(index)
+
+    lines = []
+    blocks = []
+    for (block_num, _, _), indexes in words.items():
+        left = min(data["left"][i] for i in indexes)
+        top = min(data["top"][i] for i in indexes)
+        right = max(data["left"][i] + data["width"][i] for i in indexes)
+        bottom = max(data["top"][i] + data["height"][i] for i in indexes)
+        text = " ".join(data["text"][i] for i in indexes)
+        box = (
+            box_left + left * x_scale,
+            box_top + top * y_scale,
+            (right - left) * x_scale,
+            (bottom - top) * y_scale,
+        )
+        confidence = sum(float(data["conf"][i]) for i in indexes) / len(indexes)
+        lines.append((text, box, confidence))
 
-        return {"text": full_text, "pages": pages, "error": None}
+        # A blank line between blocks, as image_to_string separates them
+        if blocks and blocks[-1][0] == block_num:
+            blocks[-1][1].append(text)
+        else:
+            blocks.append((block_num, [text]))
 
+    return "\n\n".join("\n".join(texts) for _, texts in blocks), lines
+
+
+def _textract_image_text(image: Any, dpi: int) -> PageText:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    response = _textract_client().detect_document_text(
+        Document={"Bytes": buffer.getvalue()}
+    )
+    lines = [
+        textract_line(block)
+        for block in response["Blocks"]
+        if block["BlockType"] == "LINE"
+    ]
+    return "\n".join(line[0] for line in lines), lines
+
+
+def _extract_page(
+    page_num: int, extract: Callable[[], PageText], method: str
+) -> Dict[str, Any]:
+    """Extract one page, recording how long it took and any error"""
+    raise_if_cancelled()
+    started = time.perf_counter()
+    lines = None
+    try:
+        text, error = extract() or "", None
+        if isinstance(text, tuple):
+            text, lines = text
     except Exception as e:
-        logger.error(f"OCR extraction failed: {e}")
-        raise
+        if isinstance(e, ClientError) and is_transient_error(e):
+            # Retry the job rather than lose the page to throttling
+            raise
+        text, error = None, str(e)
+
+    return {
+        "page": page_num + 1,
+        "text": text,
+        "lines": lines,
+        "error": error,
+        "method": method,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _has_usable_text(text: Optional[str]) -> bool:
+    """Check whether a page's text layer is good enough to skip OCR"""
+    if not text:
+        return False
+
+    stripped = UNMAPPED_GLYPH_PATTERN.sub("", text).strip()
+    if len(stripped) < PAGE_MIN_TEXT_CHARS:
+        return False
+
+    alphanumeric_count = sum(1 for c in stripped if c.isalnum())
+    return alphanumeric_count / len(stripped) >= PAGE_MIN_ALNUM_RATIO
+
+
+def _better_page_result(
+    text_layer: Dict[str, Any], ocr: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Prefer the OCR'd page unless OCR found nothing where the text layer had some"""
+    if ocr is None:
+        return text_layer
+    if (ocr["error"] is not None or not ocr["text"].strip()) and (
+        text_layer["text"] and text_layer["text"].strip()
+    ):
+        return text_layer
+    return ocr
+
+
+def _extract_page_range_pypdf2(
+    file_path: str, start: int, end: int, cancel_key: Optional[str]
+) -> List[Dict[str, Any]]:
+    with cancel_scope(cancel_key), open(file_path, "rb") as file:
+        pdf_reader = open_pdf(file)
+        return [
+            _extract_page(
+                page_num, pdf_reader.pages[page_num].extract_text, "text_layer"
+            )
+            for page_num in range(start, end)
+        ]
+
+
+def _extract_page_range_pdfplumber(
+    file_path: str, start: int, end: int, cancel_key: Optional[str]
+) -> List[Dict[str, Any]]:
+    import pdfplumber
+
+    with cancel_scope(cancel_key), pdfplumber.open(file_path) as pdf:
+        return [
+            _extract_page(page_num, pdf.pages[page_num].extract_text, "text_layer")
+            for page_num in range(start, end)
+        ]
+
+
+def _page_ranges(page_count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split the pages into at most `shards` contiguous ranges of similar size"""
+    shards = max(1, min(shards, page_count))
+    size, remainder = divmod(page_count, shards)
+
+    ranges = []
+    start = 0
+    for shard in range(shards):
+        end = start + size + (1 if shard < remainder else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+_text_layer_pool: Optional[ProcessPoolExecutor] = None
+_text_layer_pool_lock = threading.Lock()
+
+
+def _get_text_layer_pool() -> ProcessPoolExecutor:
+    """Lazily start the processes that extract text layers, kept for reuse"""
+    global _text_layer_pool
+    with _text_layer_pool_lock:
+        if _text_layer_pool is None:
+            _text_layer_pool = ProcessPoolExecutor(
+                max_workers=PDF_TEXT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _text_layer_pool
+
+
+def _reset_text_layer_pool():
+    global _text_layer_pool
+    with _text_layer_pool_lock:
+        if _text_layer_pool is not None:
+            _text_layer_pool.shutdown(wait=False, cancel_futures=True)
+            _text_layer_pool = None
+
+
+def _extract_text_layer(
+    file_path: str,
+    page_count: int,
+    engine: ExtractionEngine,
+    engine_timings: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Extract every page's text layer, sharding large PDFs across processes
+
+    In the pipeline's worker processes pages are extracted inline instead, as
+    a pool in each of them would start cpu_count² processes.
+    """
+    started = time.perf_counter()
+    cancel_key = get_cancel_key()
+    extract_range = engine.extract
+
+    if (
+        page_count < PDF_PARALLEL_MIN_PAGES
+        or PDF_TEXT_WORKERS <= 1
+        or in_pipeline_process()
+    ):
+        page_results = extract_range(file_path, 0, page_count, cancel_key)
+    else:
+        pool = _get_text_layer_pool()
+        shards = [
+            pool.submit(extract_range, file_path, start, end, cancel_key)
+            for start, end in _page_ranges(page_count, PDF_TEXT_WORKERS)
+        ]
+        try:
+            page_results = [page for shard in shards for page in shard.result()]
+        except BrokenProcessPool:
+            # Start a fresh pool for the retry instead of failing every job
+            _reset_text_layer_pool()
+            raise
+
+    _log_page_timings("Text layer", page_results, time.perf_counter() - started)
+    _record_engine_run(
+        engine,
+        len(page_results),
+        sum(page["seconds"] for page in page_results),
+        engine_timings,
+    )
+    return page_results
+
+
+def _assemble_pages(
+    page_results: List[Dict[str, Any]], engine_timings: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    pages = []
+    text_blocks = []
+    # Where each page's text starts in the joined text, for the clause index
+    page_offsets = []
+    offset = 0
+
+    for page in page_results:
+        ocr = page["method"] != "text_layer"
+        if page["error"] is not None:
+            if ocr:
+                logger.error(f"OCR failed for page {page['page']}: {page['error']}")
+                pages.append(f"[OCR error on page {page['page']}: {page['error']}]")
+            else:
+                logger.warning(
+                    f"Failed to extract text from page {page['page']}: {page['error']}"
+                )
+                pages.append(f"[Error extracting page {page['page']}]")
+        elif page["text"].strip():
+            pages.append(page["text"])
+            text_blocks.append(page["text"])
+            page_offsets.append([page["page"], offset])
+            offset += len(page["text"]) + 2
+        elif ocr:
+            logger.warning(f"No text extracted from page {page['page']}")
+            pages.append(f"[No text found on page {page['page']}]")
+
+    full_text = "\n\n".join(text_blocks)
+    ocr_pages = [
+        page["page"] for page in page_results if page["method"] != "text_layer"
+    ]
+    methods = sorted({page["method"] for page in page_results})
+    logger.info(
+        f"Extracted {len(full_text)} total characters from {len(page_results)} pages "
+        f"({len(ocr_pages)} OCR'd)"
+    )
+
+    result = {
+        "text": full_text,
+        "pages": pages,
+        "error": None,
+        "page_timings": _page_timings(page_results),
+        "ocr_pages": ocr_pages,
+        "page_offsets": page_offsets,
+        "engine": "+".join(methods) or None,
+        "engine_timings": engine_timings,
+    }
+    if OCR_LAYOUT:
+        result["layout"] = _encode_layout(
+            build_layout(
+                (page["page"], page["lines"] or text_lines(page["text"]))
+                for page in page_results
+                if page["error"] is None
+            )
+        )
+
+    return result
+
+
+def _encode_layout(layout: TextLayout) -> bytes:
+    encoded = layout.encode()
+    logger.info(
+        f"Encoded layout of {len(layout)} lines in {len(encoded)} bytes "
+        f"({len(encoded) / max(1, len(layout)):.1f} bytes per line)"
+    )
+    return encoded
+
+
+def _page_timings(page_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "page": page["page"],
+            "method": page["method"],
+            "seconds": round(page["seconds"], 4),
+        }
+        for page in page_results
+    ]
+
+
+def _log_page_timings(label: str, page_results: List[Dict[str, Any]], elapsed: float):
+    if not page_results:
+        return
+
+    slowest = max(page_results, key=lambda page: page["seconds"])
+    page_seconds = sum(page["seconds"] for page in page_results)
+    logger.info(
+        f"{label} extraction of {len(page_results)} pages took {elapsed:.2f}s "
+        f"({page_seconds:.2f}s of page time, slowest page {slowest['page']} "
+        f"at {slowest['seconds']:.2f}s)"
+    )
 
 
 def get_text_statistics(text: str) -> Dict[str, Any]:
@@ -301,3 +939,100 @@ def get_text_statistics(text: str) -> Dict[str, Any]:
         "line_count": len(lines),
         "paragraph_count": len(paragraphs),
     }
+
+
+def _use_textract_mode(*modes: str) -> bool:
+    return TEXTRACT_MODE in modes and _use_textract()
+
+
+# Declared costs are rough seconds per page on a single core, rendering
+# included for the OCR engines, and only decide between engines until each
+# has measured its own throughput. Text layers are preferred to OCR whenever
+# a page has one, so costs only compare engines of the same kind.
+_ocr_workers = max(1, min(OCR_PAGE_WORKERS, OCR_RASTER_WINDOW_PAGES))
+
+register_engine(
+    ExtractionEngine(
+        "docx",
+        "document",
+        DOCX_MIME_TYPES,
+        _extract_from_docx,
+        lambda: True,
+        page_seconds=0.05,
+    )
+)
+register_engine(
+    ExtractionEngine(
+        "pypdf2",
+        "text_layer",
+        [PDF_MIME_TYPE],
+        _extract_page_range_pypdf2,
+        lambda: USE_PYPDF2,
+        page_seconds=0.02,
+        parallelism=PDF_TEXT_WORKERS,
+    )
+)
+register_engine(
+    ExtractionEngine(
+        "pdfplumber",
+        "text_layer",
+        [PDF_MIME_TYPE],
+        _extract_page_range_pdfplumber,
+        lambda: USE_PDFPLUMBER,
+        page_seconds=0.1,
+        parallelism=PDF_TEXT_WORKERS,
+    )
+)
+register_engine(
+    ExtractionEngine(
+        "tesseract",
+        "ocr",
+        [PDF_MIME_TYPE],
+        functools.partial(_ocr_pdf_pages, engine="tesseract"),
+        lambda: USE_TESSERACT,
+        # Pooled engines skip tesseract's startup and language load per page
+        page_seconds=2.5 if USE_TESSERACT_POOL else 3.0,
+        parallelism=_ocr_workers,
+    )
+)
+# Textract's sync API takes one page at a time, rendered with pdf2image, or
+# a single-page PDF as it is (up to 10 MB); async jobs read the whole PDF
+# from S3 and are worth their startup latency on long documents.
+# TEXTRACT_MODE=auto lets the selector choose between them.
+register_engine(
+    ExtractionEngine(
+        "textract",
+        "ocr",
+        [PDF_MIME_TYPE],
+        functools.partial(_ocr_pdf_pages, engine="textract"),
+        lambda: USE_TESSERACT and _use_textract_mode("sync", "auto"),
+        page_seconds=1.5,
+        parallelism=_ocr_workers,
+    )
+)
+register_engine(
+    ExtractionEngine(
+        "textract_document",
+        "ocr",
+        [PDF_MIME_TYPE],
+        _ocr_pdf_textract_document,
+        lambda: _use_textract_mode("sync", "auto"),
+        page_seconds=1.2,
+        max_pages=1,
+        max_file_bytes=10 * 1024 * 1024,
+    )
+)
+register_engine(
+    ExtractionEngine(
+        "textract_async",
+        "ocr",
+        [PDF_MIME_TYPE],
+        _ocr_pdf_pages_textract_async,
+        lambda: _use_textract_mode("async", "auto"),
+        page_seconds=0.1,
+        overhead_seconds=15.0,
+        max_pages=3000,
+        max_file_bytes=500 * 1024 * 1024,
+        whole_document=True,
+    )
+)
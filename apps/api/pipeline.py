@@ -0,0 +1,242 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from clause_index import ClauseIndex, build_clause_index
+from extraction_cache import (
+    EXTRACTION_CACHE_ENABLED,
+    compute_content_hash,
+    get_cached_extraction,
+    store_extraction,
+)
+from models import DocumentStatus
+from nlp_service import (
+    extract_lease_terms,
+    get_extraction_statistics,
+    validate_extracted_data,
+)
+from ocr_service import (
+    extract_text_from_document,
+    get_extractor_version,
+    get_text_statistics,
+    validate_extracted_text,
+)
+from processing_errors import PermanentProcessingError, TransientProcessingError
+from summary_service import (
+    generate_lease_summary,
+    get_summary_statistics,
+    validate_summary,
+)
+
+logger = logging.getLogger(__name__)
+
+# Stages run in this order. After each one its output is committed to the
+# document along with the stage name (Document.pipeline_stage), so a retry or
+# reprocess resumes from the first stage that has not completed.
+PIPELINE_STAGES = ["fetch", "extract_text", "extract_terms", "summarize", "finalize"]
+
+
+def get_remaining_stages(completed_stage: Optional[str]) -> List[str]:
+    """Get the stages still to run after the last completed stage"""
+    if completed_stage not in PIPELINE_STAGES:
+        return list(PIPELINE_STAGES)
+
+    return PIPELINE_STAGES[PIPELINE_STAGES.index(completed_stage) + 1 :]
+
+
+def get_checkpoint_before(stage: str) -> Optional[str]:
+    """Get the checkpoint that makes the pipeline restart at the given stage"""
+    index = PIPELINE_STAGES.index(stage)
+    return PIPELINE_STAGES[index - 1] if index > 0 else None
+
+
+def fetch_document(document_id: str, s3_key: str, s3_bucket: str) -> str:
+    """Make the document available locally and return its path"""
+    if s3_bucket != "local-storage":
+        raise PermanentProcessingError(
+            "S3 file processing not implemented in local development"
+        )
+
+    from s3_service import LOCAL_STORAGE_PATH
+
+    # So we should use it directly with LOCAL_STORAGE_PATH
+    file_path = os.path.join(LOCAL_STORAGE_PATH, s3_key)
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Local file not found at expected path: {file_path}")
+
+    return file_path
+
+
+def extract_text_stage(
+    document_id: str, file_path: str, mime_type: str
+) -> Dict[str, Any]:
+    """
+    Extract and validate the document text
+
+    The stage functions run outside the event loop (in a thread or process
+    pool), so they only take plain arguments and return plain data: a dict of
+    Document column values to apply. Database writes are left to the caller,
+    apart from the extraction cache, which is shared by every document.
+    """
+    content_hash = compute_content_hash(file_path)
+    extractor_version = get_extractor_version()
+    cache_hit = False
+    extraction_result = None
+
+    if EXTRACTION_CACHE_ENABLED:
+        extraction_result = get_cached_extraction(content_hash, extractor_version)
+        cache_hit = extraction_result is not None
+
+    if cache_hit:
+        logger.info(
+            f"Using cached extraction of {content_hash[:12]} for document {document_id}"
+        )
+    else:
+        logger.info(f"Extracting text from {file_path}")
+        extraction_result = extract_text_from_document(file_path, mime_type)
+
+    if extraction_result["error"]:
+        if extraction_result.get("transient"):
+            # Let the queue retry the job instead of failing the document
+            raise TransientProcessingError(extraction_result["error"])
+
+        logger.error(
+            f"Text extraction failed for document {document_id}: "
+            f"{extraction_result['error']}"
+        )
+        return {
+            "status": DocumentStatus.FAILED,
+            "extraction_error": extraction_result["error"],
+            "content_hash": content_hash,
+            "extraction_cache_hit": cache_hit,
+        }
+
+    extracted_text = extraction_result["text"]
+
+    if not validate_extracted_text(extracted_text):
+        logger.warning(
+            f"Extracted text for document {document_id} failed quality validation"
+        )
+        return {
+            "status": DocumentStatus.FAILED,
+            "extraction_error": (
+                "Extracted text failed quality validation (too short or low quality)"
+            ),
+            "content_hash": content_hash,
+            "extraction_cache_hit": cache_hit,
+        }
+
+    if EXTRACTION_CACHE_ENABLED and not cache_hit:
+        store_extraction(content_hash, extractor_version, extraction_result)
+
+    stats = get_text_statistics(extracted_text)
+    logger.info(
+        f"Successfully extracted text from document {document_id}: "
+        f"{stats['word_count']} words, {stats['character_count']} characters"
+    )
+
+    # Segmented once here, so term extraction, re-extraction and highlighting
+    # in the UI all read the same sections, sentences and clauses
+    clause_index = build_clause_index(
+        extracted_text, extraction_result.get("page_offsets")
+    )
+
+    return {
+        "extracted_text": extracted_text,
+        "text_layout": extraction_result.get("layout"),
+        "clause_index": clause_index.encode(),
+        "extraction_error": None,
+        "content_hash": content_hash,
+        "extraction_cache_hit": cache_hit,
+        "extraction_engine": extraction_result.get("engine"),
+        # Cached extractions ran no engine, so they say nothing about throughput
+        "extraction_timings": (
+            None if cache_hit else extraction_result.get("engine_timings")
+        ),
+    }
+
+
+def extract_terms_stage(
+    document_id: str, extracted_text: str, clause_index: Optional[bytes] = None
+) -> Dict[str, Any]:
+    """
+    Extract structured lease terms from the document text
+
+    Uses the document's stored clause index, or builds one (without pages)
+    for documents extracted before there was one and stores it with the terms.
+    """
+    updates = {}
+    if clause_index is not None:
+        index = ClauseIndex.decode(clause_index)
+    else:
+        index = build_clause_index(extracted_text)
+        updates["clause_index"] = index.encode()
+
+    logger.info(f"Starting NLP extraction for document {document_id}")
+    nlp_result = extract_lease_terms(extracted_text, index)
+
+    if nlp_result.get("error"):
+        logger.error(
+            f"NLP extraction failed for document {document_id}: {nlp_result['error']}"
+        )
+        return {
+            **updates,
+            "extracted_lease_data": None,
+            "nlp_extraction_error": nlp_result["error"],
+        }
+
+    validation = validate_extracted_data(nlp_result)
+    extraction_stats = get_extraction_statistics(nlp_result)
+
+    logger.info(
+        f"NLP extraction completed for document {document_id}: "
+        f"{validation['confidence_score']:.2%} confidence, "
+        f"{extraction_stats['populated_fields']}/"
+        f"{extraction_stats['total_fields']} fields populated"
+    )
+
+    return {
+        **updates,
+        "extracted_lease_data": nlp_result,
+        "nlp_extraction_error": None,
+    }
+
+
+def summarize_stage(
+    document_id: str,
+    extracted_text: str,
+    extracted_lease_data: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Generate the AI summary from the text and extracted terms"""
+    logger.info(f"Starting AI summary generation for document {document_id}")
+    summary_result = generate_lease_summary(extracted_text, extracted_lease_data)
+
+    if summary_result.get("error"):
+        logger.warning(
+            f"Summary generation had issues for document {document_id}: "
+            f"{summary_result['error']}"
+        )
+        return {"ai_summary": "Summary generation failed"}
+
+    generated_summary = summary_result.get("summary")
+    if not generated_summary:
+        logger.warning(f"No summary generated for document {document_id}")
+        return {"ai_summary": "No summary could be generated"}
+
+    summary_validation = validate_summary(generated_summary)
+    summary_stats = get_summary_statistics(generated_summary)
+
+    if not summary_validation["is_valid"]:
+        logger.warning(
+            f"Summary quality validation failed for document {document_id}: "
+            f"{summary_validation['issues']}"
+        )
+        return {"ai_summary": "Generated summary failed quality validation"}
+
+    logger.info(
+        f"AI summary generated for document {document_id}: "
+        f"{summary_stats['word_count']} words, "
+        f"quality score: {summary_validation['quality_score']:.2f}"
+    )
+    return {"ai_summary": generated_summary}
@@ -0,0 +1,206 @@
+import importlib.util
+import logging
+import os
+import zipfile
+from typing import Any, BinaryIO, Dict, Optional
+from xml.etree import ElementTree
+
+from docx_stream import find_main_document_part
+from processing_errors import PermanentProcessingError
+
+logger = logging.getLogger(__name__)
+
+PDF_MIME_TYPE = "application/pdf"
+DOCX_MIME_TYPES = [
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/msword",
+]
+FILE_TYPE_MIME_TYPES = {"pdf": PDF_MIME_TYPE, "docx": DOCX_MIME_TYPES[0]}
+
+# Files are recognised by their first bytes, not by the type they were
+# uploaded as. PDF readers accept junk before the header, so it is looked for
+# in the first kilobyte, as they do.
+PDF_MAGIC = b"%PDF-"
+PDF_HEADER_SEARCH_BYTES = 1024
+ZIP_MAGIC = b"PK\x03\x04"
+# Compound files are legacy Word documents, and also password-protected
+# DOCX, which Office wraps in one
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+EXTENDED_PROPERTIES = (
+    "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+)
+
+
+class PreflightError(PermanentProcessingError):
+    """An uploaded file the pipeline could never process"""
+
+
+def preflight_document(
+    file_path: str, mime_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Check that an uploaded file can be processed and describe it
+
+    Only the file's header, a PDF's trailer and page tree, or a DOCX's zip
+    directory are read, so this is fast enough to run while the document is
+    registered. Returns 'file_type' ("pdf" or "docx"), 'mime_type' (the one
+    given, or the file type's when that isn't a PDF or DOCX type),
+    'file_size' in bytes, 'page_count' (None when a DOCX doesn't record it),
+    'is_encrypted', 'has_text_layer' and 'text_layer_pages'. Raises
+    PreflightError for empty, corrupt, password-protected, zero-page and
+    unsupported files, or ones whose content doesn't match mime_type.
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        raise PreflightError("File is empty")
+
+    with open(file_path, "rb") as file:
+        header = file.read(PDF_HEADER_SEARCH_BYTES)
+
+    if PDF_MAGIC in header:
+        file_type = "pdf"
+    elif header.startswith(ZIP_MAGIC):
+        file_type = "docx"
+    elif header.startswith(OLE_MAGIC):
+        raise PreflightError(
+            "Legacy .doc and password-protected Word files are not supported, "
+            "save the document as an unprotected .docx or PDF"
+        )
+    else:
+        raise PreflightError("File is not a PDF or DOCX document")
+
+    expected_type = _file_type_of(mime_type)
+    if expected_type is not None and expected_type != file_type:
+        raise PreflightError(
+            f"File content is a {file_type.upper()} but it was uploaded as {mime_type}"
+        )
+
+    result = {
+        "file_type": file_type,
+        "mime_type": mime_type if expected_type else FILE_TYPE_MIME_TYPES[file_type],
+        "file_size": file_size,
+    }
+    if file_type == "pdf":
+        result.update(_preflight_pdf(file_path))
+    else:
+        result.update(_preflight_docx(file_path))
+
+    logger.info(
+        f"Preflight of {file_path}: {file_type}, {file_size} bytes, "
+        f"{result['page_count']} pages, encrypted={result['is_encrypted']}, "
+        f"text layer on {result['text_layer_pages']} pages"
+    )
+    return result
+
+
+def _file_type_of(mime_type: Optional[str]) -> Optional[str]:
+    if mime_type == PDF_MIME_TYPE:
+        return "pdf"
+    if mime_type in DOCX_MIME_TYPES:
+        return "docx"
+    return None
+
+
+def _preflight_pdf(file_path: str) -> Dict[str, Any]:
+    if importlib.util.find_spec("PyPDF2") is None:
+        logger.warning("PyPDF2 not installed, PDFs are only checked by their header")
+        return {
+            "page_count": None,
+            "is_encrypted": None,
+            "has_text_layer": None,
+            "text_layer_pages": None,
+        }
+
+    try:
+        with open(file_path, "rb") as file:
+            # Opening the trailer and cross-reference table catches most
+            # truncated and corrupt files; page contents are never parsed
+            reader = open_pdf(file)
+            is_encrypted = reader.is_encrypted
+
+            pages = reader.pages
+            page_count = len(pages)
+            text_layer_pages = sum(1 for page in pages if page_may_have_text(page))
+    except PreflightError:
+        raise
+    except Exception as e:
+        raise PreflightError(f"PDF is corrupt or unreadable: {e}") from e
+
+    if page_count == 0:
+        raise PreflightError("PDF has no pages")
+
+    return {
+        "page_count": page_count,
+        "is_encrypted": is_encrypted,
+        "has_text_layer": text_layer_pages > 0,
+        "text_layer_pages": text_layer_pages,
+    }
+
+
+def _preflight_docx(file_path: str) -> Dict[str, Any]:
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            if find_main_document_part(archive) is None:
+                raise PreflightError("File is a zip archive but not a Word document")
+            page_count = _docx_page_count(archive)
+    except PreflightError:
+        raise
+    except Exception as e:
+        raise PreflightError(f"DOCX is corrupt or unreadable: {e}") from e
+
+    return {
+        "page_count": page_count,
+        "is_encrypted": False,
+        "has_text_layer": True,
+        "text_layer_pages": page_count,
+    }
+
+
+def _docx_page_count(archive: zipfile.ZipFile) -> Optional[int]:
+    """Read the page count Word saved in docProps/app.xml, if it did"""
+    try:
+        with archive.open("docProps/app.xml") as properties:
+            pages = ElementTree.parse(properties).find(f"{EXTENDED_PROPERTIES}Pages")
+    except (KeyError, ElementTree.ParseError):
+        return None
+
+    if pages is None or not (pages.text or "").strip().isdigit():
+        return None
+    return int(pages.text)
+
+
+def open_pdf(file: BinaryIO) -> Any:
+    """
+    Open a PDF with PyPDF2, decrypting it if it only has an owner password
+
+    Such files only restrict printing or copying and open with an empty
+    password, which not every PyPDF2 version tries by itself. Raises
+    PreflightError if the PDF needs a password to open.
+    """
+    import PyPDF2
+    from PyPDF2 import PasswordType
+
+    reader = PyPDF2.PdfReader(file)
+    if reader.is_encrypted and reader.decrypt("") == PasswordType.NOT_DECRYPTED:
+        raise PreflightError("PDF is password protected")
+    return reader
+
+
+def page_may_have_text(page: Any) -> bool:
+    """Check a PyPDF2 page's resources for fonts, or forms that could hold text"""
+    resources = page.get("/Resources")
+    if resources is None:
+        return False
+
+    resources = resources.get_object()
+    if "/Font" in resources:
+        return True
+
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return False
+    return any(
+        xobject.get_object().get("/Subtype") == "/Form"
+        for xobject in xobjects.get_object().values()
+    )
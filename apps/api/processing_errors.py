@@ -0,0 +1,108 @@
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
+from sqlalchemy.exc import OperationalError
+
+
+class ProcessingError(Exception):
+    """Base class for errors raised while processing a document"""
+
+
+class TransientProcessingError(ProcessingError):
+    """An error that may succeed if the job is retried later"""
+
+
+class PermanentProcessingError(ProcessingError):
+    """An error that will fail the same way on every retry"""
+
+
+class ProcessingCancelledError(ProcessingError):
+    """Raised inside a pipeline stage whose job was cancelled"""
+
+
+TRANSIENT_AWS_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "ProvisionedThroughputExceededException",
+    "LimitExceededException",
+    "SlowDown",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalError",
+    "InternalFailure",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+}
+
+# Parsers raise their own exception types for corrupt or unreadable files
+PERMANENT_ERROR_MODULES = ("PyPDF2", "pypdf", "pdfminer", "pdfplumber", "docx", "xml")
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Classify an exception raised by the pipeline as transient or permanent
+
+    Throttling, AWS server errors, network and I/O failures, database hiccups
+    and crashed pool workers are transient. Missing files, corrupt documents,
+    unsupported file types and programming errors are permanent. Anything
+    unrecognised is treated as transient and left to the retry limit.
+    """
+    if isinstance(error, TransientProcessingError):
+        return True
+    if isinstance(error, PermanentProcessingError):
+        return False
+
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        http_status = error.response.get("ResponseMetadata", {}).get(
+            "HTTPStatusCode", 0
+        )
+        return code in TRANSIENT_AWS_ERROR_CODES or http_status >= 500
+
+    if isinstance(
+        error,
+        (
+            EndpointConnectionError,
+            ConnectionClosedError,
+            ConnectTimeoutError,
+            ReadTimeoutError,
+            BrokenProcessPool,
+            OperationalError,
+        ),
+    ):
+        return True
+
+    if isinstance(
+        error,
+        (
+            FileNotFoundError,
+            IsADirectoryError,
+            PermissionError,
+            ValueError,
+            TypeError,
+            KeyError,
+            NotImplementedError,
+            ImportError,
+            zipfile.BadZipFile,
+        ),
+    ):
+        return False
+
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)):
+        return True
+
+    if type(error).__module__.split(".")[0] in PERMANENT_ERROR_MODULES:
+        return False
+
+    return True
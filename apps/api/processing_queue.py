@@ -1,72 +1,213 @@
 import asyncio
 import json
 import logging
+import multiprocessing
 import os
+import socket
+import time
 import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional
 
 from sqlalchemy.orm import Session
 
-from models import Document, DocumentStatus, get_db
-from nlp_service import (
-    extract_lease_terms,
-    get_extraction_statistics,
-    validate_extracted_data,
+from cancellation import (
+    prune_cancellation_markers,
+    request_cancellation,
+    run_cancellable,
 )
-from ocr_service import (
-    extract_text_from_document,
-    get_text_statistics,
-    validate_extracted_text,
+from document_events import document_events
+from job_queue import (
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    claim_next_job,
+    complete_job,
+    compute_retry_delay,
+    count_queued_jobs,
+    count_running_jobs,
+    enqueue_job,
+    extend_job_lease,
+    fail_job,
+    is_job_leased_by,
+    job_to_dict,
+    recover_orphaned_jobs,
+    retry_job,
 )
-from summary_service import (
-    generate_lease_summary,
-    get_summary_statistics,
-    validate_summary,
+from models import Document, DocumentStatus, JobPriority, get_db
+from pipeline import (
+    PIPELINE_STAGES,
+    extract_terms_stage,
+    extract_text_stage,
+    fetch_document,
+    get_remaining_stages,
+    summarize_stage,
 )
+from processing_errors import ProcessingCancelledError, is_transient_error
+from worker_processes import init_pipeline_process
 
 logger = logging.getLogger(__name__)
 
+# How the CPU-bound pipeline stages run: "process" (ProcessPoolExecutor),
+# "thread" (ThreadPoolExecutor) or "inline" (directly on the event loop)
+PIPELINE_EXECUTOR = os.getenv("PIPELINE_EXECUTOR", "process")
+PIPELINE_MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", os.cpu_count() or 1))
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+# Backpressure: at most PROCESSING_MAX_IN_FLIGHT pipelines run at once and at
+# most PROCESSING_QUEUE_MAXSIZE queued jobs wait behind them
+PROCESSING_MAX_IN_FLIGHT = int(
+    os.getenv("PROCESSING_MAX_IN_FLIGHT", PIPELINE_MAX_WORKERS)
+)
+PROCESSING_QUEUE_MAXSIZE = int(os.getenv("PROCESSING_QUEUE_MAXSIZE", "100"))
+PROCESSING_RETRY_AFTER_SECONDS = int(os.getenv("PROCESSING_RETRY_AFTER_SECONDS", "30"))
+
+# Jobs live in the processing_jobs table; idle workers poll for new ones and
+# periodically re-queue work orphaned by dead workers
+PROCESSING_POLL_INTERVAL = float(os.getenv("PROCESSING_POLL_INTERVAL", "2"))
+PROCESSING_RECOVERY_INTERVAL = float(os.getenv("PROCESSING_RECOVERY_INTERVAL", "60"))
+
+# Running jobs check this often whether they were cancelled (their document
+# deleted) or lost to another worker, and stop if so
+PROCESSING_CANCEL_CHECK_INTERVAL = float(
+    os.getenv("PROCESSING_CANCEL_CHECK_INTERVAL", "2")
+)
+
+# Set to false to run the API without a pipeline worker, leaving the jobs to
+# standalone workers started with `python -m worker`
+PROCESSING_PIPELINE_ENABLED = os.getenv(
+    "PROCESSING_PIPELINE_ENABLED", "true"
+).lower() in ("1", "true", "yes")
+
+
+class QueueFullError(Exception):
+    """Raised when a job is rejected because the processing queue is full"""
+
+    def __init__(self, queue_size: int, retry_after: int):
+        super().__init__(f"Processing queue is full ({queue_size} jobs waiting)")
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+
 
 class ProcessingQueue:
-    def __init__(self):
-        self.queue = asyncio.Queue()
+    def __init__(
+        self,
+        executor_mode: str = PIPELINE_EXECUTOR,
+        max_workers: int = PIPELINE_MAX_WORKERS,
+        max_in_flight: int = PROCESSING_MAX_IN_FLIGHT,
+        max_queue_size: int = PROCESSING_QUEUE_MAXSIZE,
+    ):
+        if executor_mode not in EXECUTOR_MODES:
+            raise ValueError(
+                f"Invalid PIPELINE_EXECUTOR {executor_mode!r}, "
+                f"expected one of {EXECUTOR_MODES}"
+            )
+
         self.processing_tasks = {}
         self.is_running = False
+        self.executor_mode = executor_mode
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue_size = max(1, max_queue_size)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._running_jobs: Dict[str, Dict[str, Any]] = {}
+        self._cancel_requests: Dict[str, asyncio.Event] = {}
+
+    def _get_executor(self) -> Optional[Executor]:
+        """Lazily create the executor used for the CPU-bound pipeline stages"""
+        if self.executor_mode == "inline":
+            return None
+
+        if self._executor is None:
+            if self.executor_mode == "process":
+                # spawn avoids forking the API process with its event loop,
+                # threads and open database connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_pipeline_process,
+                    initargs=(self.max_workers,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="pipeline",
+                )
+            logger.info(
+                f"Started {self.executor_mode} pipeline executor "
+                f"with {self.max_workers} workers"
+            )
+
+        return self._executor
+
+    async def run_blocking(
+        self, func: Callable[..., Any], *args: Any, cancel_key: Optional[str] = None
+    ) -> Any:
+        """
+        Run a blocking pipeline function off the event loop
+
+        With a cancel_key the function can be stopped by request_cancellation()
+        while it runs in the executor.
+        """
+        if cancel_key is not None:
+            func, args = run_cancellable, (cancel_key, func, *args)
+
+        executor = self._get_executor()
+        if executor is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker process died (killed or out of memory) and the pool
+            # won't run anything again; replace it so the retry can
+            self._reset_executor(executor)
+            raise
+
+    def _reset_executor(self, executor: Executor):
+        """Drop a broken executor so that the next call creates a new one"""
+        if self._executor is executor:
+            logger.warning("Pipeline process pool is broken, restarting it")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
     async def add_job(
-        self, document_id: str, user_id: str, s3_key: str, s3_bucket: str
+        self,
+        document_id: str,
+        user_id: str,
+        s3_key: str,
+        s3_bucket: str,
+        priority: JobPriority = JobPriority.INTERACTIVE,
     ):
         """Add a document processing job to the queue"""
-        job = {
-            "id": str(uuid.uuid4()),
-            "document_id": document_id,
-            "user_id": user_id,
-            "s3_key": s3_key,
-            "s3_bucket": s3_bucket,
-            "created_at": datetime.utcnow().isoformat(),
-            "retry_count": 0,
-        }
-
-        await self.queue.put(job)
-        logger.info(f"Added processing job {job['id']} for document {document_id}")
-
         db = next(get_db())
         try:
-            document = db.query(Document).filter(Document.id == document_id).first()
-            if document:
-                document.status = DocumentStatus.PROCESSING
-                document.updated_at = datetime.utcnow()
-                db.commit()
-                logger.info(f"Updated document {document_id} status to PROCESSING")
-        except Exception as e:
-            logger.error(f"Failed to update document status: {e}")
+            self.ensure_capacity(db)
+
+            job = enqueue_job(db, document_id, user_id, s3_key, s3_bucket, priority)
+            db.commit()
+            job_id = job.id
+        except Exception:
             db.rollback()
+            raise
         finally:
             db.close()
 
-        return job["id"]
+        logger.info(f"Added processing job {job_id} for document {document_id}")
+        self.notify_new_job()
+        document_events.publish(document_id)
+
+        return job_id
+
+    def notify_new_job(self):
+        """Wake the local worker after a job was committed to the queue"""
+        self._wakeup.set()
 
     async def start_worker(self):
         """Start the background worker to process jobs"""
@@ -74,177 +215,287 @@ class ProcessingQueue:
             return
 
         self.is_running = True
-        logger.info("Starting processing queue worker")
+        logger.info(f"Starting processing queue worker {self.worker_id}")
+
+        # The queue lives in the database, so every query on it runs on a
+        # thread rather than blocking the event loop
+        await asyncio.to_thread(self._recover_orphaned_jobs)
+        last_recovery = time.monotonic()
 
         while self.is_running:
+            # Wait for a free slot before claiming so that excess jobs stay in
+            # the bounded queue and intake sees the backpressure
+            await self._slots.acquire()
+            if not self.is_running:
+                self._slots.release()
+                break
+
             try:
-                job = await asyncio.wait_for(self.queue.get(), timeout=1.0)
+                if time.monotonic() - last_recovery > PROCESSING_RECOVERY_INTERVAL:
+                    await asyncio.to_thread(self._recover_orphaned_jobs)
+                    last_recovery = time.monotonic()
 
-                task = asyncio.create_task(self.process_job(job))
-                self.processing_tasks[job["id"]] = task
+                job = await asyncio.to_thread(self._claim_job)
+                if job is None:
+                    self._slots.release()
+                    await self._wait_for_jobs()
+                    continue
 
-                completed_tasks = [
-                    job_id
-                    for job_id, task in self.processing_tasks.items()
-                    if task.done()
-                ]
-                for job_id in completed_tasks:
-                    del self.processing_tasks[job_id]
+                task = asyncio.create_task(self._run_job(job))
+                self.processing_tasks[job["id"]] = task
 
-            except asyncio.TimeoutError:
-                continue
             except Exception as e:
+                self._slots.release()
                 logger.error(f"Error in queue worker: {e}")
                 await asyncio.sleep(1)
 
-    async def process_job(self, job: Dict[str, Any]):
-        """Process a single document job with OCR text extraction"""
-        document_id = job["document_id"]
-        s3_key = job["s3_key"]
-        s3_bucket = job["s3_bucket"]
-        logger.info(f"Processing job {job['id']} for document {document_id}")
+    def _claim_job(self) -> Optional[Dict[str, Any]]:
+        db = next(get_db())
+        try:
+            job = claim_next_job(db, self.worker_id)
+            return job_to_dict(job) if job else None
+        finally:
+            db.close()
 
+    def _recover_orphaned_jobs(self):
         db = next(get_db())
         try:
-            document = db.query(Document).filter(Document.id == document_id).first()
-            if not document:
-                logger.error(f"Document {document_id} not found")
-                return
+            recover_orphaned_jobs(db)
+            prune_cancellation_markers()
+        except Exception as e:
+            logger.error(f"Failed to recover orphaned jobs: {e}")
+            db.rollback()
+        finally:
+            db.close()
 
-            if s3_bucket == "local-storage":
-                from s3_service import LOCAL_STORAGE_PATH
+    async def _wait_for_jobs(self):
+        """Sleep until a job is added locally or the poll interval passes"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=PROCESSING_POLL_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            pass
 
-                # So we should use it directly with LOCAL_STORAGE_PATH
-                file_path = os.path.join(LOCAL_STORAGE_PATH, s3_key)
+    async def _run_job(self, job: Dict[str, Any]):
+        """Run a job in its slot and release the slot when it finishes"""
+        cancel_requested = asyncio.Event()
+        self._running_jobs[job["id"]] = job
+        self._cancel_requests[job["id"]] = cancel_requested
 
-                if not os.path.exists(file_path):
-                    raise FileNotFoundError(
-                        f"Local file not found at expected path: {file_path}"
-                    )
-            else:
-                raise NotImplementedError(
-                    "S3 file processing not implemented in local development"
+        work = asyncio.create_task(self.process_job(job))
+        watcher = asyncio.create_task(self._watch_job(job["id"], cancel_requested))
+        try:
+            await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not work.done():
+                # The job was cancelled or taken over by another worker, so
+                # stop spending this slot on it
+                logger.info(
+                    f"Cancelling processing job {job['id']} "
+                    f"for document {job['document_id']}"
                 )
+                work.cancel()
+                request_cancellation(self._cancel_key(job))
+                await asyncio.gather(work, return_exceptions=True)
+        finally:
+            watcher.cancel()
+            self._running_jobs.pop(job["id"], None)
+            self._cancel_requests.pop(job["id"], None)
+            self.processing_tasks.pop(job["id"], None)
+            self._slots.release()
+            # A slot opened up, so look for more work straight away
+            self.notify_new_job()
+
+    async def _watch_job(self, job_id: str, cancel_requested: asyncio.Event):
+        """
+        Keep extending a running job's lease so other workers leave it alone
+
+        Returns when the job is cancelled locally, or when it is gone from the
+        queue or its lease was lost, in which case the job should stop.
+        """
+        last_extended = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(
+                    cancel_requested.wait(), timeout=PROCESSING_CANCEL_CHECK_INTERVAL
+                )
+                return
+            except asyncio.TimeoutError:
+                pass
 
-            logger.info(f"Extracting text from {file_path}")
-
-            extraction_result = extract_text_from_document(
-                file_path, document.mime_type
+            extend = (
+                time.monotonic() - last_extended >= JOB_VISIBILITY_TIMEOUT_SECONDS / 3
             )
-
-            if extraction_result["error"]:
-                document.status = DocumentStatus.FAILED
-                document.extraction_error = extraction_result["error"]
-                logger.error(
-                    f"Text extraction failed for document {document_id}: {extraction_result['error']}"
+            still_held = await asyncio.to_thread(self._check_lease, job_id, extend)
+            if still_held is None:
+                continue
+            if extend:
+                last_extended = time.monotonic()
+            if not still_held:
+                logger.warning(
+                    f"Processing job {job_id} was cancelled or its lease was lost"
                 )
-            else:
-                extracted_text = extraction_result["text"]
+                return
 
-                if validate_extracted_text(extracted_text):
-                    document.extracted_text = extracted_text
-                    document.extraction_error = None
+    def _check_lease(self, job_id: str, extend: bool) -> Optional[bool]:
+        """
+        Check that this worker still holds a job's lease, extending it if asked
 
-                    stats = get_text_statistics(extracted_text)
-                    logger.info(
-                        f"Successfully extracted text from document {document_id}: "
-                        f"{stats['word_count']} words, {stats['character_count']} characters"
-                    )
+        Returns None when the check itself failed, so that a database hiccup
+        doesn't stop the job and the lease is extended again next time.
+        """
+        db = next(get_db())
+        try:
+            if extend:
+                return extend_job_lease(db, job_id, self.worker_id)
+            return is_job_leased_by(db, job_id, self.worker_id)
+        except Exception as e:
+            logger.error(f"Failed to extend lease on job {job_id}: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
 
-                    logger.info(f"Starting NLP extraction for document {document_id}")
-                    nlp_result = extract_lease_terms(extracted_text)
+    @staticmethod
+    def _cancel_key(job: Dict[str, Any]) -> str:
+        # Each attempt gets its own key so cancelling one never stops a later
+        # attempt of the same job
+        return f"{job['id']}-{job['attempts']}"
 
-                    if nlp_result.get("error"):
-                        document.nlp_extraction_error = nlp_result["error"]
-                        logger.error(
-                            f"NLP extraction failed for document {document_id}: {nlp_result['error']}"
-                        )
-                    else:
-                        document.extracted_lease_data = nlp_result
-                        document.nlp_extraction_error = None
+    def cancel_document(self, document_id: str) -> bool:
+        """Cancel this worker's running job for a document, if it has one"""
+        for job_id, job in self._running_jobs.items():
+            if job["document_id"] == document_id:
+                self._cancel_requests[job_id].set()
+                return True
+        return False
 
-                        validation = validate_extracted_data(nlp_result)
-                        extraction_stats = get_extraction_statistics(nlp_result)
+    async def process_job(self, job: Dict[str, Any]):
+        """Process a single document job with OCR text extraction"""
+        document_id = job["document_id"]
+        s3_key = job["s3_key"]
+        s3_bucket = job["s3_bucket"]
+        cancel_key = self._cancel_key(job)
+        logger.info(
+            f"Processing job {job['id']} for document {document_id} "
+            f"(attempt {job['attempts']}/{job['max_attempts']})"
+        )
 
-                        logger.info(
-                            f"NLP extraction completed for document {document_id}: "
-                            f"{validation['confidence_score']:.2%} confidence, "
-                            f"{extraction_stats['populated_fields']}/{extraction_stats['total_fields']} fields populated"
-                        )
+        db = next(get_db())
+        try:
+            document = db.query(Document).filter(Document.id == document_id).first()
+            if not document:
+                logger.error(f"Document {document_id} not found")
+                fail_job(db, job["id"], "Document not found")
+                db.commit()
+                return
 
-                    logger.info(
-                        f"Starting AI summary generation for document {document_id}"
-                    )
-                    summary_result = generate_lease_summary(extracted_text, nlp_result)
+            stages = get_remaining_stages(document.pipeline_stage)
+            if document.pipeline_stage in PIPELINE_STAGES:
+                logger.info(
+                    f"Resuming document {document_id} after completed stage "
+                    f"{document.pipeline_stage}"
+                )
 
-                    if summary_result.get("error"):
-                        logger.warning(
-                            f"Summary generation had issues for document {document_id}: {summary_result['error']}"
-                        )
-                        document.ai_summary = "Summary generation failed"
-                    else:
-                        generated_summary = summary_result.get("summary")
-                        if generated_summary:
-                            summary_validation = validate_summary(generated_summary)
-                            summary_stats = get_summary_statistics(generated_summary)
-
-                            if summary_validation["is_valid"]:
-                                document.ai_summary = generated_summary
-                                logger.info(
-                                    f"AI summary generated for document {document_id}: "
-                                    f"{summary_stats['word_count']} words, "
-                                    f"quality score: {summary_validation['quality_score']:.2f}"
-                                )
-                            else:
-                                document.ai_summary = (
-                                    "Generated summary failed quality validation"
-                                )
-                                logger.warning(
-                                    f"Summary quality validation failed for document {document_id}: {summary_validation['issues']}"
-                                )
-                        else:
-                            document.ai_summary = "No summary could be generated"
-                            logger.warning(
-                                f"No summary generated for document {document_id}"
-                            )
-
-                    document.status = DocumentStatus.COMPLETED
-                else:
-                    document.status = DocumentStatus.FAILED
-                    document.extraction_error = "Extracted text failed quality validation (too short or low quality)"
-                    logger.warning(
-                        f"Extracted text for document {document_id} failed quality validation"
+            if not stages:
+                complete_job(db, job["id"])
+                db.commit()
+
+            file_path = None
+            for stage in stages:
+                if stage == "fetch":
+                    file_path = fetch_document(document_id, s3_key, s3_bucket)
+                    updates = {}
+                elif stage == "extract_text":
+                    file_path = file_path or fetch_document(
+                        document_id, s3_key, s3_bucket
+                    )
+                    updates = await self.run_blocking(
+                        extract_text_stage,
+                        document_id,
+                        file_path,
+                        document.mime_type,
+                        cancel_key=cancel_key,
+                    )
+                elif stage == "extract_terms":
+                    updates = await self.run_blocking(
+                        extract_terms_stage,
+                        document_id,
+                        document.extracted_text,
+                        document.clause_index,
+                        cancel_key=cancel_key,
                     )
+                elif stage == "summarize":
+                    updates = await self.run_blocking(
+                        summarize_stage,
+                        document_id,
+                        document.extracted_text,
+                        document.extracted_lease_data,
+                        cancel_key=cancel_key,
+                    )
+                else:
+                    updates = {"status": DocumentStatus.COMPLETED}
+
+                for column, value in updates.items():
+                    setattr(document, column, value)
+                document.updated_at = datetime.utcnow()
+
+                # Commit each stage's output as a checkpoint. A stage that
+                # fails the document ends the job without advancing it.
+                if document.status == DocumentStatus.FAILED:
+                    complete_job(db, job["id"])
+                    db.commit()
+                    document_events.publish(document_id)
+                    break
+
+                document.pipeline_stage = stage
+                if stage == "finalize":
+                    complete_job(db, job["id"])
+                db.commit()
+                document_events.publish(document_id)
 
-            document.updated_at = datetime.utcnow()
-            db.commit()
             logger.info(
                 f"Completed processing for document {document_id} with status: {document.status.value}"
             )
 
+        except ProcessingCancelledError:
+            logger.info(f"Processing of document {document_id} was cancelled")
+            db.rollback()
         except Exception as e:
-            logger.error(f"Failed to process document {document_id}: {e}")
+            transient = is_transient_error(e)
+            logger.error(
+                f"Failed to process document {document_id} "
+                f"({'transient' if transient else 'permanent'} {type(e).__name__}): {e}"
+            )
+            db.rollback()
 
             try:
-                document = db.query(Document).filter(Document.id == document_id).first()
-                if document:
-                    if job["retry_count"] < 3:  # Max 3 retries
-                        job["retry_count"] += 1
-                        await asyncio.sleep(5)  # Wait before retry
-                        await self.queue.put(job)
-                        logger.info(
-                            f"Retrying job {job['id']} (attempt {job['retry_count']})"
-                        )
+                if transient and job["attempts"] < job["max_attempts"]:
+                    # The job waits in the database, not in this task, so the
+                    # slot and session are released during the delay
+                    delay = compute_retry_delay(job["attempts"])
+                    retry_job(db, job["id"], str(e), delay_seconds=delay)
+                    db.commit()
+                    logger.info(
+                        f"Retrying job {job['id']} in {delay:.1f}s "
+                        f"(attempt {job['attempts'] + 1})"
+                    )
+                else:
+                    if transient:
+                        error = f"Processing failed after max retries: {str(e)}"
                     else:
+                        error = f"Processing failed: {str(e)}"
+                    fail_job(db, job["id"], error)
+                    document = (
+                        db.query(Document).filter(Document.id == document_id).first()
+                    )
+                    if document:
                         document.status = DocumentStatus.FAILED
-                        document.extraction_error = (
-                            f"Processing failed after max retries: {str(e)}"
-                        )
+                        document.extraction_error = error
                         document.updated_at = datetime.utcnow()
-                        db.commit()
-                        logger.error(
-                            f"Document {document_id} processing failed after max retries"
-                        )
+                    db.commit()
+                    logger.error(f"Document {document_id} processing failed: {error}")
             except Exception as retry_error:
                 logger.error(
                     f"Failed to handle retry for document {document_id}: {retry_error}"
@@ -252,26 +503,78 @@ class ProcessingQueue:
                 db.rollback()
         finally:
             db.close()
+            document_events.publish(document_id)
 
     async def stop_worker(self):
         """Stop the background worker"""
         self.is_running = False
+        self._wakeup.set()
 
         if self.processing_tasks:
             await asyncio.gather(
                 *self.processing_tasks.values(), return_exceptions=True
             )
 
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
         logger.info("Processing queue worker stopped")
 
     def get_queue_size(self) -> int:
         """Get the current queue size"""
-        return self.queue.qsize()
+        db = next(get_db())
+        try:
+            return count_queued_jobs(db)
+        finally:
+            db.close()
 
     def get_processing_count(self) -> int:
         """Get the number of currently processing jobs"""
         return len(self.processing_tasks)
 
+    def ensure_capacity(self, db: Optional[Session] = None, jobs: int = 1) -> int:
+        """
+        Raise QueueFullError if not even one new job would currently be accepted
+
+        Returns how many of the requested jobs fit in the queue, so a batch
+        can accept part of its documents and reject the rest.
+        """
+        if db is None:
+            db = next(get_db())
+            try:
+                return self.ensure_capacity(db, jobs)
+            finally:
+                db.close()
+
+        queue_size = count_queued_jobs(db)
+        if queue_size >= self.max_queue_size:
+            logger.warning(f"Rejecting processing job: {queue_size} jobs waiting")
+            raise QueueFullError(queue_size, PROCESSING_RETRY_AFTER_SECONDS)
+
+        return min(jobs, self.max_queue_size - queue_size)
+
+    def get_saturation(self) -> Dict[str, Any]:
+        """Get queue and worker utilization for health checks"""
+        db = next(get_db())
+        try:
+            queue_size = count_queued_jobs(db)
+            running_jobs = count_running_jobs(db)
+        finally:
+            db.close()
+        in_flight = self.get_processing_count()
+
+        return {
+            "queue_size": queue_size,
+            "running_jobs": running_jobs,
+            "queue_capacity": self.max_queue_size,
+            "queue_utilization": queue_size / self.max_queue_size,
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+            "worker_utilization": in_flight / self.max_in_flight,
+            "is_saturated": queue_size >= self.max_queue_size,
+        }
+
 
 processing_queue = ProcessingQueue()
 
@@ -284,19 +587,3 @@ async def initialize_processing_queue():
 async def shutdown_processing_queue():
     """Shutdown the processing queue"""
     await processing_queue.stop_worker()
-
-
-def add_document_to_queue(
-    document_id: str, user_id: str, s3_key: str, s3_bucket: str
-) -> str:
-    """Synchronous wrapper to add document to processing queue"""
-    loop = asyncio.get_event_loop()
-    if loop.is_running():
-        task = asyncio.create_task(
-            processing_queue.add_job(document_id, user_id, s3_key, s3_bucket)
-        )
-        return "queued"  # Return immediately, job will be processed async
-    else:
-        return loop.run_until_complete(
-            processing_queue.add_job(document_id, user_id, s3_key, s3_bucket)
-        )
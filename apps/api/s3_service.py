@@ -4,24 +4,17 @@ import uuid
 from pathlib import Path
 from typing import Optional
 
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from botocore.exceptions import ClientError
 from fastapi import HTTPException
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+from aws_clients import get_client, is_available
+
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "legal-ease-ai-documents")
 LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "/tmp/legal-ease-ai-documents")
 
-try:
-    s3_client = boto3.client("s3", region_name=AWS_REGION)
-    s3_client.list_buckets()
-    USE_S3 = True
-    print("AWS S3 credentials found, using S3 for storage")
-except (NoCredentialsError, ClientError) as e:
-    s3_client = None
-    USE_S3 = False
-    print(f"AWS credentials not found ({e}), using local storage for development")
-    Path(LOCAL_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
+# Whether S3 is used is decided on first use, falling back to local storage
+# for development
+Path(LOCAL_STORAGE_PATH).mkdir(parents=True, exist_ok=True)
 
 
 def generate_presigned_upload_url(
@@ -37,9 +30,9 @@ def generate_presigned_upload_url(
         )
         s3_key = f"documents/local/{unique_filename}"
 
-        if USE_S3:
+        if is_available("s3"):
             s3_key = f"documents/{user_id}/{unique_filename}"
-            presigned_url = s3_client.generate_presigned_url(
+            presigned_url = get_client("s3").generate_presigned_url(
                 "put_object",
                 Params={
                     "Bucket": S3_BUCKET_NAME,
@@ -76,8 +69,8 @@ def generate_presigned_download_url(s3_key: str, expires_in: int = 3600) -> str:
     Generate a presigned URL for downloading a file from S3 or local storage
     """
     try:
-        if USE_S3:
-            presigned_url = s3_client.generate_presigned_url(
+        if is_available("s3"):
+            presigned_url = get_client("s3").generate_presigned_url(
                 "get_object",
                 Params={"Bucket": S3_BUCKET_NAME, "Key": s3_key},
                 ExpiresIn=expires_in,
@@ -97,8 +90,8 @@ def delete_file_from_s3(s3_key: str) -> bool:
     Delete a file from S3 or local storage
     """
     try:
-        if USE_S3:
-            s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+        if is_available("s3"):
+            get_client("s3").delete_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
         else:
             local_file_path = Path(LOCAL_STORAGE_PATH) / s3_key
             if local_file_path.exists():
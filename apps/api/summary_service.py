@@ -3,19 +3,11 @@ import logging
 import os
 from typing import Any, Dict, Optional
 
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from botocore.exceptions import ClientError
 
-logger = logging.getLogger(__name__)
+from aws_clients import get_client, is_available
 
-try:
-    comprehend_client = boto3.client("comprehend")
-    AWS_AVAILABLE = True
-    logger.info("AWS Comprehend client initialized successfully")
-except (NoCredentialsError, Exception) as e:
-    comprehend_client = None
-    AWS_AVAILABLE = False
-    logger.warning(f"AWS credentials not found ({e}), using local summary generation")
+logger = logging.getLogger(__name__)
 
 
 def generate_lease_summary(
@@ -32,7 +24,7 @@ def generate_lease_summary(
         Dict containing the generated summary and metadata
     """
     try:
-        if AWS_AVAILABLE:
+        if is_available("comprehend"):
             return _generate_summary_with_comprehend(extracted_text, extracted_data)
         else:
             return _generate_summary_locally(extracted_text, extracted_data)
@@ -54,7 +46,7 @@ def _generate_summary_with_comprehend(
     """
     try:
 
-        key_phrases_response = comprehend_client.detect_key_phrases(
+        key_phrases_response = get_client("comprehend").detect_key_phrases(
             Text=extracted_text[:5000],  # Comprehend has text length limits
             LanguageCode="en",
         )
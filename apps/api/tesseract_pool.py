@@ -0,0 +1,219 @@
+import logging
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from worker_processes import get_core_share
+
+logger = logging.getLogger(__name__)
+
+# pytesseract starts a tesseract process for every page, which writes the
+# image to a temp file and loads the language data again each time. With
+# tesserocr installed, pages go instead to engines kept loaded in this
+# process, one per page that can be OCR'd at once, handed images in memory.
+# tesserocr builds against the tesseract library, so it is an optional
+# install (requirements-ocr.txt); log_ocr_backend() reports which one runs.
+TESSERACT_POOL = os.getenv("TESSERACT_POOL", "true").lower() in ("1", "true", "yes")
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+
+# Engines per process; 0 starts one per page OCR'd at once, OCR_PAGE_WORKERS
+# capped at the process's share of the cores. Every pipeline worker process
+# (PIPELINE_MAX_WORKERS of them in "process" mode) keeps its own engines, so
+# the default divides the cores between them; a size set here applies to each.
+TESSERACT_POOL_SIZE = int(os.getenv("TESSERACT_POOL_SIZE", "0"))
+
+if TESSERACT_POOL_SIZE != 1:
+    # The engines already keep every core busy, so hold each to one thread.
+    # OpenMP reads this when tesseract's library loads, so set it first.
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    import tesserocr
+
+    USE_TESSERACT_POOL = TESSERACT_POOL
+except ImportError as e:
+    USE_TESSERACT_POOL = False
+    logger.info(f"tesserocr not found ({e}), running tesseract once per page")
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+TESSERACT_AVAILABLE = USE_TESSERACT_POOL or pytesseract is not None
+
+# Columns of tesseract's TSV output, which image_to_data() returns by name
+TSV_COLUMNS = (
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+    "conf",
+    "text",
+)
+
+
+class TesseractPool:
+    """
+    Loaded tesseract engines, each used by one thread at a time
+
+    Engines are started as pages first need them, up to the pool size, and
+    then reused for the life of the process; a thread wanting one while all
+    are busy waits for the next to be returned.
+    """
+
+    def __init__(self, size: int = TESSERACT_POOL_SIZE, lang: str = TESSERACT_LANG):
+        self.size = max(1, size or get_default_pool_size())
+        self.lang = lang
+        # Most recently returned first, so a lightly used pool keeps reusing
+        # the same engines
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def engine(self) -> Iterator[Any]:
+        api = self._acquire()
+        try:
+            yield api
+        finally:
+            # Drop the page's image and results before the next page
+            api.Clear()
+            self._idle.put(api)
+
+    def _acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        api = self._start()
+        return api if api is not None else self._idle.get()
+
+    def _start(self) -> Optional[Any]:
+        """Start another engine, or return None when the pool is full"""
+        with self._lock:
+            if self._started >= self.size:
+                return None
+            self._started += 1
+            number = self._started
+
+        try:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=tesserocr.PSM.AUTO)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+        logger.info(f"Started tesseract engine {number} of {self.size}")
+        return api
+
+    def warm(self):
+        """Start every engine now instead of on the first pages"""
+        while True:
+            api = self._start()
+            if api is None:
+                break
+            self._idle.put(api)
+
+    def close(self):
+        while True:
+            try:
+                api = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            api.End()
+            with self._lock:
+                self._started -= 1
+
+
+def get_default_pool_size() -> int:
+    """Get how many engines this process needs to OCR its pages side by side"""
+    page_workers = int(os.getenv("OCR_PAGE_WORKERS", os.cpu_count() or 1))
+    return max(1, min(page_workers, get_core_share()))
+
+
+_pool: Optional[TesseractPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_tesseract_pool() -> TesseractPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TesseractPool()
+        return _pool
+
+
+def log_ocr_backend():
+    """Log which tesseract backend pages will be OCR'd with"""
+    if USE_TESSERACT_POOL:
+        logger.info("OCR backend: tesserocr, engines kept loaded per process")
+    elif pytesseract is not None:
+        reason = "tesserocr not found" if TESSERACT_POOL else "TESSERACT_POOL is off"
+        logger.info(
+            f"OCR backend: pytesseract, one tesseract process per page ({reason})"
+        )
+    else:
+        logger.warning(
+            "OCR backend: none, neither tesserocr nor pytesseract is installed "
+            "so scanned pages can't be OCR'd locally"
+        )
+
+
+def image_to_string(image: Any, dpi: int) -> str:
+    """OCR a PIL image rendered at dpi, as pytesseract.image_to_string() does"""
+    if not USE_TESSERACT_POOL:
+        return pytesseract.image_to_string(
+            image, lang=TESSERACT_LANG, config=f"--dpi {dpi}"
+        )
+
+    with get_tesseract_pool().engine() as api:
+        api.SetImage(image)
+        api.SetSourceResolution(dpi)
+        return api.GetUTF8Text()
+
+
+def image_to_data(image: Any, dpi: int) -> Dict[str, List[Any]]:
+    """
+    OCR a PIL image into its words, blocks and lines with their boxes
+
+    Returns the same dict of columns as pytesseract.image_to_data() with
+    output_type=Output.DICT.
+    """
+    if not USE_TESSERACT_POOL:
+        return pytesseract.image_to_data(
+            image,
+            lang=TESSERACT_LANG,
+            config=f"--dpi {dpi}",
+            output_type=pytesseract.Output.DICT,
+        )
+
+    with get_tesseract_pool().engine() as api:
+        api.SetImage(image)
+        api.SetSourceResolution(dpi)
+        return parse_tsv(api.GetTSVText(0) or "")
+
+
+def parse_tsv(tsv: str) -> Dict[str, List[Any]]:
+    """Parse tesseract's TSV output (without its header row) into columns"""
+    data: Dict[str, List[Any]] = {column: [] for column in TSV_COLUMNS}
+    for row in tsv.splitlines():
+        values = row.split("\t", len(TSV_COLUMNS) - 1)
+        if len(values) < len(TSV_COLUMNS) - 1:
+            continue
+
+        # Rows for blocks, paragraphs and lines have no text column
+        values += [""] * (len(TSV_COLUMNS) - len(values))
+        for column, value in zip(TSV_COLUMNS[:-2], values):
+            data[column].append(int(value))
+        data["conf"].append(float(values[-2]))
+        data["text"].append(values[-1])
+    return data
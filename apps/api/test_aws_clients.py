@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+import aws_clients
+
+
+class FakeSession:
+    """A session with credentials whose probe clients fail when told to"""
+
+    def __init__(self):
+        self.probes = 0
+        self.fail = False
+
+    def get_credentials(self):
+        return object()
+
+    def client(self, service, config=None):
+        session = self
+
+        class Client:
+            def list_buckets(self):
+                session.probes += 1
+                if session.fail:
+                    raise aws_clients.BotoCoreError()
+
+        return Client()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(aws_clients, "AWS_ENABLED", True)
+    monkeypatch.setattr(aws_clients, "_session", session)
+    monkeypatch.setattr(aws_clients, "_capabilities", {})
+    monkeypatch.setattr(aws_clients, "_probe_failed_at", {})
+    monkeypatch.setattr(aws_clients, "_probe_locks", {})
+    return session
+
+
+def test_service_without_a_probe_is_available_with_credentials(session):
+    result = []
+    thread = threading.Thread(
+        target=lambda: result.append(aws_clients.is_available("cognito-idp")),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=5)
+
+    assert result == [True]
+
+
+def test_successful_probe_is_cached(session):
+    assert aws_clients.is_available("s3")
+    assert aws_clients.is_available("s3")
+    assert session.probes == 1
+
+
+def test_failed_probe_is_retried_after_a_while(session, monkeypatch):
+    session.fail = True
+    assert not aws_clients.is_available("s3")
+    assert not aws_clients.is_available("s3")
+    assert session.probes == 1
+
+    session.fail = False
+    monkeypatch.setattr(aws_clients, "AWS_PROBE_RETRY_SECONDS", 0)
+    assert aws_clients.is_available("s3")
+    assert session.probes == 2
+    assert aws_clients.get_capabilities()["s3"] is True
+
+
+def test_disabled_aws_is_never_probed(session, monkeypatch):
+    monkeypatch.setattr(aws_clients, "AWS_ENABLED", False)
+    assert not aws_clients.is_available("s3")
+    assert session.probes == 0
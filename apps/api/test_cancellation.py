@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from cancellation import (
+    _marker_path,
+    get_cancel_key,
+    prune_cancellation_markers,
+    raise_if_cancelled,
+    request_cancellation,
+    run_cancellable,
+)
+from processing_errors import ProcessingCancelledError
+from processing_queue import ProcessingQueue
+
+
+def wait_for_cancellation(started: threading.Event):
+    started.set()
+    while True:
+        raise_if_cancelled()
+        time.sleep(0.01)
+
+
+def test_running_stage_stops_when_cancelled():
+    started = threading.Event()
+    errors = []
+
+    def run():
+        try:
+            run_cancellable("run-1", wait_for_cancellation, started)
+        except ProcessingCancelledError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(5)
+    request_cancellation("run-1")
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert len(errors) == 1
+    # The run's markers are removed when it stops
+    assert not os.path.exists(_marker_path("run-1", "cancel"))
+    assert not os.path.exists(_marker_path("run-1", "pid"))
+
+
+def test_run_cancelled_before_it_starts_never_runs():
+    request_cancellation("run-2")
+    with pytest.raises(ProcessingCancelledError):
+        run_cancellable("run-2", pytest.fail, "stage should not have run")
+
+
+def test_cancel_key_is_only_set_inside_the_run():
+    assert run_cancellable("run-3", get_cancel_key) == "run-3"
+    assert get_cancel_key() is None
+    raise_if_cancelled()
+
+
+def test_stale_markers_are_pruned():
+    request_cancellation("run-4")
+    assert prune_cancellation_markers(max_age_seconds=3600) == 0
+    assert prune_cancellation_markers(max_age_seconds=-1) >= 1
+    assert not os.path.exists(_marker_path("run-4", "cancel"))
+
+
+def test_cancelling_a_document_stops_its_running_job():
+    queue = ProcessingQueue(executor_mode="thread", max_workers=1)
+    job = {"id": "job-1", "document_id": "document-1", "attempts": 1}
+    started = threading.Event()
+    outcome = []
+
+    async def process_job(job):
+        try:
+            await queue.run_blocking(
+                wait_for_cancellation, started, cancel_key=queue._cancel_key(job)
+            )
+        except asyncio.CancelledError:
+            outcome.append("cancelled")
+            raise
+
+    queue.process_job = process_job
+
+    async def run():
+        task = asyncio.create_task(queue._run_job(job))
+        assert await asyncio.to_thread(started.wait, 5)
+        assert queue.cancel_document("document-1")
+        await asyncio.wait_for(task, 5)
+
+    try:
+        asyncio.run(run())
+    finally:
+        queue._executor.shutdown(wait=True)
+
+    assert outcome == ["cancelled"]
+    assert not queue.cancel_document("document-1")
+
+
+def test_deleted_document_jobs_lose_their_lease(db):
+    from job_queue import cancel_document_jobs, claim_next_job, is_job_leased_by
+    from test_job_queue import add_document, add_job
+
+    document = add_document(db)
+    job_id = add_job(db, document).id
+    claim_next_job(db, "worker-a")
+
+    assert cancel_document_jobs(db, document.id) == 1
+    db.commit()
+    # The worker's lease check now fails, so it cancels the run
+    assert not is_job_leased_by(db, job_id, "worker-a")
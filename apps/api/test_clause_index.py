@@ -0,0 +1,73 @@
+import zlib
+
+import pytest
+
+from clause_index import (
+    CLAUSE,
+    INDEX_HEADER,
+    SECTION,
+    SENTENCE,
+    ClauseIndex,
+    build_clause_index,
+)
+
+PAGE_ONE = (
+    "1. TERM\n"
+    "The term of this lease begins on January 1, 2024. It ends on "
+    "December 31, 2025.\n\n"
+)
+PAGE_TWO = (
+    "2. RENT\n"
+    "Tenant shall pay rent of $1,500 per month; and Landlord shall keep the "
+    "premises in repair.\n"
+)
+TEXT = PAGE_ONE + PAGE_TWO
+PAGE_OFFSETS = [(1, 0), (2, len(PAGE_ONE))]
+
+
+def test_round_trip_keeps_every_segment():
+    index = build_clause_index(TEXT, PAGE_OFFSETS)
+    decoded = ClauseIndex.decode(index.encode())
+
+    assert len(decoded) == len(index)
+    assert list(decoded.segments(TEXT)) == list(index.segments(TEXT))
+    for kind in (SECTION, SENTENCE, CLAUSE):
+        assert decoded.spans(kind) == index.spans(kind)
+
+
+def test_lookups_by_offset_after_decoding():
+    index = ClauseIndex.decode(build_clause_index(TEXT, PAGE_OFFSETS).encode())
+
+    rent = TEXT.index("$1,500")
+    sentence = index.find_segment(rent, SENTENCE)
+    assert TEXT[index.starts[sentence] : index.ends[sentence]].endswith(
+        "premises in repair."
+    )
+    assert index.get_page(rent) == 2
+    assert index.get_page(TEXT.index("January")) == 1
+
+    clause = index.find_segment(TEXT.index("Landlord shall"), CLAUSE)
+    assert index.parents[clause] == sentence
+    assert index.find_segment(len(TEXT) + 10) is None
+
+
+def test_segments_filter_by_kind_and_page():
+    index = build_clause_index(TEXT, PAGE_OFFSETS)
+
+    sections = list(index.segments(TEXT, kind="section"))
+    assert [section["page"] for section in sections] == [1, 2]
+    assert sections[1]["text"].startswith("2. RENT")
+    assert all(segment["page"] == 2 for segment in index.segments(TEXT, page=2))
+
+
+def test_text_without_page_offsets_has_no_pages():
+    index = ClauseIndex.decode(build_clause_index(TEXT).encode())
+    assert index.get_page(TEXT.index("$1,500")) is None
+    assert {segment["page"] for segment in index.segments(TEXT)} == {None}
+
+
+def test_decode_rejects_other_formats():
+    with pytest.raises(ValueError):
+        ClauseIndex.decode(zlib.compress(INDEX_HEADER.pack(b"LAYT", 1, 0)))
+    with pytest.raises(ValueError):
+        ClauseIndex.decode(zlib.compress(INDEX_HEADER.pack(b"CLIX", 9, 0)))
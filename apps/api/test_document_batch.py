@@ -0,0 +1,110 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import create_access_token
+from main import app, processing_queue
+from models import Document, DocumentStatus, ProcessingJob, User
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def headers(db):
+    db.add(
+        User(
+            id="batch-user",
+            email="batch@example.com",
+            first_name="Bulk",
+            last_name="Upload",
+            hashed_password="-",
+        )
+    )
+    db.commit()
+    token = create_access_token({"sub": "batch@example.com"})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "LOCAL_STORAGE_PATH", str(tmp_path))
+    return tmp_path
+
+
+def item(name: str, **values) -> dict:
+    return {
+        "filename": name,
+        "original_filename": name,
+        "mime_type": "application/pdf",
+        "s3_key": f"uploads/{name}",
+        "s3_bucket": "bucket",
+        **values,
+    }
+
+
+def post_batch(headers, *items):
+    return client.post(
+        "/documents/batch", json={"documents": list(items)}, headers=headers
+    )
+
+
+def test_mixed_batch_reports_each_item(db, headers, local_storage):
+    (local_storage / "broken.pdf").write_bytes(b"not a pdf")
+
+    response = post_batch(
+        headers,
+        item("lease.pdf"),
+        item("notes.txt", mime_type="text/plain"),
+        item("copy.pdf", s3_key="uploads/lease.pdf"),
+        item("broken.pdf", s3_key="broken.pdf", s3_bucket="local-storage"),
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["accepted"], body["failed"], body["rejected"]) == (1, 1, 2)
+    lease, notes, copy, broken = body["documents"]
+    assert lease["status"] == "processing" and lease["jobId"]
+    assert notes["status"] == "rejected" and notes["id"] is None
+    assert copy["error"] == "Duplicate s3_key in batch"
+    # Like POST /documents, files that can never be processed are kept as
+    # failed documents so the user sees why
+    assert broken["status"] == "failed" and broken["jobId"] is None
+    assert db.get(Document, broken["id"]).status == DocumentStatus.FAILED
+    assert db.get(Document, broken["id"]).extraction_error == broken["error"]
+    assert db.query(ProcessingJob).count() == 1
+
+
+def test_all_invalid_batch_is_not_refused_for_capacity(
+    db, headers, local_storage, monkeypatch
+):
+    (local_storage / "broken.pdf").write_bytes(b"not a pdf")
+    monkeypatch.setattr(processing_queue, "max_queue_size", 0)
+
+    response = post_batch(
+        headers,
+        item("notes.txt", mime_type="text/plain"),
+        item("broken.pdf", s3_key="broken.pdf", s3_bucket="local-storage"),
+    )
+
+    assert response.status_code == 200
+    assert [document["status"] for document in response.json()["documents"]] == [
+        "rejected",
+        "failed",
+    ]
+    assert db.query(ProcessingJob).count() == 0
+
+
+def test_batch_over_capacity_accepts_what_fits(db, headers, monkeypatch):
+    monkeypatch.setattr(processing_queue, "max_queue_size", 2)
+
+    response = post_batch(headers, *(item(f"lease-{n}.pdf") for n in range(3)))
+
+    assert response.status_code == 200
+    assert "Retry-After" in response.headers
+    statuses = [document["status"] for document in response.json()["documents"]]
+    assert statuses == ["processing", "processing", "rejected"]
+    assert response.json()["documents"][2]["error"] == "queue_full"
+
+    response = post_batch(headers, item("lease-3.pdf"))
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
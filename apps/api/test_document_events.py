@@ -0,0 +1,101 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from auth import create_access_token, create_events_token
+from main import app
+from models import Document, DocumentStatus, User
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def document(db):
+    user = User(
+        id=str(uuid.uuid4()),
+        email="events@example.com",
+        first_name="Event",
+        last_name="Stream",
+        hashed_password="-",
+    )
+    document = Document(
+        id=str(uuid.uuid4()),
+        user_id=user.id,
+        filename="lease.pdf",
+        original_filename="lease.pdf",
+        s3_key="lease.pdf",
+        s3_bucket="bucket",
+        status=DocumentStatus.COMPLETED,
+        pipeline_stage="finalize",
+    )
+    db.add_all([user, document])
+    db.commit()
+    return document
+
+
+def bearer(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def test_stream_accepts_events_token_in_url(document):
+    response = client.post(
+        f"/documents/{document.id}/events-token", headers=bearer("events@example.com")
+    )
+    assert response.status_code == 200
+    token = response.json()["token"]
+
+    response = client.get(f"/documents/{document.id}/events?token={token}")
+    assert response.status_code == 200
+    assert "event: status" in response.text
+    assert '"status": "completed"' in response.text
+
+
+def test_stream_accepts_bearer_header(document):
+    response = client.get(
+        f"/documents/{document.id}/events", headers=bearer("events@example.com")
+    )
+    assert response.status_code == 200
+
+
+def test_stream_rejects_missing_or_foreign_tokens(document):
+    assert client.get(f"/documents/{document.id}/events").status_code == 401
+
+    other = create_events_token("events@example.com", str(uuid.uuid4()))
+    response = client.get(f"/documents/{document.id}/events?token={other}")
+    assert response.status_code == 401
+
+    access = create_access_token({"sub": "events@example.com"})
+    response = client.get(f"/documents/{document.id}/events?token={access}")
+    assert response.status_code == 401
+
+
+def test_events_token_is_not_an_access_token(document):
+    token = create_events_token("events@example.com", document.id)
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_stream_holds_no_database_connection(db, document, monkeypatch):
+    from models import engine
+
+    document.status = DocumentStatus.PROCESSING
+    db.commit()
+    url = f"/documents/{document.id}/events"
+    # The test's own session holds one to reload the document
+    held = engine.pool.checkedout()
+    get_progress = main._get_document_progress
+    checked_out = []
+
+    def poll(document_id):
+        # Connections held while the stream waits between polls
+        checked_out.append(engine.pool.checkedout())
+        return get_progress(document_id) if len(checked_out) == 1 else None
+
+    monkeypatch.setattr(main, "_get_document_progress", poll)
+    monkeypatch.setattr(main, "DOCUMENT_EVENTS_POLL_INTERVAL", 0.01)
+
+    response = client.get(url, headers=bearer("events@example.com"))
+    assert "event: deleted" in response.text
+    assert checked_out == [held, held]
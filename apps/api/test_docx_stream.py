@@ -0,0 +1,177 @@
+import zipfile
+
+from docx_stream import (
+    MC_NAMESPACE,
+    RELATIONSHIPS_NAMESPACE,
+    W_NAMESPACE,
+    extract_docx_text,
+    find_main_document_part,
+    iter_docx_blocks,
+)
+
+RELATIONSHIP_TYPE = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+)
+
+
+def paragraph(*runs: str) -> str:
+    return f"<w:p><w:r>{''.join(runs)}</w:r></w:p>"
+
+
+def text(value: str) -> str:
+    return f'<w:t xml:space="preserve">{value}</w:t>'
+
+
+def table(*rows) -> str:
+    cells = (
+        "<w:tr>" + "".join(f"<w:tc>{''.join(cell)}</w:tc>" for cell in row) + "</w:tr>"
+        for row in rows
+    )
+    return f"<w:tbl>{''.join(cells)}</w:tbl>"
+
+
+def part(root: str, body: str) -> str:
+    return f'<w:{root} xmlns:w="{W_NAMESPACE}">{body}</w:{root}>'
+
+
+def relationships(*targets) -> str:
+    return (
+        f'<Relationships xmlns="{RELATIONSHIPS_NAMESPACE}">'
+        + "".join(
+            f'<Relationship Id="rId{number}" Type="{kind}" Target="{target}"/>'
+            for number, (kind, target) in enumerate(targets)
+        )
+        + "</Relationships>"
+    )
+
+
+def write_docx(path, body: str, parts=None, document_part="word/document.xml"):
+    """Write a minimal DOCX with the body, plus header and footer parts"""
+    parts = parts or {}
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(
+            "_rels/.rels",
+            relationships((f"{RELATIONSHIP_TYPE}/officeDocument", document_part)),
+        )
+        archive.writestr(document_part, part("document", f"<w:body>{body}</w:body>"))
+        archive.writestr(
+            document_part.replace("word/", "word/_rels/") + ".rels",
+            relationships(
+                *(
+                    (f"{RELATIONSHIP_TYPE}/{name.rstrip('0123456789')}", f"{name}.xml")
+                    for name in parts
+                )
+            ),
+        )
+        for name, content in parts.items():
+            root = "hdr" if name.startswith("header") else "ftr"
+            archive.writestr(f"word/{name}.xml", part(root, content))
+    return str(path)
+
+
+def test_blocks_come_in_reading_order(tmp_path):
+    docx = write_docx(
+        tmp_path / "lease.docx",
+        paragraph(text("1. TERM"))
+        + paragraph(text("Twelve months."))
+        + table(
+            [[paragraph(text("Month 1"))], [paragraph(text("$4,500.00"))]],
+            [[paragraph(text("Month 2"))], [paragraph(text("$4,510.00"))]],
+        )
+        + paragraph(text("2. RENT")),
+        parts={
+            "footer1": paragraph(text("Tenant initials: ____")),
+            "header2": paragraph(text("LEASE AGREEMENT")),
+            "header1": paragraph(text("LEASE AGREEMENT")),
+        },
+    )
+
+    assert list(iter_docx_blocks(docx)) == [
+        ("header", "LEASE AGREEMENT"),
+        ("paragraph", "1. TERM"),
+        ("paragraph", "Twelve months."),
+        ("table_row", "Month 1 | $4,500.00"),
+        ("table_row", "Month 2 | $4,510.00"),
+        ("paragraph", "2. RENT"),
+        ("footer", "Tenant initials: ____"),
+    ]
+
+
+def test_runs_tabs_breaks_and_tracked_deletions(tmp_path):
+    docx = write_docx(
+        tmp_path / "lease.docx",
+        paragraph(text("Rent"), "<w:tab/>", text("$4,500"), "<w:br/>", text("due"))
+        + '<w:p><w:r><w:t>Deposit of </w:t></w:r><w:del w:id="1"><w:r>'
+        "<w:delText>two</w:delText><w:t>two</w:t></w:r></w:del>"
+        "<w:r><w:t>one month</w:t></w:r></w:p>" + paragraph(text("   ")),
+    )
+
+    assert extract_docx_text(docx) == "Rent\t$4,500\ndue\nDeposit of one month"
+
+
+def test_nested_table_cells_stay_in_their_row(tmp_path):
+    nested = table([[paragraph(text("Year 1"))], [paragraph(text("$54,000"))]])
+    docx = write_docx(
+        tmp_path / "lease.docx",
+        table([[paragraph(text("Schedule"))], [nested]]),
+    )
+
+    assert extract_docx_text(docx) == "Schedule | Year 1 $54,000"
+
+
+def test_main_part_is_found_through_the_package_relationships(tmp_path):
+    docx = write_docx(
+        tmp_path / "lease.docx",
+        paragraph(text("Renamed body")),
+        document_part="word/document2.xml",
+    )
+
+    with zipfile.ZipFile(docx) as archive:
+        assert find_main_document_part(archive) == "word/document2.xml"
+    assert extract_docx_text(docx) == "Renamed body"
+
+
+def test_missing_main_part(tmp_path):
+    path = tmp_path / "empty.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("docProps/app.xml", "<Properties/>")
+
+    with zipfile.ZipFile(path) as archive:
+        assert find_main_document_part(archive) is None
+
+
+def text_box(*paragraphs: str) -> str:
+    return f"<w:txbxContent>{''.join(paragraphs)}</w:txbxContent>"
+
+
+def test_text_boxes_are_read_once_inside_their_paragraph(tmp_path):
+    # Word writes a text box as a DrawingML Choice with a VML Fallback copy
+    drawing = (
+        f'<mc:AlternateContent xmlns:mc="{MC_NAMESPACE}">'
+        '<mc:Choice Requires="wps"><w:drawing><wps:txbx>'
+        + text_box(paragraph(text("Parking area")), paragraph(text("12 spaces")))
+        + "</wps:txbx></w:drawing></mc:Choice>"
+        "<mc:Fallback><w:pict><v:textbox>"
+        + text_box(paragraph(text("Parking area")), paragraph(text("12 spaces")))
+        + "</v:textbox></w:pict></mc:Fallback></mc:AlternateContent>"
+    )
+    body = (
+        "<w:p><w:r>"
+        + text("See the site plan")
+        + f"</w:r><w:r>{drawing}</w:r><w:r>"
+        + text("in Exhibit B.")
+        + "</w:r></w:p>"
+        + table([[f"<w:p><w:r>{text('Cell')}</w:r><w:r>{drawing}</w:r></w:p>"]])
+    )
+    docx = write_docx(
+        tmp_path / "lease.docx",
+        body.replace(
+            "<w:drawing>",
+            '<w:drawing xmlns:wps="urn:wps" xmlns:v="urn:vml">',
+        ).replace("<w:pict>", '<w:pict xmlns:v="urn:vml">'),
+    )
+
+    assert list(iter_docx_blocks(docx)) == [
+        ("paragraph", "See the site plan\nParking area\n12 spaces\nin Exhibit B."),
+        ("table_row", "Cell\nParking area\n12 spaces"),
+    ]
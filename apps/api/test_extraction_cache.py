@@ -0,0 +1,109 @@
+import hashlib
+
+import pytest
+
+import pipeline
+from extraction_cache import (
+    compute_content_hash,
+    evict_extractions,
+    get_cached_extraction,
+    store_extraction,
+)
+from models import ExtractionCacheEntry
+
+LEASE_TEXT = "This lease is made between the landlord and the tenant. " * 4
+
+
+def extraction(text: str = LEASE_TEXT) -> dict:
+    return {"text": text, "pages": [text], "error": None, "engine": "text_layer"}
+
+
+def test_content_hash_is_the_sha256_of_the_file_bytes(tmp_path):
+    lease = tmp_path / "lease.pdf"
+    lease.write_bytes(b"%PDF-1.4 lease")
+    renamed = tmp_path / "renamed.pdf"
+    renamed.write_bytes(b"%PDF-1.4 lease")
+    edited = tmp_path / "edited.pdf"
+    edited.write_bytes(b"%PDF-1.4 lease, amended")
+
+    assert (
+        compute_content_hash(str(lease))
+        == hashlib.sha256(b"%PDF-1.4 lease").hexdigest()
+    )
+    assert compute_content_hash(str(renamed)) == compute_content_hash(str(lease))
+    assert compute_content_hash(str(edited)) != compute_content_hash(str(lease))
+
+
+def test_entries_are_keyed_by_hash_and_extractor_version(db):
+    store_extraction("abc", "2:tesseract", extraction())
+
+    cached = get_cached_extraction("abc", "2:tesseract")
+    assert cached["text"] == LEASE_TEXT
+    assert cached["engine"] == "text_layer"
+    assert get_cached_extraction("abc", "2:none") is None
+    assert get_cached_extraction("def", "2:tesseract") is None
+
+    get_cached_extraction("abc", "2:tesseract")
+    assert db.query(ExtractionCacheEntry).one().hit_count == 2
+
+
+def test_storing_an_extraction_twice_keeps_the_first(db):
+    store_extraction("abc", "2", extraction())
+    store_extraction("abc", "2", extraction("Extracted again " * 10))
+
+    assert get_cached_extraction("abc", "2")["text"] == LEASE_TEXT
+    assert db.query(ExtractionCacheEntry).count() == 1
+
+
+def test_eviction_removes_least_recently_used_entries(db):
+    for content_hash in ("old", "used", "new"):
+        store_extraction(content_hash, "2", extraction())
+    get_cached_extraction("old", "2")
+
+    entry_bytes = db.query(ExtractionCacheEntry).first().size_bytes
+    assert evict_extractions(2 * entry_bytes) == 1
+    assert get_cached_extraction("used", "2") is None
+    assert get_cached_extraction("old", "2") is not None
+    assert get_cached_extraction("new", "2") is not None
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Turn the cache on and count the extractions that actually run"""
+    calls = []
+
+    def extract(file_path, mime_type):
+        calls.append(file_path)
+        return extraction()
+
+    monkeypatch.setattr(pipeline, "EXTRACTION_CACHE_ENABLED", True)
+    monkeypatch.setattr(pipeline, "extract_text_from_document", extract)
+    return calls
+
+
+def test_reuploaded_file_skips_extraction(db, tmp_path, extractions):
+    first = tmp_path / "first.pdf"
+    first.write_bytes(b"%PDF-1.4 lease")
+    second = tmp_path / "second.pdf"
+    second.write_bytes(b"%PDF-1.4 lease")
+
+    updates = pipeline.extract_text_stage("doc-1", str(first), "application/pdf")
+    assert updates["extraction_cache_hit"] is False
+
+    updates = pipeline.extract_text_stage("doc-2", str(second), "application/pdf")
+    assert updates["extraction_cache_hit"] is True
+    assert updates["extracted_text"] == LEASE_TEXT
+    assert updates["extraction_timings"] is None
+    assert extractions == [str(first)]
+
+
+def test_new_extractor_version_misses_the_cache(db, tmp_path, extractions, monkeypatch):
+    lease = tmp_path / "lease.pdf"
+    lease.write_bytes(b"%PDF-1.4 lease")
+
+    pipeline.extract_text_stage("doc-1", str(lease), "application/pdf")
+    monkeypatch.setattr(pipeline, "get_extractor_version", lambda: "3:tesseract")
+    updates = pipeline.extract_text_stage("doc-1", str(lease), "application/pdf")
+
+    assert updates["extraction_cache_hit"] is False
+    assert len(extractions) == 2
@@ -0,0 +1,105 @@
+import pytest
+
+import extraction_engines
+from extraction_engines import ExtractionEngine, register_engine, select_engine
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    """An empty registry, so tests see only the engines they register"""
+    monkeypatch.setattr(extraction_engines, "_engines", {})
+    monkeypatch.setattr(extraction_engines, "ENGINE_MIN_MEASURED_PAGES", 20)
+
+
+def engine(name, page_seconds=1.0, available=True, **options) -> ExtractionEngine:
+    return register_engine(
+        ExtractionEngine(
+            name,
+            options.pop("kind", "ocr"),
+            options.pop("mime_types", [PDF]),
+            extract=lambda *args: None,
+            is_available=lambda: available,
+            page_seconds=page_seconds,
+            **options,
+        )
+    )
+
+
+def probe(page_count=10, file_size=1_000_000, mime_type=PDF) -> dict:
+    return {"mime_type": mime_type, "page_count": page_count, "file_size": file_size}
+
+
+def test_engines_are_filtered_by_what_they_can_handle():
+    engine("docx", page_seconds=0.01, kind="document", mime_types=[DOCX])
+    engine("offline", page_seconds=0.01, kind="document", available=False)
+    engine("short", page_seconds=0.1, kind="document", max_pages=5)
+    engine("small", page_seconds=0.2, kind="document", max_file_bytes=500_000)
+    engine("any", page_seconds=5.0, kind="document")
+
+    assert select_engine("document", probe()).name == "any"
+    assert select_engine("document", probe(page_count=5)).name == "short"
+    assert select_engine("document", probe(file_size=400_000)).name == "small"
+    assert select_engine("document", probe(page_count=5, file_size=400_000)).name == (
+        "short"
+    )
+    assert select_engine("document", probe(mime_type=DOCX)).name == "docx"
+    # Limits can't be checked when the probe doesn't know the page count
+    assert select_engine("document", probe(page_count=None)).name == "any"
+    assert select_engine("text_layer", probe()) is None
+
+
+def test_cheapest_engine_is_selected():
+    engine("tesseract", page_seconds=2.0, parallelism=4)
+    engine("textract", page_seconds=1.0, overhead_seconds=3.0)
+
+    # 10 pages: 2s x 10 / 4 = 5s against 3s + 1s x 10 = 13s
+    assert select_engine("ocr", probe()).name == "tesseract"
+    # 1 page: 2s against 4s
+    assert select_engine("ocr", probe(page_count=1)).name == "tesseract"
+
+    engine("fast", page_seconds=0.1, overhead_seconds=1.0)
+    assert select_engine("ocr", probe()).name == "fast"
+
+
+def test_whole_document_engines_are_costed_on_every_page():
+    engine("per_page", page_seconds=1.0)
+    engine("whole", page_seconds=0.2, whole_document=True)
+
+    # For the whole document 0.2s x 100 pages beats 1s x 100 pages, but for
+    # 3 pages of it the whole-document engine still reads all 100
+    assert select_engine("ocr", probe(page_count=100)).name == "whole"
+    assert select_engine("ocr", probe(page_count=100), page_count=3).name == (
+        "per_page"
+    )
+
+
+def test_measured_page_cost_replaces_the_declared_one():
+    tesseract = engine("tesseract", page_seconds=1.0, overhead_seconds=0.5)
+
+    tesseract.record(pages=10, seconds=2.0)
+    assert tesseract.get_page_seconds() == 1.0
+
+    tesseract.record(pages=10, seconds=2.0)
+    # Measured over 20 pages, less the declared overhead of each document
+    assert tesseract.get_page_seconds() == pytest.approx((4.0 - 2 * 0.5) / 20)
+    assert tesseract.estimate_seconds(10) == pytest.approx(0.5 + 0.15 * 10)
+
+
+def test_measured_cost_changes_the_selection():
+    slow = engine("declared_slow", page_seconds=2.0)
+    engine("declared_fast", page_seconds=1.0)
+    assert select_engine("ocr", probe()).name == "declared_fast"
+
+    slow.record(pages=20, seconds=4.0)
+    assert select_engine("ocr", probe()).name == "declared_slow"
+
+
+def test_page_cost_can_be_overridden_from_the_environment(monkeypatch):
+    monkeypatch.setenv("ENGINE_TUNED_PAGE_SECONDS", "0.25")
+    monkeypatch.setenv("ENGINE_TUNED_OVERHEAD_SECONDS", "2")
+
+    tuned = engine("tuned", page_seconds=1.0)
+    assert (tuned.page_seconds, tuned.overhead_seconds) == (0.25, 2.0)
@@ -0,0 +1,213 @@
+import uuid
+from datetime import datetime, timedelta
+
+import job_queue
+from auth import create_access_token
+from job_queue import (
+    claim_next_job,
+    enqueue_job,
+    extend_job_lease,
+    get_queue_wait_stats,
+    is_job_leased_by,
+    recover_orphaned_jobs,
+    retry_job,
+)
+from models import (
+    Document,
+    DocumentStatus,
+    JobPriority,
+    JobStatus,
+    ProcessingJob,
+    SessionLocal,
+    User,
+)
+
+
+def add_document(db, user_id="user-1", status=DocumentStatus.UPLOADED) -> Document:
+    document = Document(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        filename="lease.pdf",
+        original_filename="lease.pdf",
+        s3_key="lease.pdf",
+        s3_bucket="bucket",
+        status=status,
+        updated_at=datetime.utcnow(),
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+
+def add_job(db, document: Document, **values) -> ProcessingJob:
+    job = enqueue_job(
+        db, document.id, document.user_id, document.s3_key, document.s3_bucket
+    )
+    for column, value in values.items():
+        setattr(job, column, value)
+    db.commit()
+    return job
+
+
+def expire_lease(db, job: ProcessingJob):
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+
+def test_claimed_job_is_leased_to_one_worker(db):
+    job = add_job(db, add_document(db))
+
+    claimed = claim_next_job(db, "worker-a")
+    assert claimed.id == job.id
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.attempts == 1
+    assert claim_next_job(db, "worker-b") is None
+
+    assert is_job_leased_by(db, job.id, "worker-a")
+    assert not is_job_leased_by(db, job.id, "worker-b")
+    assert extend_job_lease(db, job.id, "worker-a")
+    assert not extend_job_lease(db, job.id, "worker-b")
+
+
+def test_expired_lease_is_claimed_again(db):
+    job = add_job(db, add_document(db))
+    claim_next_job(db, "worker-a")
+    expire_lease(db, db.get(ProcessingJob, job.id))
+
+    claimed = claim_next_job(db, "worker-b")
+    assert claimed.id == job.id
+    assert claimed.attempts == 2
+    assert not is_job_leased_by(db, job.id, "worker-a")
+    assert not extend_job_lease(db, job.id, "worker-a")
+
+
+def test_expired_lease_after_last_attempt_fails_the_job(db):
+    document = add_document(db)
+    job = add_job(db, document, max_attempts=1)
+    claim_next_job(db, "worker-a")
+    expire_lease(db, db.get(ProcessingJob, job.id))
+
+    assert claim_next_job(db, "worker-b") is None
+    assert recover_orphaned_jobs(db)["failed_jobs"] == 1
+
+    db.expire_all()
+    assert db.get(ProcessingJob, job.id).status == JobStatus.FAILED
+    assert db.get(Document, document.id).status == DocumentStatus.FAILED
+
+
+def test_stranded_document_is_requeued_once(db):
+    document = add_document(db, status=DocumentStatus.PROCESSING)
+
+    assert recover_orphaned_jobs(db)["requeued_documents"] == 1
+    assert recover_orphaned_jobs(db)["requeued_documents"] == 0
+    assert db.query(ProcessingJob).count() == 1
+    assert db.query(ProcessingJob).one().document_id == document.id
+
+
+def test_concurrent_recovery_requeues_once(db, monkeypatch):
+    add_document(db, status=DocumentStatus.PROCESSING)
+
+    # Another process reads the same stranded document, then re-queues it
+    # first, while this one is between reading and re-queueing
+    claim = job_queue._claim_stranded_document
+
+    def claim_after_other_process(db, document, active_document_ids, now):
+        monkeypatch.setattr(job_queue, "_claim_stranded_document", claim)
+        other = SessionLocal()
+        try:
+            assert recover_orphaned_jobs(other)["requeued_documents"] == 1
+        finally:
+            other.close()
+        return claim(db, document, active_document_ids, now)
+
+    monkeypatch.setattr(
+        job_queue, "_claim_stranded_document", claim_after_other_process
+    )
+    assert recover_orphaned_jobs(db)["requeued_documents"] == 0
+    assert db.query(ProcessingJob).count() == 1
+
+
+def test_fair_share_serves_each_user_in_turn(db):
+    bulk = [add_job(db, add_document(db, "bulk-user")) for _ in range(3)]
+    other = add_job(db, add_document(db, "other-user"))
+    for job in bulk:
+        job.created_at = job.available_at = datetime.utcnow() - timedelta(minutes=5)
+    db.commit()
+
+    # The bulk user's jobs waited longest, but once one of them runs the
+    # other user, with nothing running, goes next
+    assert claim_next_job(db, "worker-a").id == bulk[0].id
+    assert claim_next_job(db, "worker-b").id == other.id
+    assert claim_next_job(db, "worker-c").id == bulk[1].id
+
+
+def test_interactive_jobs_overtake_bulk_jobs(db):
+    bulk = add_job(db, add_document(db, "bulk-user"), priority=JobPriority.BULK)
+    bulk.available_at = datetime.utcnow() - timedelta(minutes=5)
+    db.commit()
+    interactive = add_job(db, add_document(db, "bulk-user"))
+
+    assert claim_next_job(db, "worker-a").id == interactive.id
+    assert claim_next_job(db, "worker-b").id == bulk.id
+
+
+def test_queue_wait_stats_can_be_scoped_to_one_user(db):
+    add_job(db, add_document(db, "user-1"))
+    add_job(db, add_document(db, "other-user"))
+    claim_next_job(db, "worker-a")
+
+    assert set(get_queue_wait_stats(db)["users"]) == {"user-1", "other-user"}
+    assert set(get_queue_wait_stats(db, user_id="user-1")["users"]) == {"user-1"}
+
+
+def test_queue_stats_endpoint_only_shows_the_callers_jobs(db):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    db.add(
+        User(
+            id="user-1",
+            email="stats@example.com",
+            first_name="Queue",
+            last_name="Stats",
+            hashed_password="-",
+        )
+    )
+    add_job(db, add_document(db, "user-1"))
+    add_job(db, add_document(db, "other-user"))
+
+    token = create_access_token({"sub": "stats@example.com"})
+    response = TestClient(app).get(
+        "/queue/stats", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert list(response.json()["queue_wait"]["users"]) == ["user-1"]
+    assert response.json()["queue_wait"]["users"]["user-1"]["queued"] == 1
+
+
+def test_retry_delay_backs_off_exponentially_with_jitter(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_DELAY_SECONDS", 5)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_MAX_DELAY_SECONDS", 60)
+
+    for attempts, delay in [(1, 5), (2, 10), (3, 20), (4, 40), (5, 60), (9, 60)]:
+        delays = [job_queue.compute_retry_delay(attempts) for _ in range(200)]
+        assert all(delay / 2 <= seconds <= delay for seconds in delays)
+        # Half of each delay is random, so retries that failed together spread
+        assert max(delays) - min(delays) > delay / 4
+
+
+def test_retried_job_waits_for_its_delay(db):
+    job = add_job(db, add_document(db))
+    claim_next_job(db, "worker-a")
+
+    retry_job(db, job.id, "throttled", delay_seconds=60)
+    db.commit()
+    assert claim_next_job(db, "worker-a") is None
+
+    db.get(ProcessingJob, job.id).available_at = datetime.utcnow()
+    db.commit()
+    claimed = claim_next_job(db, "worker-a")
+    assert claimed.id == job.id
+    assert claimed.attempts == 2
+    assert claimed.last_error == "throttled"
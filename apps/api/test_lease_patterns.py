@@ -0,0 +1,145 @@
+import re
+from pathlib import Path
+
+import PyPDF2
+import pytest
+
+from clause_index import build_clause_index
+from lease_patterns import LEASE_PATTERNS, LeaseTermScanner
+from nlp_service import _find_clauses
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+SAMPLE_PATHS = sorted(SAMPLES_PATH.glob("*.pdf"))
+
+PATTERNS = [
+    (field, number, pattern)
+    for field, patterns in LEASE_PATTERNS.items()
+    for number, pattern in enumerate(patterns)
+]
+
+
+# The unbounded clause patterns the extractors used before the scanner, with
+# the longest clause each one kept
+UNBOUNDED_CLAUSE_PATTERNS = {
+    "escalation": (
+        200,
+        [
+            r"(?i)(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
+            r"(?i)(?:annual|yearly)\s+(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
+            r"(?i)rent\s+(?:shall\s+)?(?:escalat|increas)[es\w]*.*?(\d+(?:\.\d+)?%)",
+        ],
+    ),
+    "renewal": (
+        300,
+        [
+            r"(?i)(?:renewal|extend|extension)\s+option[s]?[^.]*\.",
+            r"(?i)tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+"
+            r"(?:renew|extend)[^.]*\.",
+            r"(?i)(?:renew|extend)\s+(?:this\s+)?lease[^.]*\.",
+        ],
+    ),
+    "termination": (
+        300,
+        [
+            r"(?i)(?:early\s+)?terminat[ion\w]*[^.]*\.",
+            r"(?i)tenant\s+(?:may|shall have|has)\s+(?:the\s+)?(?:right|option)\s+to\s+"
+            r"terminat[e\w]*[^.]*\.",
+            r"(?i)(?:break|cancel)[^.]*lease[^.]*\.",
+        ],
+    ),
+    "use": (
+        300,
+        [
+            r"(?i)(?:permitted|allowed)\s+use[s]?[^.]*\.",
+            r"(?i)(?:prohibited|forbidden|not\s+permitted)\s+use[s]?[^.]*\.",
+            r"(?i)premises\s+(?:shall|may)\s+(?:only\s+)?be\s+used[^.]*\.",
+            r"(?i)tenant\s+(?:shall|may)\s+use\s+(?:the\s+)?premises[^.]*\.",
+        ],
+    ),
+    "assignment": (
+        300,
+        [
+            r"(?i)(?:assignment|assign)[^.]*\.",
+            r"(?i)(?:sublet|subletting|sublease)[^.]*\.",
+            r"(?i)tenant\s+(?:may|shall)\s+not\s+(?:assign|sublet)[^.]*\.",
+            r"(?i)(?:transfer|convey)[^.]*lease[^.]*\.",
+        ],
+    ),
+}
+
+
+def pdf_text(pdf_path: Path) -> str:
+    reader = PyPDF2.PdfReader(str(pdf_path))
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def match_spans(matches):
+    return [match.span() for match in matches]
+
+
+@pytest.mark.parametrize("pdf_path", SAMPLE_PATHS, ids=lambda path: path.stem[:20])
+def test_scanner_matches_full_text_scan(pdf_path):
+    text = pdf_text(pdf_path)
+    scanner = LeaseTermScanner(text)
+
+    for field, number, pattern in PATTERNS:
+        expected = match_spans(pattern.regex.finditer(text))
+        assert match_spans(scanner.finditer(pattern)) == expected, (field, number)
+
+        first = pattern.regex.search(text)
+        found = scanner.search(pattern)
+        assert (found and found.span()) == (first and first.span()), (field, number)
+
+
+def test_long_prefix_before_anchor_is_matched():
+    # Landlord pattern 4 reads a name and up to 300 characters back from
+    # "landlord", further than a fixed window around the anchor would reach
+    text = "Acme Holdings LLC " + "x" * 290 + " landlord."
+    pattern = LEASE_PATTERNS["landlord"][3]
+
+    match = LeaseTermScanner(text).search(pattern)
+    assert match is not None
+    assert match.group(1).strip() == "Acme Holdings LLC"
+
+
+def test_sentence_spans_contain_anchors():
+    text = "The Landlord is Acme LLC. Rent is due monthly. Tenant may assign."
+    scanner = LeaseTermScanner(text, build_clause_index(text))
+
+    pattern = LEASE_PATTERNS["assignment"][0]
+    assert [text[start:end] for start, end in scanner.get_spans(pattern)] == [
+        "Tenant may assign."
+    ]
+    source = scanner.source(scanner.search(pattern))
+    assert text[source["start"] : source["end"]] == "assign."
+
+
+@pytest.mark.parametrize("pdf_path", SAMPLE_PATHS, ids=lambda path: path.stem[:20])
+@pytest.mark.parametrize("field", sorted(UNBOUNDED_CLAUSE_PATTERNS))
+def test_clauses_match_unbounded_patterns(pdf_path, field):
+    text = pdf_text(pdf_path)
+    max_length, patterns = UNBOUNDED_CLAUSE_PATTERNS[field]
+    expected = [
+        match.group(0).strip()
+        for pattern in patterns
+        for match in re.finditer(pattern, text)
+        if len(match.group(0).strip()) < max_length
+    ]
+
+    clauses = _find_clauses(LeaseTermScanner(text), field, max_length)
+    assert [clause for clause, _ in clauses] == expected
+
+
+def test_clause_running_on_hides_later_anchors_up_to_its_period():
+    # Unbounded, the first "assign" matched up to the period and was dropped
+    # as too long, so the "assignment" inside it never started a match
+    text = "Tenant may assign " + "x " * 200 + "by assignment. Tenant may assign."
+    pattern = LEASE_PATTERNS["assignment"][0]
+
+    for scanner in (
+        LeaseTermScanner(text),
+        LeaseTermScanner(text, build_clause_index(text)),
+    ):
+        assert [match.group(0) for match in scanner.find_clauses(pattern)] == [
+            "assign."
+        ]
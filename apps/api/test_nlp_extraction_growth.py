@@ -0,0 +1,50 @@
+import time
+from functools import partial
+
+import pytest
+
+from benchmark_nlp_extraction import CORPORA, time_extraction
+from lease_patterns import LEASE_PATTERNS, LeaseTermScanner
+
+SMALL_CHARS = 8000
+LARGE_CHARS = 4 * SMALL_CHARS
+
+# Linear matching takes about 4x as long on 4x the text, quadratic 16x. Times
+# under the floor are too short to compare reliably.
+MAX_GROWTH = 8
+FLOOR_SECONDS = 0.02
+
+
+def time_all_matches(text: str) -> float:
+    """Time iterating every match of every pattern, with no budget"""
+    best = float("inf")
+    for _ in range(3):
+        scanner = LeaseTermScanner(text)
+        started = time.perf_counter()
+        for patterns in LEASE_PATTERNS.values():
+            for pattern in patterns:
+                for _ in scanner.finditer(pattern):
+                    pass
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+TIMERS = {
+    "extraction": partial(time_extraction, use_index=False),
+    "extraction with index": partial(time_extraction, use_index=True),
+    "all matches": time_all_matches,
+}
+
+
+@pytest.mark.parametrize("corpus", list(CORPORA))
+@pytest.mark.parametrize("timer", list(TIMERS))
+def test_matching_grows_linearly(corpus, timer):
+    build, timer = CORPORA[corpus], TIMERS[timer]
+    timer(build(SMALL_CHARS))  # warm up
+
+    small = timer(build(SMALL_CHARS))
+    large = timer(build(LARGE_CHARS))
+    assert large < max(MAX_GROWTH * small, FLOOR_SECONDS), (
+        f"{corpus}: {small:.4f}s at {SMALL_CHARS} chars, "
+        f"{large:.4f}s at {LARGE_CHARS} chars"
+    )
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from ocr_preprocessing import otsu_threshold, preprocess_image
+
+
+@pytest.mark.parametrize("level", [0, 128, 255])
+def test_uniform_page_has_no_ink(level):
+    pixels = np.full((110, 85), level, dtype=np.uint8)
+    assert otsu_threshold(pixels) == 0
+
+
+def test_blank_page_is_returned_whole():
+    image = Image.new("L", (850, 1100), 255)
+    prepared = preprocess_image(image, 300)
+
+    assert prepared.size == image.size
+    assert np.asarray(prepared).min() == 255
+    assert prepared.info["page_box"] == (0.0, 0.0, 1.0, 1.0)
+
+
+def test_threshold_separates_ink_from_paper():
+    pixels = np.full((100, 100), 240, dtype=np.uint8)
+    pixels[40:60, 10:90] = 20
+    threshold = otsu_threshold(pixels)
+    assert 20 < threshold <= 240
+
+
+def test_page_is_cropped_to_ink():
+    image = Image.new("L", (850, 1100), 255)
+    ImageDraw.Draw(image).rectangle((200, 300, 600, 700), fill=0)
+    prepared = preprocess_image(image, 300, ["grayscale", "binarize", "crop"])
+
+    left, top, right, bottom = prepared.info["page_box"]
+    assert 0 < left < 200 / 850 and 600 / 850 < right < 1
+    assert 0 < top < 300 / 1100 and 700 / 1100 < bottom < 1
@@ -0,0 +1,234 @@
+import threading
+import time
+from pathlib import Path
+
+import PyPDF2
+import pytest
+
+import extraction_engines
+import ocr_service
+from extraction_engines import ExtractionEngine, register_engine
+from ocr_service import _plan_raster_windows
+
+LETTER = (612.0, 792.0)
+# A letter page rendered at 200 DPI in grayscale, as pdf2image holds it
+LETTER_BYTES = 1700 * 2200 * ocr_service.RASTER_COPIES
+
+
+def letter_pages(*page_numbers):
+    return [(page_num, LETTER) for page_num in page_numbers]
+
+
+def test_windows_hold_at_most_the_window_pages():
+    windows = _plan_raster_windows(
+        letter_pages(*range(1, 21)), dpi=200, window_pages=8, memory_mb=1024
+    )
+    # The last window takes the pages left over
+    assert windows == [(1, 8, 200), (9, 16, 200), (17, 20, 200)]
+
+
+def test_windows_stay_within_the_memory_limit():
+    memory_mb = 3 * LETTER_BYTES // (1024 * 1024) + 1
+    windows = _plan_raster_windows(
+        letter_pages(*range(1, 8)), dpi=200, window_pages=8, memory_mb=memory_mb
+    )
+    assert windows == [(1, 3, 200), (4, 6, 200), (7, 7, 200)]
+
+
+def test_windows_break_at_gaps_between_pages():
+    windows = _plan_raster_windows(
+        letter_pages(1, 2, 3, 7, 8, 12), dpi=200, window_pages=8, memory_mb=1024
+    )
+    assert windows == [(1, 3, 200), (7, 8, 200), (12, 12, 200)]
+
+
+def test_page_too_large_for_memory_is_rendered_at_a_lower_dpi():
+    poster = (LETTER[0] * 4, LETTER[1] * 4)
+    windows = _plan_raster_windows(
+        [(1, LETTER), (2, poster), (3, LETTER)],
+        dpi=200,
+        window_pages=8,
+        memory_mb=64,
+    )
+
+    assert [(first, last) for first, last, _ in windows] == [(1, 1), (2, 2), (3, 3)]
+    poster_dpi = windows[1][2]
+    assert poster_dpi < 200
+    assert ocr_service._raster_bytes(poster, poster_dpi, True) <= 64 * 1024 * 1024
+
+
+class FakeImage:
+    def __init__(self, tracker):
+        self.tracker = tracker
+        tracker.change("images", 1)
+
+    def close(self):
+        self.tracker.change("images", -1)
+
+
+class Tracker:
+    """Counts what is alive at once and the most there ever were"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = {"images": 0, "pages": 0}
+        self.peak = {"images": 0, "pages": 0}
+
+    def change(self, name, delta):
+        with self.lock:
+            self.current[name] += delta
+            self.peak[name] = max(self.peak[name], self.current[name])
+
+
+@pytest.fixture
+def rasterizer(monkeypatch):
+    tracker = Tracker()
+    windows = []
+
+    def convert_from_path(file_path, dpi, grayscale, first_page, last_page):
+        windows.append((first_page, last_page))
+        return [FakeImage(tracker) for _ in range(first_page, last_page + 1)]
+
+    def ocr_page(page_num, image, dpi, engine, cancel_key):
+        tracker.change("pages", 1)
+        time.sleep(0.01)
+        tracker.change("pages", -1)
+        return {"page": page_num + 1, "text": "", "error": None, "seconds": 0.01}
+
+    monkeypatch.setattr(
+        ocr_service, "convert_from_path", convert_from_path, raising=False
+    )
+    monkeypatch.setattr(ocr_service, "_ocr_page", ocr_page)
+    monkeypatch.setattr(ocr_service, "_get_page_sizes", lambda path: [LETTER] * 30)
+    monkeypatch.setattr(ocr_service, "OCR_RASTER_WINDOW_PAGES", 4)
+    monkeypatch.setattr(ocr_service, "OCR_PAGE_WORKERS", 16)
+    return tracker, windows
+
+
+@pytest.mark.parametrize("core_share", [1, 2, 16])
+def test_ocr_concurrency_is_bounded(rasterizer, monkeypatch, core_share):
+    tracker, windows = rasterizer
+    monkeypatch.setattr(ocr_service, "get_core_share", lambda: core_share)
+    monkeypatch.setattr(
+        ocr_service,
+        "_plan_raster_windows",
+        lambda pages: _plan_raster_windows(pages, window_pages=4, memory_mb=1024),
+    )
+
+    results = ocr_service._ocr_pdf_pages("lease.pdf", list(range(1, 11)), "tesseract")
+
+    assert [result["page"] for result in results] == list(range(1, 11))
+    assert windows == [(1, 4), (5, 8), (9, 10)]
+    # Threads are capped by the window and the process's share of the cores,
+    # and only one window of images is held at a time
+    assert tracker.peak["pages"] <= min(4, core_share)
+    assert tracker.peak["images"] <= 4
+    assert tracker.current["images"] == 0
+
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+TEXT_LAYER_PDF = SAMPLES_PATH / "Netherland+Suite+B+Blanc+Executed+Lease.pdf"
+SCANNED_PDF = SAMPLES_PATH / "1730+J+St+Ste+A+-+Abby+Karavani.pdf"
+
+
+@pytest.mark.parametrize(
+    "text, usable",
+    [
+        (None, False),
+        ("", False),
+        ("Page 3", False),
+        ("(cid:12)(cid:34)(cid:56)(cid:78)(cid:90)(cid:11)(cid:22)", False),
+        ("~~~ |||| ---- ____ //// .... ,,,, ;;;;", False),
+        ("Tenant shall pay rent monthly in advance.", True),
+    ],
+)
+def test_usable_text_layer(text, usable):
+    assert ocr_service._has_usable_text(text) is usable
+
+
+def test_ocr_replaces_the_text_layer_unless_it_found_nothing():
+    text_layer = {"page": 2, "text": "faint", "error": None, "method": "text_layer"}
+    ocr = {"page": 2, "text": "Rent is due", "error": None, "method": "tesseract"}
+    empty = {**ocr, "text": "  "}
+    failed = {**ocr, "text": "", "error": "tesseract crashed"}
+
+    assert ocr_service._better_page_result(text_layer, ocr) is ocr
+    assert ocr_service._better_page_result(text_layer, empty) is text_layer
+    assert ocr_service._better_page_result(text_layer, failed) is text_layer
+    assert ocr_service._better_page_result(text_layer, None) is text_layer
+    assert ocr_service._better_page_result({**text_layer, "text": ""}, empty) is empty
+
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    """Text-layer pages 1, 3 and 5 with scanned pages 2 and 4 between them"""
+    text_pages = PyPDF2.PdfReader(str(TEXT_LAYER_PDF)).pages
+    scanned_pages = PyPDF2.PdfReader(str(SCANNED_PDF)).pages
+    writer = PyPDF2.PdfWriter()
+    for page in (
+        text_pages[0],
+        scanned_pages[0],
+        text_pages[1],
+        scanned_pages[1],
+        text_pages[2],
+    ):
+        writer.add_page(page)
+
+    path = tmp_path / "mixed.pdf"
+    with open(path, "wb") as file:
+        writer.write(file)
+    return str(path)
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Replace the OCR engines with one that records the pages it is given"""
+    requested = []
+
+    def extract(file_path, page_numbers):
+        requested.extend(page_numbers)
+        return [
+            {
+                "page": page_num,
+                "text": f"Scanned page {page_num}: the tenant shall pay rent.",
+                "lines": [],
+                "error": None,
+                "method": "fake_ocr",
+                "seconds": 0.01,
+            }
+            for page_num in page_numbers
+        ]
+
+    engines = {
+        name: engine
+        for name, engine in extraction_engines._engines.items()
+        if engine.kind != "ocr"
+    }
+    monkeypatch.setattr(extraction_engines, "_engines", engines)
+    register_engine(
+        ExtractionEngine(
+            "fake_ocr",
+            "ocr",
+            [ocr_service.PDF_MIME_TYPE],
+            extract,
+            lambda: True,
+            page_seconds=1.0,
+        )
+    )
+    return requested
+
+
+def test_only_pages_without_a_text_layer_are_ocrd(mixed_pdf, fake_ocr):
+    result = ocr_service.extract_text_from_document(mixed_pdf, "application/pdf")
+
+    assert result["error"] is None
+    assert fake_ocr == [2, 4]
+    assert result["ocr_pages"] == [2, 4]
+    assert result["engine"] == "fake_ocr+text_layer"
+
+    # Each page's text starts at its offset in the joined text
+    assert [page for page, _ in result["page_offsets"]] == [1, 2, 3, 4, 5]
+    for (page_num, offset), page_text in zip(result["page_offsets"], result["pages"]):
+        assert result["text"][offset : offset + len(page_text)] == page_text
+    assert result["pages"][1] == "Scanned page 2: the tenant shall pay rent."
+    assert "Scanned page" not in result["pages"][0] + result["pages"][2]
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+import processing_queue
+from job_queue import claim_next_job, job_to_dict
+from models import Document, DocumentStatus, JobStatus, ProcessingJob
+from pipeline import get_checkpoint_before, get_remaining_stages
+from processing_errors import TransientProcessingError
+from processing_queue import ProcessingQueue
+from test_job_queue import add_document, add_job
+
+
+def test_remaining_stages_follow_the_checkpoint():
+    assert get_remaining_stages(None) == [
+        "fetch",
+        "extract_text",
+        "extract_terms",
+        "summarize",
+        "finalize",
+    ]
+    assert get_remaining_stages("extract_text") == [
+        "extract_terms",
+        "summarize",
+        "finalize",
+    ]
+    assert get_remaining_stages("finalize") == []
+    assert get_checkpoint_before("extract_terms") == "extract_text"
+    assert get_checkpoint_before("fetch") is None
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Stand-in stages that record their calls; set `fail` to make one raise"""
+    calls = []
+    fail = set()
+
+    def stage(name, updates):
+        def run(*args):
+            calls.append(name)
+            if name in fail:
+                fail.discard(name)
+                raise TransientProcessingError(f"{name} failed")
+            return updates
+
+        return run
+
+    monkeypatch.setattr(
+        processing_queue, "fetch_document", stage("fetch", "/tmp/lease.pdf")
+    )
+    monkeypatch.setattr(
+        processing_queue,
+        "extract_text_stage",
+        stage("extract_text", {"extracted_text": "Lease text"}),
+    )
+    monkeypatch.setattr(
+        processing_queue,
+        "extract_terms_stage",
+        stage("extract_terms", {"extracted_lease_data": {"parties": None}}),
+    )
+    monkeypatch.setattr(
+        processing_queue,
+        "summarize_stage",
+        stage("summarize", {"ai_summary": "Summary"}),
+    )
+    return calls, fail
+
+
+def run_job(db) -> None:
+    job = job_to_dict(claim_next_job(db, "worker-a"))
+    asyncio.run(ProcessingQueue(executor_mode="inline").process_job(job))
+    db.expire_all()
+
+
+def test_retry_resumes_after_the_last_completed_stage(db, stages):
+    calls, fail = stages
+    document = add_document(db)
+    job_id = add_job(db, document).id
+
+    fail.add("extract_terms")
+    run_job(db)
+    assert calls == ["fetch", "extract_text", "extract_terms"]
+    document = db.get(Document, document.id)
+    assert document.pipeline_stage == "extract_text"
+    assert document.extracted_text == "Lease text"
+    assert db.get(ProcessingJob, job_id).status == JobStatus.QUEUED
+
+    calls.clear()
+    db.get(ProcessingJob, job_id).available_at = document.created_at
+    db.commit()
+    run_job(db)
+    assert calls == ["extract_terms", "summarize"]
+    document = db.get(Document, document.id)
+    assert document.pipeline_stage == "finalize"
+    assert document.status == DocumentStatus.COMPLETED
+    assert document.ai_summary == "Summary"
+    assert db.get(ProcessingJob, job_id).status == JobStatus.COMPLETED
+
+
+def test_reprocessing_clears_the_previous_failure(db):
+    from fastapi.testclient import TestClient
+
+    from auth import create_access_token
+    from main import app
+    from models import User
+
+    db.add(
+        User(
+            id="user-1",
+            email="reprocess@example.com",
+            first_name="Re",
+            last_name="Process",
+            hashed_password="-",
+        )
+    )
+    document = add_document(db, "user-1", DocumentStatus.FAILED)
+    document.pipeline_stage = "extract_text"
+    document.extraction_error = "Textract throttled"
+    document.nlp_extraction_error = "No parties found"
+    db.commit()
+
+    token = create_access_token({"sub": "reprocess@example.com"})
+    response = TestClient(app).post(
+        f"/documents/{document.id}/reprocess",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["fromStage"] == "extract_terms"
+    db.expire_all()
+    document = db.get(Document, document.id)
+    assert document.status == DocumentStatus.PROCESSING
+    assert document.extraction_error is None
+    assert document.nlp_extraction_error is None
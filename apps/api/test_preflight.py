@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import PyPDF2
+import pytest
+
+from ocr_service import _extract_page_range_pypdf2, probe_document
+from preflight import PDF_MIME_TYPE, PreflightError, preflight_document
+
+SAMPLE_PDF = (
+    Path(__file__).resolve().parents[2]
+    / "samples"
+    / "lease-documents"
+    / "1722+J+St+Ste+220+Black+Lily+Naturals+-+tenant+signed.pdf"
+)
+
+
+def write_pdf(path: Path, user_password=None, pages=2) -> str:
+    writer = PyPDF2.PdfWriter()
+    for page in PyPDF2.PdfReader(str(SAMPLE_PDF)).pages[:pages]:
+        writer.add_page(page)
+    if user_password is not None:
+        writer.encrypt(user_password=user_password, owner_password="owner")
+    writer.write(str(path))
+    return str(path)
+
+
+def test_pdf_is_described(tmp_path):
+    result = preflight_document(write_pdf(tmp_path / "lease.pdf"), PDF_MIME_TYPE)
+    assert result["file_type"] == "pdf"
+    assert result["page_count"] == 2
+    assert result["is_encrypted"] is False
+    assert result["has_text_layer"] is True
+
+
+def test_owner_password_pdf_is_accepted_and_extracted(tmp_path):
+    file_path = write_pdf(tmp_path / "lease.pdf", user_password="")
+
+    result = preflight_document(file_path, PDF_MIME_TYPE)
+    assert result["is_encrypted"] is True
+    assert result["page_count"] == 2
+
+    assert probe_document(file_path, PDF_MIME_TYPE)["page_count"] == 2
+    pages = _extract_page_range_pypdf2(file_path, 0, 2, None)
+    assert "LEASE" in pages[0]["text"]
+
+
+def test_user_password_pdf_is_rejected(tmp_path):
+    file_path = write_pdf(tmp_path / "lease.pdf", user_password="secret")
+    with pytest.raises(PreflightError, match="password"):
+        preflight_document(file_path, PDF_MIME_TYPE)
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        (b"", "empty"),
+        (b"%PDF-1.4\ngarbage", "corrupt"),
+        (b"plain text", "not a PDF or DOCX"),
+    ],
+)
+def test_unprocessable_files_are_rejected(tmp_path, content, message):
+    file_path = tmp_path / "upload"
+    file_path.write_bytes(content)
+    with pytest.raises(PreflightError, match=message):
+        preflight_document(str(file_path))
@@ -0,0 +1,159 @@
+import asyncio
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from processing_queue import ProcessingQueue
+from worker_processes import get_core_share, in_pipeline_process
+
+
+def _exit_worker():
+    os._exit(1)
+
+
+def _pid():
+    return os.getpid()
+
+
+def _core_share():
+    return in_pipeline_process(), get_core_share()
+
+
+def test_pipeline_processes_share_the_cores():
+    queue = ProcessingQueue(executor_mode="process", max_workers=2)
+    try:
+        in_worker, share = asyncio.run(queue.run_blocking(_core_share))
+    finally:
+        queue._executor.shutdown()
+
+    assert in_worker
+    assert share == max(1, (os.cpu_count() or 1) // 2)
+    assert not in_pipeline_process()
+
+
+def test_broken_process_pool_is_replaced():
+    queue = ProcessingQueue(executor_mode="process", max_workers=1)
+
+    async def run():
+        with pytest.raises(BrokenProcessPool):
+            await queue.run_blocking(_exit_worker)
+        assert queue._executor is None
+        return await queue.run_blocking(_pid)
+
+    try:
+        assert asyncio.run(run()) != os.getpid()
+    finally:
+        if queue._executor is not None:
+            queue._executor.shutdown()
+
+
+def test_health_leaves_queue_stats_to_their_endpoint(db):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    response = TestClient(app).get("/health")
+    assert response.status_code == 200
+    assert response.json()["queue_size"] == 0
+    assert "saturation" not in response.json()
+
+
+async def _wait_until(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_full_queue_rejects_uploads_until_jobs_finish(db, monkeypatch):
+    import httpx
+
+    import main
+    from auth import create_access_token
+    from job_queue import complete_job, count_queued_jobs
+    from models import SessionLocal, User
+
+    db.add(
+        User(
+            id="intake-user",
+            email="intake@example.com",
+            first_name="Back",
+            last_name="Pressure",
+            hashed_password="-",
+        )
+    )
+    db.commit()
+    headers = {
+        "Authorization": f"Bearer {create_access_token({'sub': 'intake@example.com'})}"
+    }
+
+    def queue_size():
+        session = SessionLocal()
+        try:
+            return count_queued_jobs(session)
+        finally:
+            session.close()
+
+    async def run():
+        # One pipeline slot and room for one job waiting behind it
+        queue = ProcessingQueue(
+            executor_mode="inline", max_in_flight=1, max_queue_size=1
+        )
+        monkeypatch.setattr(main, "processing_queue", queue)
+        release = asyncio.Event()
+        started = []
+
+        async def process_job(job):
+            started.append(job["document_id"])
+            await release.wait()
+            session = SessionLocal()
+            try:
+                complete_job(session, job["id"])
+                session.commit()
+            finally:
+                session.close()
+
+        queue.process_job = process_job
+        worker = asyncio.create_task(queue.start_worker())
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test", headers=headers
+        ) as client:
+
+            async def upload(name):
+                return await client.post(
+                    "/documents",
+                    data={
+                        "filename": name,
+                        "original_filename": name,
+                        "mime_type": "application/pdf",
+                        "s3_key": f"uploads/{name}",
+                        "s3_bucket": "bucket",
+                    },
+                )
+
+            # The first upload takes the only slot, the second waits for it
+            assert (await upload("first.pdf")).status_code == 200
+            await _wait_until(lambda: len(started) == 1)
+            assert (await upload("second.pdf")).status_code == 200
+
+            response = await upload("third.pdf")
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == str(
+                main.PROCESSING_RETRY_AFTER_SECONDS
+            )
+
+            release.set()
+            await _wait_until(
+                lambda: len(started) == 2
+                and not queue.processing_tasks
+                and queue_size() == 0
+            )
+            assert (await upload("fourth.pdf")).status_code == 200
+
+        await queue.stop_worker()
+        await asyncio.wait_for(worker, timeout=5)
+
+    asyncio.run(run())
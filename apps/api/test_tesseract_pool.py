@@ -0,0 +1,54 @@
+import logging
+import os
+
+import pytest
+
+import tesseract_pool
+import worker_processes
+from tesseract_pool import TesseractPool, log_ocr_backend
+
+
+def test_pool_defaults_to_the_process_share_of_cores(monkeypatch):
+    monkeypatch.delenv("OCR_PAGE_WORKERS", raising=False)
+    cores = os.cpu_count() or 1
+    assert TesseractPool(size=0).size == cores
+
+    monkeypatch.setattr(worker_processes, "_pipeline_processes", cores)
+    assert TesseractPool(size=0).size == 1
+
+
+def test_pool_size_is_capped_by_page_workers(monkeypatch):
+    monkeypatch.setenv("OCR_PAGE_WORKERS", "1")
+    assert TesseractPool(size=0).size == 1
+    assert TesseractPool(size=3).size == 3
+
+
+@pytest.mark.parametrize(
+    "use_pool, pool_enabled, pytesseract, backend",
+    [
+        (True, True, None, "tesserocr"),
+        (
+            False,
+            True,
+            object(),
+            "pytesseract, one tesseract process per page (tesserocr not found)",
+        ),
+        (
+            False,
+            False,
+            object(),
+            "pytesseract, one tesseract process per page (TESSERACT_POOL is off)",
+        ),
+        (False, True, None, "none"),
+    ],
+)
+def test_startup_logs_the_ocr_backend(
+    monkeypatch, caplog, use_pool, pool_enabled, pytesseract, backend
+):
+    monkeypatch.setattr(tesseract_pool, "USE_TESSERACT_POOL", use_pool)
+    monkeypatch.setattr(tesseract_pool, "TESSERACT_POOL", pool_enabled)
+    monkeypatch.setattr(tesseract_pool, "pytesseract", pytesseract)
+
+    with caplog.at_level(logging.INFO, logger="tesseract_pool"):
+        log_ocr_backend()
+    assert caplog.messages[-1].startswith(f"OCR backend: {backend}")
@@ -0,0 +1,52 @@
+import zlib
+
+import pytest
+
+from text_layout import LAYOUT_HEADER, TextLayout, build_layout, text_lines
+
+
+def test_round_trip_keeps_lines_boxes_and_confidence():
+    layout = build_layout(
+        [
+            (1, [("LEASE  AGREEMENT", (0.1, 0.05, 0.8, 0.04), 96.4)]),
+            (2, [("Rent: $1,500 per month", (0.0, 0.5, 1.0, 0.02), None)]),
+            (3, text_lines("Signed by the tenant\n\n  \nDated ünd signed")),
+        ]
+    )
+
+    decoded = TextLayout.decode(layout.encode())
+
+    assert list(decoded.lines()) == list(layout.lines())
+    title = next(decoded.lines(page=1))
+    assert title["text"] == "LEASE AGREEMENT"
+    # Boxes are stored as 16-bit fractions of the page
+    assert title["box"] == pytest.approx([0.1, 0.05, 0.8, 0.04], abs=1e-4)
+    assert title["confidence"] == 96
+    assert [line["box"] for line in decoded.lines(page=3)] == [None, None]
+    assert [line["text"] for line in decoded.lines(page=3)] == [
+        "Signed by the tenant",
+        "Dated ünd signed",
+    ]
+    assert next(decoded.lines(page=2))["confidence"] is None
+
+
+def test_boxes_and_confidence_are_clamped():
+    layout = TextLayout()
+    layout.add_line(1, "Margin note", (-0.5, 0.2, 1.5, 0.1), 140)
+
+    line = next(TextLayout.decode(layout.encode()).lines())
+    assert line["box"] == pytest.approx([0.0, 0.2, 1.0, 0.1], abs=1e-4)
+    assert line["confidence"] == 100
+
+
+def test_empty_layout_round_trips():
+    decoded = TextLayout.decode(TextLayout().encode())
+    assert len(decoded) == 0
+    assert list(decoded.lines()) == []
+
+
+def test_decode_rejects_other_formats():
+    with pytest.raises(ValueError):
+        TextLayout.decode(zlib.compress(LAYOUT_HEADER.pack(b"CLIX", 1, 0)))
+    with pytest.raises(ValueError):
+        TextLayout.decode(zlib.compress(LAYOUT_HEADER.pack(b"LAYT", 9, 0)))
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import PyPDF2
+import pytest
+
+import textract_async
+from processing_errors import PermanentProcessingError, TransientProcessingError
+from textract_async import LocalObjectStore, LocalTextractStub, detect_document_text
+
+SAMPLES_PATH = Path(__file__).resolve().parents[2] / "samples" / "lease-documents"
+TEXT_LAYER_PDF = SAMPLES_PATH / "Netherland+Suite+B+Blanc+Executed+Lease.pdf"
+SCANNED_PDF = SAMPLES_PATH / "1730+J+St+Ste+A+-+Abby+Karavani.pdf"
+
+
+class CountingStub(LocalTextractStub):
+    """Records the NextToken of every result request"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tokens = []
+
+    def get_document_text_detection(self, JobId, MaxResults=1000, NextToken=None):
+        response = super().get_document_text_detection(JobId, MaxResults, NextToken)
+        if response["JobStatus"] == "SUCCEEDED" and MaxResults > 1:
+            self.tokens.append(NextToken)
+        return response
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(textract_async, "TEXTRACT_POLL_INTERVAL", 0)
+    monkeypatch.setattr(textract_async, "TEXTRACT_SQS_QUEUE_URL", None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalObjectStore(str(tmp_path / "staged"))
+
+
+def staged_files(store):
+    """Files left in the object store; staged input should always be deleted"""
+    return [path for path in store.root.rglob("*") if path.is_file()]
+
+
+def test_job_is_polled_and_paged_through(store):
+    textract = CountingStub(store, polls_until_done=3, page_size=200)
+
+    pages = detect_document_text(str(TEXT_LAYER_PDF), textract, store)
+
+    expected = [
+        [line for line in (page.extract_text() or "").splitlines() if line.strip()]
+        for page in PyPDF2.PdfReader(str(TEXT_LAYER_PDF)).pages
+    ]
+    assert list(pages) == list(range(1, len(expected) + 1))
+    assert [[text for text, _, _ in lines] for lines in pages.values()] == expected
+
+    # Every page of results after the first was asked for by its NextToken
+    assert len(textract.tokens) > 3
+    assert textract.tokens[0] is None
+    assert all(token is not None for token in textract.tokens[1:])
+    assert staged_files(store) == []
+
+
+def test_pages_without_lines_are_returned_empty(store):
+    pages = detect_document_text(str(SCANNED_PDF), LocalTextractStub(store), store)
+
+    assert len(pages) == len(PyPDF2.PdfReader(str(SCANNED_PDF)).pages)
+    assert all(lines == [] for lines in pages.values())
+
+
+def test_failed_job_is_permanent(store, tmp_path):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    with pytest.raises(PermanentProcessingError, match="failed"):
+        detect_document_text(str(broken), LocalTextractStub(store), store)
+    assert staged_files(store) == []
+
+
+def test_job_that_never_finishes_times_out(store, monkeypatch):
+    monkeypatch.setattr(textract_async, "TEXTRACT_MAX_WAIT_SECONDS", 0)
+    textract = LocalTextractStub(store, polls_until_done=100)
+
+    with pytest.raises(TransientProcessingError, match="did not finish"):
+        detect_document_text(str(TEXT_LAYER_PDF), textract, store)
+    assert staged_files(store) == []
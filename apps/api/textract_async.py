@@ -0,0 +1,311 @@
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cancellation import raise_if_cancelled
+from processing_errors import PermanentProcessingError, TransientProcessingError
+from text_layout import Line
+
+logger = logging.getLogger(__name__)
+
+# "sync" sends each rendered page to DetectDocumentText; "async" stages the
+# whole file in S3 and runs one StartDocumentTextDetection job for it, which
+# also works for multi-page PDFs without rendering them first; "auto" leaves
+# the choice to the extraction engine selector, by page count
+TEXTRACT_MODE = os.getenv("TEXTRACT_MODE", "sync")
+
+# Files are staged under this bucket and prefix for the job and then deleted
+TEXTRACT_S3_BUCKET = os.getenv(
+    "TEXTRACT_S3_BUCKET", os.getenv("S3_BUCKET_NAME", "legal-ease-ai-documents")
+)
+TEXTRACT_S3_PREFIX = os.getenv("TEXTRACT_S3_PREFIX", "textract-input/")
+
+# Without a notification channel the job is polled, starting at the poll
+# interval and backing off to the maximum
+TEXTRACT_POLL_INTERVAL = float(os.getenv("TEXTRACT_POLL_INTERVAL", "2"))
+TEXTRACT_MAX_POLL_INTERVAL = float(os.getenv("TEXTRACT_MAX_POLL_INTERVAL", "15"))
+TEXTRACT_MAX_WAIT_SECONDS = float(os.getenv("TEXTRACT_MAX_WAIT_SECONDS", "900"))
+
+# With an SNS topic and a role Textract may publish to it with, completion is
+# announced there; if an SQS queue subscribed to the topic is also given, the
+# worker waits on that queue instead of polling
+TEXTRACT_SNS_TOPIC_ARN = os.getenv("TEXTRACT_SNS_TOPIC_ARN")
+TEXTRACT_ROLE_ARN = os.getenv("TEXTRACT_ROLE_ARN")
+TEXTRACT_SQS_QUEUE_URL = os.getenv("TEXTRACT_SQS_QUEUE_URL")
+
+# GetDocumentTextDetection returns at most 1000 blocks per call
+TEXTRACT_MAX_RESULTS = 1000
+
+# Run against LocalTextractStub instead of AWS, for development and testing
+TEXTRACT_STUB = os.getenv("TEXTRACT_STUB", "false").lower() in ("1", "true", "yes")
+TEXTRACT_STUB_STORAGE_PATH = os.getenv(
+    "TEXTRACT_STUB_STORAGE_PATH", "/tmp/legal-ease-ai-textract-stub"
+)
+
+
+def detect_document_text(
+    file_path: str, textract_client: Any, s3_client: Any, sqs_client: Any = None
+) -> Dict[int, List[Line]]:
+    """
+    Run an asynchronous Textract text detection job over a whole document
+
+    Returns the lines of every page, keyed by 1-based page number. Raises
+    PermanentProcessingError when Textract fails the job and
+    TransientProcessingError when it doesn't finish in time.
+    """
+    key = f"{TEXTRACT_S3_PREFIX}{uuid.uuid4()}{Path(file_path).suffix}"
+    s3_client.upload_file(file_path, TEXTRACT_S3_BUCKET, key)
+    try:
+        job_id = _start_job(textract_client, key)
+        logger.info(f"Started Textract job {job_id} for {file_path}")
+
+        started = time.monotonic()
+        if TEXTRACT_SQS_QUEUE_URL and sqs_client is not None:
+            _wait_for_notification(sqs_client, textract_client, job_id)
+        else:
+            _poll_job(textract_client, job_id)
+
+        pages = get_page_lines(textract_client, job_id)
+        logger.info(
+            f"Textract job {job_id} returned {len(pages)} pages in "
+            f"{time.monotonic() - started:.1f}s"
+        )
+        return pages
+    finally:
+        try:
+            s3_client.delete_object(Bucket=TEXTRACT_S3_BUCKET, Key=key)
+        except Exception as e:
+            logger.warning(f"Failed to delete staged Textract input {key}: {e}")
+
+
+def _start_job(textract_client: Any, key: str) -> str:
+    request = {
+        "DocumentLocation": {"S3Object": {"Bucket": TEXTRACT_S3_BUCKET, "Name": key}}
+    }
+    if TEXTRACT_SNS_TOPIC_ARN and TEXTRACT_ROLE_ARN:
+        request["NotificationChannel"] = {
+            "SNSTopicArn": TEXTRACT_SNS_TOPIC_ARN,
+            "RoleArn": TEXTRACT_ROLE_ARN,
+        }
+
+    return textract_client.start_document_text_detection(**request)["JobId"]
+
+
+def _check_job_status(response: Dict[str, Any], job_id: str) -> bool:
+    """Check whether a job has finished, raising if it failed"""
+    status = response["JobStatus"]
+    if status == "IN_PROGRESS":
+        return False
+    if status == "FAILED":
+        raise PermanentProcessingError(
+            f"Textract job {job_id} failed: {response.get('StatusMessage')}"
+        )
+    if status == "PARTIAL_SUCCESS":
+        logger.warning(
+            f"Textract job {job_id} partially succeeded: {response.get('Warnings')}"
+        )
+    return True
+
+
+def _poll_job(textract_client: Any, job_id: str):
+    deadline = time.monotonic() + TEXTRACT_MAX_WAIT_SECONDS
+    interval = TEXTRACT_POLL_INTERVAL
+
+    while True:
+        raise_if_cancelled()
+        response = textract_client.get_document_text_detection(
+            JobId=job_id, MaxResults=1
+        )
+        if _check_job_status(response, job_id):
+            return
+
+        if time.monotonic() + interval > deadline:
+            raise TransientProcessingError(
+                f"Textract job {job_id} did not finish within "
+                f"{TEXTRACT_MAX_WAIT_SECONDS:.0f}s"
+            )
+        time.sleep(interval)
+        interval = min(interval * 2, TEXTRACT_MAX_POLL_INTERVAL)
+
+
+def _wait_for_notification(sqs_client: Any, textract_client: Any, job_id: str):
+    """Wait for the job's completion message on the SQS queue"""
+    deadline = time.monotonic() + TEXTRACT_MAX_WAIT_SECONDS
+
+    while time.monotonic() < deadline:
+        raise_if_cancelled()
+        response = sqs_client.receive_message(
+            QueueUrl=TEXTRACT_SQS_QUEUE_URL,
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=20,
+        )
+        for message in response.get("Messages", []):
+            if _notification_job_id(message) != job_id:
+                # Another worker's job, so make it visible to them again
+                sqs_client.change_message_visibility(
+                    QueueUrl=TEXTRACT_SQS_QUEUE_URL,
+                    ReceiptHandle=message["ReceiptHandle"],
+                    VisibilityTimeout=0,
+                )
+                continue
+
+            sqs_client.delete_message(
+                QueueUrl=TEXTRACT_SQS_QUEUE_URL,
+                ReceiptHandle=message["ReceiptHandle"],
+            )
+            # The notification only carries the status, so read the job to
+            # get the failure message if there is one
+            _check_job_status(
+                textract_client.get_document_text_detection(JobId=job_id, MaxResults=1),
+                job_id,
+            )
+            return
+
+    raise TransientProcessingError(
+        f"No completion notification for Textract job {job_id} within "
+        f"{TEXTRACT_MAX_WAIT_SECONDS:.0f}s"
+    )
+
+
+def _notification_job_id(message: Dict[str, Any]) -> Optional[str]:
+    """Get the JobId from an SQS message carrying an SNS notification"""
+    try:
+        body = json.loads(message["Body"])
+        return json.loads(body.get("Message", "{}")).get("JobId")
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def get_page_lines(textract_client: Any, job_id: str) -> Dict[int, List[Line]]:
+    """Page through a finished job's results and group the lines by page"""
+    lines: Dict[int, List[Line]] = defaultdict(list)
+    page_count = 0
+    next_token = None
+
+    while True:
+        raise_if_cancelled()
+        request = {"JobId": job_id, "MaxResults": TEXTRACT_MAX_RESULTS}
+        if next_token:
+            request["NextToken"] = next_token
+        response = textract_client.get_document_text_detection(**request)
+
+        page_count = max(
+            page_count, response.get("DocumentMetadata", {}).get("Pages", 0)
+        )
+        for block in response.get("Blocks", []):
+            if block["BlockType"] == "LINE":
+                lines[block.get("Page", 1)].append(textract_line(block))
+
+        next_token = response.get("NextToken")
+        if not next_token:
+            break
+
+    page_count = max([page_count, *lines.keys()])
+    return {page_num: lines.get(page_num, []) for page_num in range(1, page_count + 1)}
+
+
+def textract_line(block: Dict[str, Any]) -> Line:
+    """Get the text, bounding box and confidence of a Textract LINE block"""
+    box = block.get("Geometry", {}).get("BoundingBox")
+    return (
+        block["Text"],
+        (box["Left"], box["Top"], box["Width"], box["Height"]) if box else None,
+        block.get("Confidence"),
+    )
+
+
+class LocalObjectStore:
+    """Stand-in for the S3 client calls used to stage Textract input"""
+
+    def __init__(self, root: str = TEXTRACT_STUB_STORAGE_PATH):
+        self.root = Path(root)
+
+    def path(self, bucket: str, key: str) -> Path:
+        return self.root / bucket / key
+
+    def upload_file(self, file_path: str, bucket: str, key: str):
+        path = self.path(bucket, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(file_path, path)
+
+    def delete_object(self, Bucket: str, Key: str):
+        self.path(Bucket, Key).unlink(missing_ok=True)
+
+
+class LocalTextractStub:
+    """
+    Offline stand-in for the asynchronous Textract text detection API
+
+    Jobs read the staged PDF's text layer with PyPDF2, one LINE block per
+    line, report IN_PROGRESS for the first `polls_until_done` status checks
+    and return results `page_size` blocks at a time with NextToken, so the
+    polling and pagination code runs as it would against AWS.
+    """
+
+    def __init__(
+        self,
+        object_store: Optional[LocalObjectStore] = None,
+        polls_until_done: int = 1,
+        page_size: Optional[int] = None,
+    ):
+        self.object_store = object_store or LocalObjectStore()
+        self.polls_until_done = polls_until_done
+        self.page_size = page_size
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+
+    def start_document_text_detection(self, DocumentLocation, **kwargs):
+        s3_object = DocumentLocation["S3Object"]
+        path = self.object_store.path(s3_object["Bucket"], s3_object["Name"])
+        job_id = uuid.uuid4().hex
+
+        try:
+            blocks, page_count = self._detect(path)
+            job = {"status": "SUCCEEDED", "blocks": blocks, "pages": page_count}
+        except Exception as e:
+            job = {"status": "FAILED", "message": str(e), "blocks": [], "pages": 0}
+
+        job["polls"] = 0
+        self.jobs[job_id] = job
+        return {"JobId": job_id}
+
+    def get_document_text_detection(self, JobId, MaxResults=1000, NextToken=None):
+        job = self.jobs[JobId]
+        job["polls"] += 1
+        if job["polls"] <= self.polls_until_done:
+            return {"JobStatus": "IN_PROGRESS"}
+        if job["status"] == "FAILED":
+            return {"JobStatus": "FAILED", "StatusMessage": job["message"]}
+
+        limit = min(MaxResults, self.page_size or MaxResults)
+        start = int(NextToken or 0)
+        end = start + limit
+        response = {
+            "JobStatus": "SUCCEEDED",
+            "DocumentMetadata": {"Pages": job["pages"]},
+            "Blocks": job["blocks"][start:end],
+        }
+        if end < len(job["blocks"]):
+            response["NextToken"] = str(end)
+        return response
+
+    @staticmethod
+    def _detect(path: Path):
+        import PyPDF2
+
+        blocks = []
+        with open(path, "rb") as file:
+            pages = PyPDF2.PdfReader(file).pages
+            for page_num, page in enumerate(pages, start=1):
+                blocks.append({"BlockType": "PAGE", "Page": page_num})
+                for line in (page.extract_text() or "").splitlines():
+                    if line.strip():
+                        blocks.append(
+                            {"BlockType": "LINE", "Page": page_num, "Text": line}
+                        )
+            return blocks, len(pages)
@@ -12,15 +12,20 @@ def update_database():
     create_tables()
 
     with engine.connect() as conn:
-        result = conn.execute(
-            text(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='document_feedback';"
+        for table_name, model_name in [
+            ("document_feedback", "DocumentFeedback"),
+            ("processing_jobs", "ProcessingJob"),
+        ]:
+            result = conn.execute(
+                text(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name=:name;"
+                ),
+                {"name": table_name},
             )
-        )
-        if result.fetchone():
-            print("✓ DocumentFeedback table exists")
-        else:
-            print("✗ DocumentFeedback table not found")
+            if result.fetchone():
+                print(f"✓ {model_name} table exists")
+            else:
+                print(f"✗ {model_name} table not found")
 
     print("Database update complete!")
 
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+import signal
+
+from aws_clients import probe_capabilities_in_background
+from models import create_tables
+from processing_queue import processing_queue
+from tesseract_pool import log_ocr_backend
+
+logger = logging.getLogger(__name__)
+
+
+async def run_worker():
+    """
+    Consume processing jobs from the shared database queue until stopped
+
+    Run any number of these alongside an API started with
+    PROCESSING_PIPELINE_ENABLED=false to scale OCR capacity independently of
+    API capacity.
+    """
+    create_tables()
+    probe_capabilities_in_background()
+    log_ocr_backend()
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_requested.set)
+
+    worker_task = asyncio.create_task(processing_queue.start_worker())
+    logger.info(
+        f"Pipeline worker {processing_queue.worker_id} started "
+        f"({processing_queue.executor_mode} executor, "
+        f"{processing_queue.max_in_flight} jobs in flight)"
+    )
+
+    stop_task = asyncio.create_task(stop_requested.wait())
+    await asyncio.wait({worker_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+
+    logger.info("Stopping pipeline worker, waiting for in-flight jobs")
+    await processing_queue.stop_worker()
+    await worker_task
+    stop_task.cancel()
+
+
+def main():
+    logging.basicConfig(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
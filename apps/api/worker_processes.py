@@ -0,0 +1,26 @@
+import os
+
+# In the processes of the pipeline's process pool, how many such processes
+# share the machine; 0 in any other process
+_pipeline_processes = 0
+
+
+def init_pipeline_process(process_count: int):
+    """Initializer for the pipeline's worker processes"""
+    global _pipeline_processes
+    _pipeline_processes = max(1, process_count)
+
+
+def in_pipeline_process() -> bool:
+    """Check whether this is one of the pipeline's worker processes"""
+    return _pipeline_processes > 0
+
+
+def get_core_share() -> int:
+    """
+    Get how many cores work parallelized within this process should use
+
+    All of them, except in a pipeline worker process, where the pipeline
+    already keeps a process per core busy and each gets an equal share.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, _pipeline_processes))